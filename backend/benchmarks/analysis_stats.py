@@ -0,0 +1,109 @@
+"""
+Times the DuckDB analysis statistics (market_stats.py) against the pandas
+computation /crypto_analysis/ used before, plus pandas versions of the new
+indicators, on random windows of a synthetic table. That both agree is
+checked by tests/test_analysis_stats.py.
+
+    python benchmarks/analysis_stats.py --rows 500000 --windows 200
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import duckdb
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_klines, START_MS, INTERVAL_MS
+from market_stats import INDICATOR_PERIODS, pivots, rsi, window_stats
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def pandas_stats(conn, start_time_ms, end_time_ms):
+    """The old load_analysis_stats: every row into pandas, then reduced there."""
+    df = conn.execute("""
+    SELECT open_time, open_price, high, low, close, volume
+    FROM BinanceData
+    WHERE open_time >= ? AND open_time <= ?
+    ORDER BY open_time
+    """, [start_time_ms, end_time_ms]).fetchdf()
+    if df.empty:
+        return None
+    df['open_time'] = df['open_time'].apply(lambda x: datetime.fromtimestamp(x/1000))
+    df['return'] = df['close'].pct_change()
+    stats = {
+        "period_start": df['open_time'].min().strftime('%Y-%m-%d %H:%M'),
+        "period_end": df['open_time'].max().strftime('%Y-%m-%d %H:%M'),
+        "data_points": len(df),
+        "start_price": float(df['open_price'].iloc[0]),
+        "end_price": float(df['close'].iloc[-1]),
+        "price_change": float(df['close'].iloc[-1] - df['open_price'].iloc[0]),
+        "price_change_pct": float((df['close'].iloc[-1] / df['open_price'].iloc[0] - 1) * 100),
+        "max_price": float(df['high'].max()),
+        "min_price": float(df['low'].min()),
+        "avg_price": float(df['close'].mean()),
+        "volatility": float(df['return'].std() * 100),
+        "total_volume": float(df['volume'].sum()),
+        "avg_volume": float(df['volume'].mean()),
+    }
+
+    # The new indicators, the straightforward pandas way
+    previous = df['close'].shift()
+    true_range = pd.concat([
+        df['high'] - df['low'],
+        (df['high'] - previous).abs(),
+        (df['low'] - previous).abs(),
+    ], axis=1).max(axis=1)
+    change = df['close'].diff().tail(INDICATOR_PERIODS)
+    stats["vwap"] = float(((df['high'] + df['low'] + df['close']) / 3 * df['volume']).sum() / df['volume'].sum())
+    stats["atr"] = float(true_range.tail(INDICATOR_PERIODS).mean())
+    stats["rsi"] = rsi(float(change.clip(lower=0).sum()), float((-change).clip(lower=0).sum()))
+    stats.update(pivots(stats["max_price"], stats["min_price"], stats["end_price"]))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--windows", type=int, default=200)
+    args = parser.parse_args()
+
+    conn = duckdb.connect()
+    create_klines(conn, args.rows)
+    last = START_MS + (args.rows - 1) * INTERVAL_MS
+    rng = random.Random(0)
+
+    # The endpoint's 1d/3d/7d windows at random end dates, plus small and empty edge cases
+    windows = []
+    for _ in range(args.windows):
+        end = rng.randint(START_MS, last + DAY_MS)
+        windows.append((end - rng.choice([1, 3, 7]) * DAY_MS, end))
+    windows += [(START_MS, START_MS), (START_MS, START_MS + INTERVAL_MS), (START_MS - DAY_MS, START_MS - 1)]
+
+    timings = {"pandas": [], "duckdb": []}
+    for start, end in windows:
+        t = time.perf_counter()
+        pandas_stats(conn, start, end)
+        timings["pandas"].append(time.perf_counter() - t)
+        t = time.perf_counter()
+        window_stats(conn, start, end)
+        timings["duckdb"].append(time.perf_counter() - t)
+
+    report = {
+        "rows": args.rows,
+        "windows": len(windows),
+        "pandas_ms_median": statistics.median(timings["pandas"]) * 1000,
+        "duckdb_ms_median": statistics.median(timings["duckdb"]) * 1000,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Time to first token against total time of a streamed analysis, and how soon
+a disconnecting client frees the inference worker. Uses a tiny random model
+(benchmarks/tiny_model.py) on CPU unless --model-path points at real weights.
+The echo filter and the time-to-first-token bookkeeping are checked by
+tests/test_analysis_streaming.py.
+
+    python benchmarks/analysis_streaming.py --max-new-tokens 512
+
+Exits non-zero if a cancelled generation runs to its full budget.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.inference_batching import STATS, prompts
+
+async def stream(backend, prompt, max_new_tokens, stop_after=None):
+    """Consumes one stream; returns (time to first text, seconds until the worker was idle)."""
+    start = time.time()
+    events = backend.analysis_events(prompt, "1d", "greedy", max_new_tokens, backend.make_key(prompt=prompt, max_new_tokens=max_new_tokens), start)
+    first, count = None, 0
+    async for event in events:
+        if first is None and event.startswith("data: {\"text\""):
+            first = time.time() - start
+        count += 1
+        if stop_after is not None and count >= stop_after:
+            await events.aclose()  # what the server does when the client goes away
+            break
+    while backend.inference_executor.stats()["running"] or backend.inference_executor.stats()["queued"]:
+        await asyncio.sleep(0.005)
+    return first, time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-new-tokens", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--model-path", default="")
+    args = parser.parse_args()
+
+    model_dir = tempfile.TemporaryDirectory()
+    os.environ.update(MODEL_PATH=args.model_path or model_dir.name, MODEL_PRELOAD="0", ANALYSIS_CACHE_PATH="")
+    if not args.model_path:
+        os.environ["MODEL_DTYPE"] = "float32"
+
+    import main as backend
+    from benchmarks.tiny_model import create_tiny_model
+
+    if not args.model_path:
+        create_tiny_model(model_dir.name, prompts(backend.analysis_prompt, 20))
+    backend.model_registry.load()
+    prompt = backend.analysis_prompt(STATS, "last 24 hours")
+
+    async def run():
+        await stream(backend, prompt, 8)  # warm up
+        full = [await stream(backend, prompt, args.max_new_tokens) for _ in range(args.repeat)]
+        cancelled = [await stream(backend, prompt, args.max_new_tokens, stop_after=3) for _ in range(args.repeat)]
+        return full, cancelled
+
+    full, cancelled = asyncio.run(run())
+    total = statistics.median(seconds for _, seconds in full)
+    freed = statistics.median(seconds for _, seconds in cancelled)
+    report = {
+        "max_new_tokens": args.max_new_tokens,
+        "time_to_first_token_seconds": statistics.median(first for first, _ in full),
+        "total_seconds": total,
+        "worker_freed_after_disconnect_seconds": freed,
+    }
+    print(json.dumps(report, indent=2))
+    model_dir.cleanup()
+    if freed > total / 2:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+End-to-end latency, throughput and memory of the backend on synthetic
+databases of 15m candles, for comparing commits. For each table size a
+temporary DuckDB file is generated (benchmarks/synthetic.py, rollups
+included) and served by its own uvicorn process with a tiny local model
+(benchmarks/tiny_model.py). Then every workload is sent over HTTP by
+--concurrency clients:
+
+    range_1d, range_90d, range_1y   /binance_data/ ending at the last candle
+    range_all                       /binance_data/ over the whole series at chart resolution
+    deep_offset                     /binance_data/ pages at 50-95% of the series via offset
+    single_record                   /binance_data/{open_time} at random candles
+    price_summary_<timeframe>       /price_summary for 1d, 7d, 1m, 3m and all
+    crypto_analysis                 /crypto_analysis/ on distinct windows, so none is cached
+
+    python benchmarks/backend_suite.py --rows 1000000 10000000 50000000 --output before.json
+    python benchmarks/backend_suite.py --rows 1000000 10000000 50000000 --baseline before.json
+
+The data is seeded and ends at the start of the current UTC day, so the
+/price_summary timeframes (relative to now) always cover candles. Series are
+at most MAX_SERIES_ROWS long, so none starts before 1970; larger sizes are
+spread over more symbols and BTCUSDT is the one queried. Per workload the
+report gives p50/p95/p99 latency, requests per second and the server's peak
+RSS, plus the latency of the first (cold) request, as JSON. With --baseline
+it adds the ratio of each percentile to the earlier report. Exits non-zero
+if a request fails. Linux only (peak RSS comes from /proc).
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+import duckdb
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.export_memory import free_port, proc_status_kb, reset_peak_rss, start_server
+from benchmarks.synthetic import create_series, INTERVAL_MS
+from rollups import refresh
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+# About 43 years of 15m candles: every series starts after 1970, as the bucket arithmetic expects
+MAX_SERIES_ROWS = 1_500_000
+
+SYMBOL = "BTCUSDT"
+TIMEFRAMES = ("1d", "7d", "1m", "3m", "all")
+CHART_POINTS = 10_000
+PAGE_ROWS = 1000
+ANALYSIS_TOKENS = 32
+PERCENTILES = (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99))
+
+
+def build_database(path, rows, end_ms):
+    """
+    Writes `rows` candles, split into series of at most MAX_SERIES_ROWS that
+    end just before end_ms, and builds the rollups. Returns (symbols, rows per series).
+    """
+    count = -(-rows // MAX_SERIES_ROWS)
+    per_series = rows // count
+    symbols = [SYMBOL] + [f"SYM{i:03d}USDT" for i in range(1, count)]
+    conn = duckdb.connect(path)
+    try:
+        create_series(conn, symbols, per_series, start_ms=end_ms - per_series * INTERVAL_MS)
+        # create_series already wrote the table sorted
+        refresh(conn, sort=False)
+    finally:
+        conn.close()
+    return symbols, per_series
+
+
+def workloads(first_ms, last_ms, rows, seed=0):
+    """name -> function of the request number giving (method, path, JSON body or None)."""
+    rng = random.Random(seed)
+    offsets = [rng.randrange(rows // 2, rows * 95 // 100) for _ in range(64)]
+    open_times = [first_ms + rng.randrange(rows) * INTERVAL_MS for _ in range(256)]
+
+    def chart(params):
+        return lambda i: ("GET", "/binance_data/?" + urlencode(params), None)
+
+    def analysis(i):
+        # A window per request, 15 minutes apart, so the analysis cache never answers
+        end = datetime.fromtimestamp((last_ms - i * INTERVAL_MS) / 1000, timezone.utc)
+        return "POST", "/crypto_analysis/", {"timeframe": "1d", "end_date": end.isoformat(), "max_new_tokens": ANALYSIS_TOKENS}
+
+    named = {
+        "range_1d": chart({"start_time": last_ms - DAY_MS, "end_time": last_ms}),
+        "range_90d": chart({"start_time": last_ms - 90 * DAY_MS, "end_time": last_ms}),
+        "range_1y": chart({"start_time": last_ms - 365 * DAY_MS, "end_time": last_ms}),
+        "range_all": chart({"end_time": last_ms, "max_points": CHART_POINTS}),
+        "deep_offset": lambda i: ("GET", "/binance_data/?" + urlencode(
+            {"end_time": last_ms, "limit": PAGE_ROWS, "offset": offsets[i % len(offsets)]}), None),
+        "single_record": lambda i: ("GET", f"/binance_data/{open_times[i % len(open_times)]}", None),
+    }
+    for timeframe in TIMEFRAMES:
+        named[f"price_summary_{timeframe}"] = (
+            lambda i, timeframe=timeframe: ("GET", "/price_summary?" + urlencode({"timeframe": timeframe}), None)
+        )
+    named["crypto_analysis"] = analysis
+    return named
+
+
+def send(conn, method, path, body):
+    """One request on a kept-alive connection; returns (seconds, status)."""
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    start = time.perf_counter()
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    return time.perf_counter() - start, response.status
+
+
+def percentile(ordered, q):
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def run_workload(port, pid, make_request, requests, concurrency):
+    """
+    Sends one cold request, then `requests` more from `concurrency` clients.
+    Returns the latency percentiles, throughput and the server's peak RSS meanwhile.
+    """
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=3600)
+    cold, status = send(conn, *make_request(0))
+    conn.close()
+    errors = [] if status == 200 else [f"{make_request(0)[1]} -> {status}"]
+
+    numbers = itertools.count(1)
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=3600)
+        try:
+            while (i := next(numbers)) <= requests:
+                method, path, body = make_request(i)
+                seconds, status = send(conn, method, path, body)
+                with lock:
+                    latencies.append(seconds)
+                    if status != 200:
+                        errors.append(f"{path} -> {status}")
+        finally:
+            conn.close()
+
+    reset_peak_rss(pid)
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+    result = {"requests": len(ordered), "cold_ms": cold * 1000}
+    result.update({name: percentile(ordered, q) * 1000 for name, q in PERCENTILES})
+    result["throughput_rps"] = len(ordered) / seconds
+    result["peak_rss_mb"] = proc_status_kb(pid, "VmHWM") / 1024
+    result["errors"] = len(errors)
+    if errors:
+        result["first_errors"] = errors[:3]
+    return result
+
+
+def compare(report, baseline):
+    """Adds each workload's percentile ratios to the matching run of an earlier report."""
+    earlier = {size["rows"]: size["workloads"] for size in baseline.get("sizes", [])}
+    for size in report["sizes"]:
+        for name, result in size["workloads"].items():
+            before = earlier.get(size["rows"], {}).get(name)
+            if before:
+                result["vs_baseline"] = {
+                    key: result[key] / before[key] for key, _ in PERCENTILES if before.get(key)
+                }
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000], help="table sizes")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per workload")
+    parser.add_argument("--analyses", type=int, default=16, help="timed /crypto_analysis/ requests")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--workloads", default="", help="comma-separated names to run (default: all)")
+    parser.add_argument("--memory-limit", default="", help="DB_MEMORY_LIMIT for the server (default: its own)")
+    parser.add_argument("--model-path", default="", help="real model instead of the tiny random one")
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--baseline", help="report of an earlier run to compare against")
+    args = parser.parse_args()
+
+    selected = set(filter(None, args.workloads.split(",")))
+    # Start of the current UTC day; the last candle opens 15 minutes before it
+    end_ms = int(time.time() * 1000) // DAY_MS * DAY_MS
+    report = {
+        "commit": commit(),
+        "python": sys.version.split()[0],
+        "duckdb": duckdb.__version__,
+        "cpus": os.cpu_count(),
+        "concurrency": args.concurrency,
+        "sizes": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        model_env = {}
+        if args.model_path:
+            model_env["MODEL_PATH"] = args.model_path
+        else:
+            import main as backend
+            from benchmarks.inference_batching import prompts
+            from benchmarks.tiny_model import create_tiny_model
+
+            # Trained on real prompts, so they are about as many tokens as with a real vocabulary
+            model_env["MODEL_PATH"] = create_tiny_model(os.path.join(tmp, "model"), prompts(backend.analysis_prompt, 20))
+            model_env["MODEL_DTYPE"] = "float32"
+
+        for rows in args.rows:
+            db_path = os.path.join(tmp, f"klines_{rows}.db")
+            start = time.perf_counter()
+            symbols, per_series = build_database(db_path, rows, end_ms)
+            generate_seconds = time.perf_counter() - start
+            first_ms, last_ms = end_ms - per_series * INTERVAL_MS, end_ms - INTERVAL_MS
+
+            port = free_port()
+            server = start_server(
+                db_path, port, args.memory_limit,
+                MODEL_PRELOAD="1", ANALYSIS_CACHE_PATH="", LOG_LEVEL="WARNING", **model_env,
+            )
+            size = {
+                "rows": per_series * len(symbols),
+                "symbols": len(symbols),
+                "rows_per_series": per_series,
+                "generate_seconds": generate_seconds,
+                "file_mb": os.path.getsize(db_path) / 2 ** 20,
+                "startup_rss_mb": proc_status_kb(server.pid, "VmRSS") / 1024,
+                "workloads": {},
+            }
+            try:
+                for name, make_request in workloads(first_ms, last_ms, per_series).items():
+                    if selected and name not in selected:
+                        continue
+                    count = args.analyses if name == "crypto_analysis" else args.requests
+                    size["workloads"][name] = run_workload(port, server.pid, make_request, count, args.concurrency)
+            finally:
+                server.terminate()
+                server.wait()
+            os.remove(db_path)
+            report["sizes"].append(size)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    if any(result["errors"] for size in report["sizes"] for result in size["workloads"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
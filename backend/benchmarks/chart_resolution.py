@@ -0,0 +1,128 @@
+"""
+Latency of large-range /binance_data/ queries: the previous per-request
+TEMP VIEW resampling against the materialized rollup tables and the
+on-the-fly aggregate used when a rollup table is missing.
+
+    python benchmarks/chart_resolution.py --rows 350000
+
+Also checks that the rollup tables match the on-the-fly aggregate.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import duckdb
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_klines, START_MS
+from rollups import BASE_TABLE, bucket_expression, choose_resolution, aggregate_query, refresh
+
+DAY_MS = 24 * 60 * 60 * 1000
+RANGES = {"180d": 180 * DAY_MS, "1y": 365 * DAY_MS, "all": None}
+COLUMNS = """open_time, open_price, high, low, close, volume, close_time, quote_asset_volume,
+    ntrades, taker_buy_base_asset_volume, taker_buy_quote_asset_volume, ignore"""
+
+
+def legacy_query(conn, where, range_ms):
+    """The resampling the endpoint used to do on every request."""
+    interval = '1 day' if range_ms > 365 * DAY_MS else '4 hours'
+    conn.execute(f"""
+    CREATE OR REPLACE TEMP VIEW resampled_data AS
+    SELECT
+        MIN(open_time) AS open_time,
+        FIRST(open_price) AS open_price,
+        MAX(high) AS high,
+        MIN(low) AS low,
+        LAST(close) AS close,
+        SUM(volume) AS volume,
+        MAX(close_time) AS close_time,
+        SUM(quote_asset_volume) AS quote_asset_volume,
+        SUM(ntrades) AS ntrades,
+        SUM(taker_buy_base_asset_volume) AS taker_buy_base_asset_volume,
+        SUM(taker_buy_quote_asset_volume) AS taker_buy_quote_asset_volume,
+        NULL AS ignore
+    FROM BinanceData
+    WHERE {where}
+    GROUP BY time_bucket(INTERVAL '{interval}', to_timestamp(open_time/1000))
+    ORDER BY open_time
+    """)
+    return conn.execute(f"SELECT {COLUMNS} FROM resampled_data ORDER BY open_time").fetchall()
+
+
+def rollup_query(conn, table, bucket_expr, where):
+    if bucket_expr is None:
+        return conn.execute(f"SELECT {COLUMNS} FROM {table} WHERE {where} ORDER BY open_time").fetchall()
+    return on_the_fly_query(conn, bucket_expr, where, table)
+
+
+def on_the_fly_query(conn, bucket_expr, where, table=BASE_TABLE):
+    return conn.execute(f"SELECT * FROM ({aggregate_query(bucket_expr, where, table)}) ORDER BY open_time").fetchall()
+
+
+def same_candles(rolled, fly):
+    """
+    Whole buckets match up to floating-point summation order. The edge buckets
+    are skipped since the rollups also hold candles just outside the range.
+    """
+    by_time = {row[0]: row for row in rolled}
+    for row in fly[1:-1]:
+        other = by_time.get(row[0])
+        if other is None or any(
+            not (a == b or math.isclose(a, b, rel_tol=1e-9)) for a, b in zip(row, other) if a is not None
+        ):
+            return False
+    return True
+
+
+def best_of(fn, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=350_000)
+    parser.add_argument("--target-points", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = duckdb.connect()
+    create_klines(conn, args.rows)
+    start = time.perf_counter()
+    refresh(conn, rebuild=True)
+    build_seconds = time.perf_counter() - start
+
+    end_ms = conn.execute("SELECT MAX(open_time) FROM BinanceData").fetchone()[0]
+    report = {"rows": args.rows, "rollup_build_seconds": build_seconds, "ranges": []}
+    for name, range_ms in RANGES.items():
+        range_ms = range_ms or end_ms - START_MS
+        where = f"open_time >= {end_ms - range_ms} AND open_time <= {end_ms}"
+        table, bucket_ms, bucket_expr = choose_resolution(range_ms, args.target_points)
+        legacy_seconds, legacy = best_of(lambda: legacy_query(conn, where, range_ms), args.repeat)
+        rollup_seconds, rolled = best_of(lambda: rollup_query(conn, table, bucket_expr, where), args.repeat)
+        fly_seconds, fly = best_of(lambda: on_the_fly_query(conn, bucket_expression(bucket_ms), where), args.repeat)
+        report["ranges"].append({
+            "range": name,
+            "table": table,
+            "bucket_minutes": bucket_ms // 60000,
+            "legacy_seconds": legacy_seconds,
+            "legacy_points": len(legacy),
+            "rollup_seconds": rollup_seconds,
+            "on_the_fly_seconds": fly_seconds,
+            "points": len(rolled),
+            "rollup_matches_aggregate": same_candles(rolled, fly),
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Point counts and timing of the max_points paths of /binance_data/: bucketed
+candles and the lttb/minmax close-price downsamplers. That they stay within
+max_points and keep the range's high and low is checked by
+tests/test_downsampling.py.
+
+    python benchmarks/downsampling.py --rows 350000 --max-points 4 200 800 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import duckdb
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_klines, START_MS
+from downsampling import DOWNSAMPLERS
+from queries import KLINE_COLUMNS
+from rollups import BASE_TABLE, aggregate_query, choose_resolution, exact_query, refresh
+
+DAY_MS = 24 * 60 * 60 * 1000
+RANGES = {"7d": 7 * DAY_MS, "90d": 90 * DAY_MS, "1y": 365 * DAY_MS, "all": None}
+
+
+def time_candles(conn, start_ms, end_ms, max_points):
+    # The query the endpoint runs: rollup rows merged with the partial edge buckets from the base table
+    where, params = "open_time >= ? AND open_time <= ?", [start_ms, end_ms]
+    table, bucket_ms, bucket_expr = choose_resolution(end_ms - start_ms, max_points)
+    if table != BASE_TABLE:
+        sql, params = exact_query(table, bucket_ms, where, params, start_ms, end_ms, KLINE_COLUMNS)
+    elif bucket_expr is not None:
+        sql = aggregate_query(bucket_expr, where, table)
+    else:
+        sql = f"SELECT * FROM {table} WHERE {where}"
+    start = time.perf_counter()
+    points = conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+    seconds = time.perf_counter() - start
+    return {
+        "method": f"candles ({table}, {bucket_ms // 60000}m)",
+        "seconds": seconds,
+        "points": points,
+    }
+
+
+def time_downsampler(conn, start_ms, end_ms, name, max_points):
+    series = conn.execute(
+        "SELECT open_time, close FROM BinanceData WHERE open_time >= ? AND open_time <= ? ORDER BY open_time",
+        [start_ms, end_ms],
+    ).fetchnumpy()
+    start = time.perf_counter()
+    keep = DOWNSAMPLERS[name](series["open_time"], series["close"], max_points)
+    seconds = time.perf_counter() - start
+    return {
+        "method": name,
+        "seconds": seconds,
+        "points": len(keep),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=350_000)
+    parser.add_argument("--max-points", type=int, nargs="+", default=[4, 200, 800, 2000])
+    args = parser.parse_args()
+
+    conn = duckdb.connect()
+    create_klines(conn, args.rows)
+    refresh(conn, rebuild=True)
+
+    end_ms = conn.execute("SELECT MAX(open_time) FROM BinanceData").fetchone()[0]
+    report = []
+    for range_name, range_ms in RANGES.items():
+        range_ms = range_ms or end_ms - START_MS
+        # Start mid-bucket so partial edge buckets are exercised too
+        start_ms = end_ms - range_ms + 7 * 60 * 60 * 1000
+        for max_points in args.max_points:
+            results = [time_candles(conn, start_ms, end_ms, max_points)]
+            results += [time_downsampler(conn, start_ms, end_ms, name, max_points) for name in DOWNSAMPLERS]
+            for result in results:
+                report.append({"range": range_name, "max_points": max_points, **result})
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Peak server memory while streaming /binance_data/export, for tables of
+increasing size. Each size gets its own synthetic database file and its own
+uvicorn process, whose peak RSS (VmHWM) is reset before every export.
+
+    python benchmarks/export_memory.py --rows 2000000 6000000
+
+The export is bounded-memory if the peak RSS growth of the largest table stays
+close to that of the smallest; the script exits non-zero otherwise, and
+tests/test_export_memory.py asserts the same with pytest --slow. DuckDB
+keeps the blocks it has read cached up to its memory limit no matter how the
+rows are streamed. The server's DB_MEMORY_LIMIT default (512MB) bounds that
+cache. Here a smaller limit is used and one unmeasured export fills the
+cache first, so the measured exports show only the streaming itself. Linux
+only.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.synthetic import create_database, INTERVAL_MS
+
+FORMATS = ("ndjson", "csv", "arrow")
+READ_SIZE = 1 << 20
+
+
+def proc_status_kb(pid, field):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def reset_peak_rss(pid):
+    """Resets VmHWM to the current RSS (Linux 4.0+)."""
+    with open(f"/proc/{pid}/clear_refs", "w") as f:
+        f.write("5")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_path, port, memory_limit, **env):
+    """
+    Starts uvicorn on the database; keyword arguments are extra environment
+    variables. An empty memory_limit leaves the server's DB_MEMORY_LIMIT default.
+    """
+    limit = {"DB_MEMORY_LIMIT": memory_limit} if memory_limit else {}
+    env = {**os.environ, "DUCKDB_PATH": db_path, "MODEL_PRELOAD": "0", **limit, **env}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).read()
+            return server
+        except OSError:
+            time.sleep(0.5)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+def export(port, fmt):
+    """Reads the whole export in fixed-size pieces, as a client with a small buffer would."""
+    start = time.perf_counter()
+    total = 0
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/binance_data/export?format={fmt}") as response:
+        while True:
+            piece = response.read(READ_SIZE)
+            if not piece:
+                break
+            total += len(piece)
+    return time.perf_counter() - start, total
+
+
+def measure(row_counts, memory_limit, formats=FORMATS):
+    """
+    Exports a synthetic table of each size in every format from its own server
+    and returns one report entry per export, with the server's peak RSS growth.
+    """
+    report = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in row_counts:
+            # End the synthetic history before now, since the export stops at the current time
+            start_ms = int(time.time() * 1000) - (rows + 96) * INTERVAL_MS
+            db_path = create_database(os.path.join(tmp, f"klines_{rows}.db"), rows, start_ms=start_ms)
+            port = free_port()
+            server = start_server(db_path, port, memory_limit)
+            try:
+                export(port, "arrow")
+                for fmt in formats:
+                    reset_peak_rss(server.pid)
+                    before_kb = proc_status_kb(server.pid, "VmRSS")
+                    seconds, size = export(port, fmt)
+                    peak_kb = proc_status_kb(server.pid, "VmHWM")
+                    report.append({
+                        "rows": rows,
+                        "format": fmt,
+                        "seconds": seconds,
+                        "rows_per_second": rows / seconds,
+                        "bytes": size,
+                        "peak_rss_growth_mb": (peak_kb - before_kb) / 1024,
+                    })
+            finally:
+                server.terminate()
+                server.wait()
+            os.remove(db_path)
+    return report
+
+
+def unbounded_formats(report, tolerance_mb):
+    """Formats whose peak RSS growth on the largest table exceeds the smallest's by more than tolerance_mb."""
+    smallest, largest = min(r["rows"] for r in report), max(r["rows"] for r in report)
+    unbounded = []
+    for fmt in dict.fromkeys(r["format"] for r in report):
+        growth = {r["rows"]: r["peak_rss_growth_mb"] for r in report if r["format"] == fmt}
+        if growth[largest] > growth[smallest] + tolerance_mb:
+            unbounded.append(fmt)
+    return unbounded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[2_000_000, 6_000_000])
+    parser.add_argument("--memory-limit", default="128MB", help="DB_MEMORY_LIMIT for the server (empty: its default)")
+    parser.add_argument("--tolerance-mb", type=float, default=64, help="allowed extra peak growth for the largest table")
+    args = parser.parse_args()
+
+    report = measure(args.rows, args.memory_limit)
+    bounded = not unbounded_formats(report, args.tolerance_mb)
+    print(json.dumps({"runs": report, "bounded_memory": bounded}, indent=2))
+    if not bounded:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Latency and tokens per second of each generation profile for one analysis,
+next to the decoding the endpoint used before profiles (5 beams, max_length
+1024 including the prompt, min_length 256). Runs on tiny random models
+(benchmarks/tiny_model.py): a larger one as the analysis model and a smaller
+one sharing its tokenizer as the draft for the speculative profile.
+
+    python benchmarks/generation_profiles.py --max-new-tokens 256
+
+Random models rarely agree, so the draft's guesses are mostly rejected and
+the speculative numbers here are a lower bound; a real distilled draft of
+the analysis model accepts far more.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.inference_batching import STATS
+
+LEGACY_KWARGS = {
+    "max_length": 1024,
+    "min_length": 256,
+    "num_beams": 5,
+    "temperature": 0.7,
+    "no_repeat_ngram_size": 3,
+    "early_stopping": True,
+    "repetition_penalty": 1.2,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-new-tokens", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--hidden-size", type=int, default=256, help="of the analysis model; the draft uses 64")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    model_dir, draft_dir = os.path.join(tmp.name, "model"), os.path.join(tmp.name, "draft")
+    os.environ.update(MODEL_PATH=model_dir, DRAFT_MODEL_PATH=draft_dir, MODEL_DTYPE="float32", MODEL_PRELOAD="0")
+
+    import main as backend
+    from benchmarks.tiny_model import create_tiny_model
+    from generation import PROFILES, generation_kwargs
+
+    prompt = backend.analysis_prompt(STATS, "last 24 hours")
+    # Same training text, so both get the same tokenizer
+    create_tiny_model(model_dir, [prompt] * 20, hidden_size=args.hidden_size, layers=4)
+    create_tiny_model(draft_dir, [prompt] * 20, hidden_size=64, layers=1)
+    backend.model_registry.load()
+    backend.draft_registry.load()
+
+    runs = [("legacy (5 beams, max_length 1024)", LEGACY_KWARGS, False)]
+    runs += [(name, generation_kwargs(name, args.max_new_tokens), name == "speculative") for name in PROFILES]
+    report = {"max_new_tokens": args.max_new_tokens, "profiles": []}
+    for name, kwargs, draft in runs:
+        backend.generate_analyses([prompt], kwargs, draft=draft)  # warm up
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = backend.generate_analyses([prompt], kwargs, draft=draft)[0]
+            result["latency_seconds"] = time.perf_counter() - start
+            if best is None or result["latency_seconds"] < best["latency_seconds"]:
+                best = result
+        report["profiles"].append({
+            "profile": name,
+            "latency_seconds": best["latency_seconds"],
+            "generated_tokens": best["generated_tokens"],
+            "tokens_per_second": best["tokens_per_second"],
+        })
+    print(json.dumps(report, indent=2))
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
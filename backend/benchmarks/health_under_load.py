@@ -0,0 +1,94 @@
+"""
+Measures /health latency on a running backend while /crypto_analysis/ requests are in flight.
+
+    uvicorn main:app --port 8000 &
+    python benchmarks/health_under_load.py --url http://localhost:8000 --analyses 2
+
+With blocking work kept off the event loop, the loaded percentiles should stay
+close to the idle ones.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.request
+
+
+def _get(url):
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=600) as resp:
+        resp.read()
+    return time.perf_counter() - start
+
+
+def _post(url, payload):
+    req = urllib.request.Request(url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=3600) as resp:
+        resp.read()
+    return time.perf_counter() - start
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return {
+        "count": len(samples),
+        "p50_ms": pick(0.50) * 1000,
+        "p95_ms": pick(0.95) * 1000,
+        "p99_ms": pick(0.99) * 1000,
+        "max_ms": samples[-1] * 1000,
+        "mean_ms": statistics.mean(samples) * 1000,
+    }
+
+
+def sample_health(base_url, stop, interval):
+    samples = []
+    while not stop.is_set():
+        samples.append(_get(f"{base_url}/health"))
+        time.sleep(interval)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--analyses", type=int, default=2, help="concurrent /crypto_analysis/ requests")
+    parser.add_argument("--timeframe", default="1d")
+    parser.add_argument("--idle-seconds", type=float, default=5.0)
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between /health probes")
+    args = parser.parse_args()
+
+    # Baseline: nothing else running
+    stop = threading.Event()
+    timer = threading.Timer(args.idle_seconds, stop.set)
+    timer.start()
+    idle = sample_health(args.url, stop, args.interval)
+
+    # Loaded: probe /health until every analysis request has returned
+    analysis_times = []
+    def analyse():
+        analysis_times.append(_post(f"{args.url}/crypto_analysis/", {"timeframe": args.timeframe}))
+
+    stop = threading.Event()
+    loaded = []
+    prober = threading.Thread(target=lambda: loaded.extend(sample_health(args.url, stop, args.interval)))
+    prober.start()
+    clients = [threading.Thread(target=analyse) for _ in range(args.analyses)]
+    for t in clients:
+        t.start()
+    for t in clients:
+        t.join()
+    stop.set()
+    prober.join()
+
+    print(json.dumps({
+        "health_idle": _percentiles(idle),
+        "health_during_analysis": _percentiles(loaded),
+        "analysis_seconds": analysis_times,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Incremental ingestion (ingest.py) while the backend keeps serving: monthly
+CSVs of synthetic series are ingested one month at a time, including a month
+that is first seen half written, while threads keep querying /binance_data/
+and /price_summary through the endpoint code. Reports ingest time against a
+full reload and counts failed requests across the file swaps.
+
+    python benchmarks/incremental_ingest.py --symbols 4 --rows 35000
+
+Exits non-zero if a request fails, a candle is lost or duplicated, or the
+rollups or the summary index disagree with the ingested table.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import duckdb
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.multi_symbol import rollup_mismatches
+from benchmarks.summary_index import FIELDS, same_summary
+from benchmarks.synthetic import create_series, START_MS, INTERVAL_MS
+from ingest import CSV_COLUMNS, ingest
+
+MONTH_FORMAT = "%Y-%m"
+
+
+def write_month(conn, directory, symbol, month, fraction=1.0):
+    """Writes one Binance monthly CSV (no header, the CSV_COLUMNS order) of a synthetic series."""
+    rows = conn.execute(f"""
+    SELECT {', '.join(CSV_COLUMNS)}
+    FROM source
+    WHERE symbol = ? AND strftime(make_timestamp(open_time * 1000), '{MONTH_FORMAT}') = ?
+    ORDER BY open_time
+    """, [symbol, month]).fetchall()
+    rows = rows[:max(int(len(rows) * fraction), 1)]
+    interval = os.path.basename(directory).split("_")[1]
+    with open(os.path.join(directory, f"{symbol}-{interval}-{month}.csv"), "w") as f:
+        f.writelines(",".join(str(value) for value in row) + "\n" for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=35_000, help="candles per symbol")
+    parser.add_argument("--initial-months", type=int, default=9, help="months in the first load")
+    parser.add_argument("--clients", type=int, default=2)
+    args = parser.parse_args()
+
+    symbols = [f"SYM{i:03d}USDT" for i in range(args.symbols)]
+    workdir = tempfile.mkdtemp()
+    database = os.path.join(workdir, "binancedata.db")
+    source = duckdb.connect()
+    create_series(source, symbols, args.rows, table="source")
+    months = [month for (month,) in source.execute(f"""
+    SELECT DISTINCT strftime(make_timestamp(open_time * 1000), '{MONTH_FORMAT}') AS month FROM source ORDER BY month
+    """).fetchall()]
+    directories = {symbol: os.path.join(workdir, f"{symbol}_15m_data") for symbol in symbols}
+    for directory in directories.values():
+        os.mkdir(directory)
+
+    def publish(month, fraction=1.0):
+        for symbol, directory in directories.items():
+            write_month(source, directory, symbol, month, fraction)
+
+    for month in months[:args.initial_months]:
+        publish(month)
+    start = time.perf_counter()
+    ingest(database, list(directories.values()))
+    initial_seconds = time.perf_counter() - start
+
+    os.environ.update(DUCKDB_PATH=database, DB_SWAP_CHECK_INTERVAL="0.05", MODEL_PRELOAD="0")
+    import main as backend
+
+    # Clients querying through the endpoint code for the whole run
+    stop = threading.Event()
+    outcomes = {"ok": 0, "failed": []}
+    lock = threading.Lock()
+
+    # Only ranges of the first load, so every request has data to return
+    loaded = duckdb.connect(database, read_only=True)
+    loaded_until = loaded.execute("SELECT MIN(last) FROM (SELECT MAX(open_time) AS last FROM BinanceData GROUP BY symbol)").fetchone()[0]
+    loaded.close()
+
+    def client(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            symbol = rng.choice(symbols)
+            end = START_MS + rng.randrange(40 * 96, (loaded_until - START_MS) // INTERVAL_MS) * INTERVAL_MS
+            try:
+                if rng.random() < 0.5:
+                    backend.query_binance_data(end - 7 * 86400000, end, 1000, 0, "columns", None, None, None, symbol, "15m")
+                else:
+                    backend.query_price_summary("custom", end - 30 * 86400000, end, symbol, "15m")
+                with lock:
+                    outcomes["ok"] += 1
+            except Exception as e:
+                with lock:
+                    outcomes["failed"].append(repr(e))
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    backend.query_price_summary("all", None, None, symbols[0], "15m")  # build the first index
+
+    # The rest month by month; the first of them is seen half written, then complete.
+    # The last month is ingested once the clients stopped, to time it undisturbed.
+    ingests = []
+    pending = months[args.initial_months:-1]
+    steps = [(pending[0], 0.5)] + [(month, 1.0) for month in pending]
+    for month, fraction in steps:
+        publish(month, fraction)
+        start = time.perf_counter()
+        result = ingest(database, list(directories.values()))
+        ingests.append({"month": month, "fraction": fraction, "seconds": time.perf_counter() - start,
+                        "added_rows": sum(series["added_rows"] for series in result["series"])})
+        time.sleep(0.1)
+        backend.query_price_summary("all", None, None, symbols[0], "15m")
+    time.sleep(0.2)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    publish(months[-1])
+    start = time.perf_counter()
+    ingest(database, list(directories.values()))
+    month_seconds = time.perf_counter() - start
+    rerun = ingest(database, list(directories.values()))
+    time.sleep(0.1)
+
+    # The served summary index against a scan of the final file
+    index = backend.refresh_summary_index(symbols[0], "15m")
+    check = duckdb.connect(database, read_only=True)
+    rng = random.Random(1)
+    summary_failures = 0
+    for _ in range(200):
+        a, b = sorted(START_MS + rng.randrange(-10, args.rows + 10) * INTERVAL_MS for _ in range(2))
+        scanned = check.execute("""
+        SELECT MIN(low), MAX(high), arg_min(open_price, open_time), arg_max(close, open_time), SUM(volume), COUNT(*)
+        FROM BinanceData WHERE symbol = ? AND open_time >= ? AND open_time <= ?
+        """, [symbols[0], a, b]).fetchone()
+        expected = None if scanned[5] == 0 else dict(zip(FIELDS, scanned))
+        if not same_summary(index.summary(a, b), expected):
+            summary_failures += 1
+    rows, distinct = check.execute("SELECT COUNT(*), COUNT(DISTINCT (symbol, interval, open_time)) FROM BinanceData").fetchone()
+    mismatches = rollup_mismatches(check)
+    check.close()
+
+    # A full reload of every month into an empty database for comparison
+    start = time.perf_counter()
+    ingest(os.path.join(workdir, "full.db"), list(directories.values()))
+    full_seconds = time.perf_counter() - start
+
+    backend.db_pool.close()
+    report = {
+        "symbols": args.symbols,
+        "rows": rows,
+        "expected_rows": args.symbols * args.rows,
+        "duplicates": rows - distinct,
+        "initial_load_seconds": initial_seconds,
+        "ingest_seconds_under_load": [step["seconds"] for step in ingests],
+        "ingest_month_seconds": month_seconds,
+        "full_reload_seconds": full_seconds,
+        "rerun_added_rows": sum(series["added_rows"] for series in rerun["series"]),
+        "requests_ok": outcomes["ok"],
+        "requests_failed": len(outcomes["failed"]),
+        "failures": outcomes["failed"][:5],
+        "pool_reopens": backend.db_pool.stats()["reopens"],
+        "summary_index": index.stats(),
+        "summary_mismatches": summary_failures,
+        "rollup_mismatches": mismatches,
+    }
+    print(json.dumps(report, indent=2))
+    shutil.rmtree(workdir, ignore_errors=True)
+    if (outcomes["failed"] or summary_failures or mismatches or rows != args.symbols * args.rows
+            or rows != distinct or report["rerun_added_rows"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
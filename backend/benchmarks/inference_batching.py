@@ -0,0 +1,128 @@
+"""
+Analyses per minute at several concurrency levels, generating each analysis
+on its own (as before batching) and with the batching scheduler used by
+/crypto_analysis/. Uses a tiny random model (benchmarks/tiny_model.py) on CPU
+unless --model-path points at real weights.
+
+    python benchmarks/inference_batching.py --concurrency 1 4 16 --batch-size 8
+
+Every request gets a distinct prompt, so no two are coalesced. --profile and
+--max-new-tokens default to GENERATION_PROFILE and GENERATION_MAX_NEW_TOKENS.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+STATS = {
+    "period_start": "2024-12-30 00:00",
+    "period_end": "2024-12-31 23:45",
+    "data_points": 192,
+    "start_price": 93000.0,
+    "end_price": 94150.5,
+    "price_change": 1150.5,
+    "price_change_pct": 1.24,
+    "max_price": 95210.0,
+    "min_price": 92480.25,
+    "avg_price": 93620.4,
+    "volatility": 0.31,
+    "total_volume": 23456.7,
+    "avg_volume": 122.2,
+    "vwap": 93655.1,
+    "atr": 212.4,
+    "rsi": 57.3,
+    "pivot": 93946.92,
+    "support_1": 92683.83,
+    "support_2": 91217.17,
+    "resistance_1": 95413.58,
+    "resistance_2": 96676.67,
+}
+
+
+def prompts(analysis_prompt, count):
+    return [analysis_prompt({**STATS, "end_price": STATS["end_price"] + i}, "last 24 hours") for i in range(count)]
+
+
+async def drive(batcher, items, concurrency):
+    """`concurrency` clients sending the jobs one after another; returns per-request latencies."""
+    pending = list(items)
+    latencies = []
+
+    async def client():
+        while pending:
+            job = pending.pop()
+            start = time.perf_counter()
+            await batcher.run(job)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--batch-wait-ms", type=float, default=50.0)
+    parser.add_argument("--rounds", type=int, default=2, help="requests per client")
+    parser.add_argument("--profile", default=None)
+    parser.add_argument("--max-new-tokens", type=int, default=None)
+    parser.add_argument("--model-path", default="")
+    args = parser.parse_args()
+
+    model_dir = tempfile.TemporaryDirectory()
+    os.environ.update(MODEL_PATH=args.model_path or model_dir.name, MODEL_PRELOAD="0")
+    if not args.model_path:
+        os.environ["MODEL_DTYPE"] = "float32"
+
+    import main as backend
+    import settings
+    from benchmarks.tiny_model import create_tiny_model
+    from workers import BatchingExecutor, BoundedExecutor
+
+    if not args.model_path:
+        create_tiny_model(model_dir.name, prompts(backend.analysis_prompt, 20))
+    profile = args.profile or settings.GENERATION_PROFILE
+    max_new_tokens = args.max_new_tokens or settings.GENERATION_MAX_NEW_TOKENS
+    jobs = lambda count: [(prompt, profile, max_new_tokens) for prompt in prompts(backend.analysis_prompt, count)]
+    backend.model_registry.load()
+    backend.run_ai_batch(jobs(1))  # warm up
+
+    report = {"profile": profile, "max_new_tokens": max_new_tokens, "runs": []}
+    for concurrency in args.concurrency:
+        items = jobs(concurrency * args.rounds)
+        for mode, batch_size in (("one by one", 1), ("batched", args.batch_size)):
+            executor = BoundedExecutor("inference", 1, len(items))
+            batcher = BatchingExecutor(
+                "analysis", backend.run_ai_batch, executor,
+                max_batch_size=batch_size, max_wait_seconds=args.batch_wait_ms / 1000, max_queue=len(items),
+            )
+            start = time.perf_counter()
+            latencies = asyncio.run(drive(batcher, items, concurrency))
+            seconds = time.perf_counter() - start
+            stats = batcher.stats()
+            batcher.shutdown()
+            executor.shutdown()
+            report["runs"].append({
+                "concurrency": concurrency,
+                "mode": mode,
+                "analyses": len(items),
+                "seconds": seconds,
+                "analyses_per_minute": len(items) / seconds * 60,
+                "p50_latency_seconds": statistics.median(latencies),
+                "max_latency_seconds": max(latencies),
+                "mean_batch_size": stats["mean_batch_size"],
+            })
+    print(json.dumps(report, indent=2))
+    model_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Cost of the hot-path instrumentation (metrics.py and leveled logging):
+latency of the chart endpoints through the ASGI app with metrics off, with
+metrics on at the default INFO level, and with DEBUG logging enabled. Each
+configuration runs in its own process, since both are read at import time.
+
+    python benchmarks/instrumentation_overhead.py --rows 300000 --requests 300
+
+Exits non-zero if a response lacks its Server-Timing stages or /metrics does
+not count them.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_database, START_MS, INTERVAL_MS
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+CONFIGS = {
+    "metrics_off": {"METRICS_ENABLED": "0", "LOG_LEVEL": "INFO"},
+    "metrics_on": {"METRICS_ENABLED": "1", "LOG_LEVEL": "INFO"},
+    "debug_logging": {"METRICS_ENABLED": "1", "LOG_LEVEL": "DEBUG"},
+}
+
+# Stages every response of a route must report in its Server-Timing header
+EXPECTED_STAGES = {
+    "rows_1d": {"db_acquire", "query", "fetch", "timestamps", "serialize"},
+    "columns_30d": {"db_acquire", "query", "fetch", "serialize"},
+    "single": {"db_acquire", "query", "fetch", "timestamps", "serialize"},
+}
+
+
+def requests_for(end_ms):
+    return {
+        "rows_1d": ("/binance_data/", {"start_time": end_ms - DAY_MS, "end_time": end_ms}),
+        "columns_30d": ("/binance_data/", {"start_time": end_ms - 30 * DAY_MS, "end_time": end_ms, "format": "columns"}),
+        "single": (f"/binance_data/{end_ms - DAY_MS}", {}),
+    }
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def child(rows, count):
+    """Runs in the per-configuration process: times every route and checks the instrumentation output."""
+    from fastapi.testclient import TestClient
+    import main as backend
+
+    # /binance_data/ clamps end_time to now, and large tables run into the future
+    end_ms = min(START_MS + (rows - 1) * INTERVAL_MS, int(time.time() * 1000) // DAY_MS * DAY_MS - DAY_MS)
+    client = TestClient(backend.app)
+    report, problems = {}, []
+    for name, (path, params) in requests_for(end_ms).items():
+        for _ in range(10):
+            client.get(path, params=params)  # warm up
+        samples = []
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.get(path, params=params)
+            samples.append(time.perf_counter() - start)
+            response.raise_for_status()
+        report[name] = {
+            "median_ms": statistics.median(samples) * 1000,
+            "p95_ms": percentile(samples, 0.95) * 1000,
+        }
+        if backend.metrics.ENABLED:
+            header = response.headers.get("server-timing", "")
+            stages = {entry.split(";")[0] for entry in header.split(", ") if entry}
+            missing = EXPECTED_STAGES[name] - stages
+            if missing or "total" not in stages:
+                problems.append(f"{name}: Server-Timing {header!r} lacks {sorted(missing)}")
+            report[name]["server_timing"] = header
+
+    if backend.metrics.ENABLED and backend.metrics.prom is not None:
+        exposition = client.get("/metrics").text
+        for stage in set().union(*EXPECTED_STAGES.values()):
+            if f'cryptoanalysis_stage_seconds_count{{stage="{stage}"}}' not in exposition:
+                problems.append(f"/metrics has no {stage} histogram")
+    backend.db_pool.close()
+    return {"routes": report, "problems": problems}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--requests", type=int, default=300, help="timed requests per route and configuration")
+    parser.add_argument("--child", metavar="DATABASE", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.rows, args.requests)))
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database = create_database(os.path.join(workdir, "binancedata.db"), args.rows)
+        results = {}
+        for name, env in CONFIGS.items():
+            # DEBUG lines are formatted and written to stderr, which is discarded here
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", database,
+                 "--rows", str(args.rows), "--requests", str(args.requests)],
+                env=dict(os.environ, DUCKDB_PATH=database, MODEL_PRELOAD="0", **env),
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True, text=True,
+            ).stdout
+            results[name] = json.loads(output.splitlines()[-1])
+
+    problems = [problem for result in results.values() for problem in result["problems"]]
+    baseline = results["metrics_off"]["routes"]
+    report = {
+        "rows": args.rows,
+        "requests": args.requests,
+        "configs": {name: result["routes"] for name, result in results.items()},
+        "overhead_ms": {
+            name: {
+                route: result["routes"][route]["median_ms"] - baseline[route]["median_ms"]
+                for route in baseline
+            }
+            for name, result in results.items() if name != "metrics_off"
+        },
+        "problems": problems,
+    }
+    print(json.dumps(report, indent=2))
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
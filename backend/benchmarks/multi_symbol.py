@@ -0,0 +1,170 @@
+"""
+Multi-symbol storage: range latency of one series in a table holding many
+symbols against a table holding only that series, one /binance_data/batch
+call against a /binance_data/ call per symbol, and a check that the
+incrementally refreshed per-series rollups match an aggregate of the base
+table.
+
+    python benchmarks/multi_symbol.py --symbols 50 --rows 35000
+
+Exits non-zero if a rollup or a batch result disagrees.
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import duckdb
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_klines, create_series, START_MS, INTERVAL_MS
+from rollups import BASE_TABLE, ROLLUPS, aggregate_query, choose_resolution, refresh
+
+DAY_MS = 24 * 60 * 60 * 1000
+RANGES = {"1d": DAY_MS, "30d": 30 * DAY_MS, "180d": 180 * DAY_MS}
+COMPARED = ("open_time", "open_price", "high", "low", "close", "volume", "ntrades")
+
+
+def median_of(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def range_query(conn, conditions, start, end, target_points):
+    """The /binance_data/ chart query for one series: rollup choice, then rows or on-the-fly buckets."""
+    table, bucket_ms, bucket_expr = choose_resolution(end - start, target_points)
+    where = " AND ".join([sql for sql, _ in conditions] + ["open_time >= ?", "open_time <= ?"])
+    params = [value for _, value in conditions] + [start, end]
+    if bucket_expr is None:
+        query = f"SELECT * FROM {table} WHERE {where} ORDER BY open_time"
+    else:
+        query = f"SELECT * FROM ({aggregate_query(bucket_expr, where, table)}) ORDER BY open_time"
+    return conn.execute(query, params).fetchnumpy()
+
+
+def rollup_mismatches(conn):
+    """Rollup buckets that differ from (or are missing in) an aggregate of the whole base table, per rollup."""
+    mismatches = {}
+    for table, _, bucket_expr in ROLLUPS:
+        expected = aggregate_query(bucket_expr, "TRUE", BASE_TABLE, keys=("symbol", "interval"))
+        different = " OR ".join(
+            f"r.{column} IS NULL OR e.{column} IS NULL OR ABS(r.{column} - e.{column}) > 1e-9 * GREATEST(ABS(e.{column}), 1)"
+            for column in COMPARED
+        )
+        count = conn.execute(f"""
+        SELECT COUNT(*)
+        FROM {table} r
+        FULL OUTER JOIN ({expected}) e
+          ON r.symbol = e.symbol AND r.interval = e.interval AND r.open_time = e.open_time
+        WHERE {different}
+        """).fetchone()[0]
+        if count:
+            mismatches[table] = count
+    return mismatches
+
+
+def same_columns(a, b):
+    return a.keys() == b.keys() and all(
+        len(a[name]) == len(b[name]) and all(
+            x == y or (isinstance(x, float) and math.isclose(x, y, rel_tol=1e-9)) for x, y in zip(a[name], b[name])
+        )
+        for name in a
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=35_000, help="candles per symbol")
+    parser.add_argument("--target-points", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    symbols = [f"SYM{i:03d}USDT" for i in range(args.symbols)]
+    workdir = tempfile.mkdtemp()
+    multi_path = os.path.join(workdir, "multi.db")
+    single_path = os.path.join(workdir, "single.db")
+    end_ms = START_MS + (args.rows - 1) * INTERVAL_MS
+
+    # Load everything but the last day of half the symbols, refresh, then append it and refresh again
+    conn = duckdb.connect(multi_path)
+    create_series(conn, symbols, args.rows)
+    held_out = symbols[: len(symbols) // 2]
+    conn.execute(
+        "CREATE TABLE held_out AS SELECT * FROM BinanceData WHERE open_time > ? AND symbol IN (SELECT UNNEST(?::VARCHAR[]))",
+        [end_ms - DAY_MS, held_out],
+    )
+    conn.execute("DELETE FROM BinanceData WHERE open_time > ? AND symbol IN (SELECT UNNEST(?::VARCHAR[]))", [end_ms - DAY_MS, held_out])
+    start = time.perf_counter()
+    refresh(conn)
+    build_seconds = time.perf_counter() - start
+    conn.execute("INSERT INTO BinanceData SELECT * FROM held_out")
+    conn.execute("DROP TABLE held_out")
+    start = time.perf_counter()
+    refresh(conn)
+    incremental_seconds = time.perf_counter() - start
+    mismatches = rollup_mismatches(conn)
+
+    single = duckdb.connect(single_path)
+    create_klines(single, args.rows)
+    refresh(single)
+
+    # Range latency of one series, alone in its table and among all the others
+    series = [("symbol = ?", symbols[len(symbols) // 2]), ("interval = ?", "15m")]
+    ranges = []
+    for name, range_ms in RANGES.items():
+        window = (max(end_ms - range_ms, START_MS), end_ms)
+        ranges.append({
+            "range": name,
+            "single_series_ms": median_of(lambda: range_query(single, [], *window, args.target_points), args.repeat) * 1000,
+            "multi_symbol_ms": median_of(lambda: range_query(conn, series, *window, args.target_points), args.repeat) * 1000,
+        })
+    conn.close()
+    single.close()
+
+    # Batch endpoint against one call per symbol, through the endpoint code
+    os.environ.update(DUCKDB_PATH=multi_path, MODEL_PRELOAD="0")
+    import main as backend
+
+    window = (end_ms - 30 * DAY_MS, end_ms)
+    batch = lambda: backend.query_binance_data_batch(symbols, "15m", *window, args.target_points, 10_000)
+    separate = lambda: [
+        backend.query_binance_data(*window, 10_000, 0, "columns", args.target_points, None, None, symbol, "15m")
+        for symbol in symbols
+    ]
+    batched = json.loads(batch().body)
+    one_by_one = [json.loads(response.body) for response in separate()]
+    batch_failures = [symbol for symbol, columns in zip(symbols, one_by_one) if not same_columns(batched[symbol], columns)]
+    batch_ms = median_of(batch, args.repeat) * 1000
+    separate_ms = median_of(separate, args.repeat) * 1000
+    backend.db_pool.close()
+
+    report = {
+        "symbols": args.symbols,
+        "rows_per_symbol": args.rows,
+        "rollup_build_seconds": build_seconds,
+        "rollup_incremental_seconds": incremental_seconds,
+        "ranges": ranges,
+        "batch_30d_ms": batch_ms,
+        "separate_30d_ms": separate_ms,
+        "rollup_mismatches": mismatches,
+        "batch_mismatches": batch_failures[:10],
+    }
+    print(json.dumps(report, indent=2))
+    shutil.rmtree(workdir, ignore_errors=True)
+    if mismatches or batch_failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Page latency when walking the whole table: LIMIT/OFFSET against keyset
+(cursor) pagination, on a table stored sorted by open_time and on a shuffled
+copy of it.
+
+    python benchmarks/pagination.py --rows 1000000 --limit 10000
+
+Offset pages get slower with depth; cursor pages on the sorted table stay flat.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import duckdb
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_klines
+from main import seek_bound
+from queries import where
+from rollups import BASE_INTERVAL_MS
+
+DEPTHS = (0.0, 0.25, 0.5, 0.75, 0.99)
+
+
+def page(conn, table, limit, end_ms, offset=0, cursor=None):
+    """Same queries as /binance_data/ without a start time: offset paging or a bounded cursor seek."""
+    conditions = [("open_time <= ?", end_ms)]
+    if cursor is not None:
+        conditions.append(("open_time > ?", cursor))
+        bound = seek_bound(conn, table, conditions, cursor, end_ms, limit, BASE_INTERVAL_MS)
+        if bound is not None:
+            conditions.append(("open_time <= ?", bound))
+    sql, params = where(conditions)
+    return conn.execute(
+        f"SELECT * FROM {table} WHERE {sql} ORDER BY open_time LIMIT ? OFFSET ?", params + [limit, offset]
+    ).fetchnumpy()
+
+
+def best_of(fn, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = duckdb.connect()
+    create_klines(conn, args.rows)
+    conn.execute("CREATE TABLE BinanceData_shuffled AS SELECT * FROM BinanceData ORDER BY random()")
+    times = conn.execute("SELECT open_time FROM BinanceData ORDER BY open_time").fetchnumpy()["open_time"]
+    end_ms = int(times[-1])
+
+    report = []
+    for depth in DEPTHS:
+        offset = min(int(args.rows * depth), args.rows - args.limit)
+        # The cursor a client would hold at this offset: open_time of the row just before it
+        # (the first page is bounded by the start time instead)
+        cursor = int(times[offset - 1]) if offset else int(times[0]) - 1
+        entry = {"depth": depth, "offset": offset}
+        for table, label in (("BinanceData", "sorted"), ("BinanceData_shuffled", "shuffled")):
+            offset_seconds, by_offset = best_of(lambda: page(conn, table, args.limit, end_ms, offset=offset), args.repeat)
+            cursor_seconds, by_cursor = best_of(lambda: page(conn, table, args.limit, end_ms, cursor=cursor), args.repeat)
+            entry[f"{label}_offset_ms"] = offset_seconds * 1000
+            entry[f"{label}_cursor_ms"] = cursor_seconds * 1000
+            entry[f"{label}_same_page"] = bool((by_offset["open_time"] == by_cursor["open_time"]).all())
+        report.append(entry)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Parse/plan overhead of the /binance_data/ queries: the SQL with values
+formatted into it, as the endpoints used to build it, against the same SQL
+with bound parameters (what the endpoints run now) and against a statement
+PREPAREd once per connection and run with EXECUTE.
+
+    python benchmarks/prepared_queries.py --rows 1000000 --pages 300
+
+That every query the data endpoints run returns exactly the rows of the
+formatted SQL is checked by tests/test_prepared_queries.py, on the queries
+recorded from the endpoint functions.
+
+DuckDB binds and plans EXECUTE again for every new set of values, so prepared
+statements measure no faster than bound parameters here, and the endpoints
+do not keep them.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import duckdb
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_klines, START_MS, INTERVAL_MS
+from queries import KLINE_COLUMNS, where
+from rollups import refresh
+
+# The series conditions the endpoints put first; refresh() labels the synthetic table with it
+SERIES = [("symbol = ?", "BTCUSDT"), ("interval = ?", "15m")]
+
+
+def _literal(value):
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(_literal(v) for v in value) + "]"
+    return str(int(value))
+
+
+class Prepared:
+    """PREPAREs each distinct SQL text once per connection; EXECUTE takes its values as literals."""
+
+    def __init__(self):
+        self.names = {}
+
+    def execute(self, conn, sql, params):
+        name = self.names.get(sql)
+        if name is None:
+            name = self.names[sql] = f"q{len(self.names)}"
+            conn.execute(f"PREPARE {name} AS {sql}")
+        return conn.execute(f"EXECUTE {name}({', '.join(_literal(p) for p in params)})")
+
+
+def formatted(sql, params):
+    """The SQL with every `?` replaced by its value, as the f-string queries were written."""
+    pieces = sql.split("?")
+    assert len(pieces) == len(params) + 1
+    return "".join(piece + _literal(value) for piece, value in zip(pieces, params)) + pieces[-1]
+
+
+def page_query(start, end, limit, picked=None):
+    """(sql, params) of a /binance_data/ page as query_binance_data builds it, optionally of downsampled rows."""
+    sql, params = where(SERIES + [("open_time >= ?", start), ("open_time <= ?", end)])
+    query = f"SELECT {KLINE_COLUMNS} FROM BinanceData WHERE {sql}"
+    if picked is not None:
+        query += " AND open_time IN (SELECT UNNEST(?::BIGINT[]))"
+        params.append(picked)
+    return query + " ORDER BY open_time LIMIT ? OFFSET ?", params + [limit, 0]
+
+
+def timing(cursor, statements, query, count):
+    """Microseconds per query of each method; query(i) gives the i-th (sql, params)."""
+    return {
+        "formatted_us": per_query_us(lambda i: cursor.execute(formatted(*query(i))).fetchnumpy(), count),
+        "bound_us": per_query_us(lambda i: cursor.execute(*query(i)).fetchnumpy(), count),
+        "prepared_us": per_query_us(lambda i: statements.execute(cursor, *query(i)).fetchnumpy(), count),
+    }
+
+
+def per_query_us(fn, count):
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--pages", type=int, default=300, help="timed queries per method")
+    args = parser.parse_args()
+
+    conn = duckdb.connect()
+    create_klines(conn, args.rows)
+    refresh(conn, rebuild=True)
+    cursor = conn.cursor()
+    statements = Prepared()
+    last = START_MS + (args.rows - 1) * INTERVAL_MS
+
+    # Hot path: one chart page of the last day, shifted by a candle each time so nothing is cached
+    day = 96 * INTERVAL_MS
+    report = {"rows": args.rows, "timing": []}
+    for limit in (1, 100, 10000):
+        query = lambda i: page_query(last - day - i * INTERVAL_MS, last - i * INTERVAL_MS, limit)
+        report["timing"].append({"query": f"page of {limit}", **timing(cursor, statements, query, args.pages)})
+    # Downsampled page: the kept open_times are passed as one list parameter
+    span = 20000 * INTERVAL_MS
+    kept = lambda i: list(range(last - span - i * INTERVAL_MS, last - i * INTERVAL_MS, 4 * INTERVAL_MS))
+    query = lambda i: page_query(last - span - i * INTERVAL_MS, last - i * INTERVAL_MS, 10000, kept(i))
+    report["timing"].append({
+        "query": "downsampled page of 5000", **timing(cursor, statements, query, max(1, args.pages // 10)),
+    })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Prefill time per analysis with and without the cached instruction prefix
+(prompt_cache.py), measured as a generate call producing a single token.
+Runs on a tiny random model (benchmarks/tiny_model.py) unless --model-path
+points at real weights.
+
+    python benchmarks/prompt_prefix_cache.py --hidden-size 512 --layers 8
+
+That both paths generate the same tokens, alone and in padded batches, is
+checked by tests/test_prompt_prefix_cache.py.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.inference_batching import STATS
+
+
+def variants(analysis_prompt, count):
+    """Prompts whose statistics differ in magnitude, so their data sections differ in length."""
+    return [
+        analysis_prompt({**STATS, "end_price": STATS["end_price"] * 10 ** (i % 3) + i, "total_volume": 7.0 * 10 ** i}, "last 24 hours")
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--hidden-size", type=int, default=256)
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--model-path", default="")
+    args = parser.parse_args()
+
+    model_dir = tempfile.TemporaryDirectory()
+    os.environ.update(MODEL_PATH=args.model_path or model_dir.name, MODEL_PRELOAD="0")
+    if not args.model_path:
+        os.environ["MODEL_DTYPE"] = "float32"
+
+    import main as backend
+    from benchmarks.tiny_model import create_tiny_model
+    from generation import generation_kwargs
+
+    prompts = variants(backend.analysis_prompt, 8)
+    if not args.model_path:
+        create_tiny_model(model_dir.name, prompts * 3, hidden_size=args.hidden_size, layers=args.layers)
+    backend.model_registry.load()
+    cache = backend.prompt_cache
+
+    def generate(batch, kwargs, cached):
+        cache.max_entries = 8 if cached else 0
+        backend.generate_analyses(batch, kwargs)
+
+    one_token = generation_kwargs("greedy", 1)
+    timings = {}
+    for cached in (False, True):
+        generate(prompts[:1], one_token, cached)  # warm up (and fill the cache)
+        samples = []
+        for i in range(args.repeat):
+            start = time.perf_counter()
+            generate([prompts[i % len(prompts)]], one_token, cached)
+            samples.append(time.perf_counter() - start)
+        timings[cached] = statistics.median(samples)
+
+    prefix, tail = cache.split(prompts[0])
+    tokenizer = backend.model_registry.tokenizer
+    report = {
+        "prefix_tokens": len(tokenizer(prefix)["input_ids"]),
+        "tail_tokens": len(tokenizer(tail, add_special_tokens=False)["input_ids"]),
+        "prefill_seconds_full": timings[False],
+        "prefill_seconds_cached_prefix": timings[True],
+        "saved_seconds_per_request": timings[False] - timings[True],
+        "prompt_cache": cache.stats(),
+    }
+    print(json.dumps(report, indent=2))
+    model_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
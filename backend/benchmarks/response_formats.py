@@ -0,0 +1,62 @@
+"""
+Compares payload size and serialization time of the /binance_data/ formats.
+
+    python benchmarks/response_formats.py --rows 10000 100000 1000000
+
+Runs against an in-memory synthetic table, so no server or database file is needed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import duckdb
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_klines
+from main import BinanceData
+from serialization import format_response, kline_rows, json_response
+
+QUERY = "SELECT * FROM BinanceData ORDER BY open_time"
+
+
+def rows_payload(conn):
+    """The default row JSON path."""
+    return json_response(kline_rows(conn.execute(QUERY).fetchnumpy(), BinanceData)).body
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    conn = duckdb.connect()
+    report = []
+    for rows in args.rows:
+        create_klines(conn, rows)
+        formats = {
+            "columns": lambda: format_response(conn.execute(QUERY), "columns").body,
+            "arrow": lambda: format_response(conn.execute(QUERY), "arrow").body,
+            "rows": lambda: rows_payload(conn),
+        }
+        for name, fn in formats.items():
+            seconds, size = timed(fn, args.repeat)
+            report.append({"rows": rows, "format": name, "seconds": seconds, "bytes": size, "bytes_per_row": size / rows})
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
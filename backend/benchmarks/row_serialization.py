@@ -0,0 +1,77 @@
+"""
+Per-row cost of the /binance_data/ row JSON path: the previous per-row
+lambda + BinanceData + response_model validation against the column-wise path.
+
+    python benchmarks/row_serialization.py --rows 10000 100000
+
+That both paths produce identical bytes is checked by
+tests/test_row_serialization.py.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import List
+
+import duckdb
+from pydantic import TypeAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_klines
+from main import BinanceData
+from serialization import kline_rows, json_response
+
+QUERY = "SELECT * FROM BinanceData ORDER BY open_time"
+
+# What FastAPI does with response_model=List[BinanceData]: validate again, then dump
+RESPONSE_ADAPTER = TypeAdapter(List[BinanceData])
+
+
+def legacy_payload(conn):
+    df = conn.execute(QUERY).fetchdf()
+    df['open_time'] = df['open_time'].apply(lambda x: datetime.fromtimestamp(x/1000).isoformat())
+    df['close_time'] = df['close_time'].apply(lambda x: datetime.fromtimestamp(x/1000).isoformat())
+    results = [BinanceData(**item) for item in df.to_dict(orient="records")]
+    return RESPONSE_ADAPTER.dump_json(RESPONSE_ADAPTER.validate_python(results))
+
+
+def fast_payload(conn):
+    return json_response(kline_rows(conn.execute(QUERY).fetchnumpy(), BinanceData)).body
+
+
+def best_of(fn, repeat):
+    best, payload = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    conn = duckdb.connect()
+    report = []
+    for rows in args.rows:
+        create_klines(conn, rows)
+        legacy_seconds, _ = best_of(lambda: legacy_payload(conn), args.repeat)
+        fast_seconds, _ = best_of(lambda: fast_payload(conn), args.repeat)
+        report.append({
+            "rows": rows,
+            "legacy_us_per_row": legacy_seconds / rows * 1e6,
+            "fast_us_per_row": fast_seconds / rows * 1e6,
+            "speedup": legacy_seconds / fast_seconds,
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
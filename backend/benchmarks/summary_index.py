@@ -0,0 +1,131 @@
+"""
+Timing of the /price_summary index: random [start, end] ranges are answered
+by the index and by a raw DuckDB scan, before and after incremental appends,
+along with the time each refresh takes. That both agree is checked by
+tests/test_summary_index.py.
+
+    python benchmarks/summary_index.py --rows 1000000 --queries 2000
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+import duckdb
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_klines, START_MS, INTERVAL_MS
+from summary_index import SummaryIndex, BLOCK_SIZE
+
+FIELDS = ("min_price", "max_price", "first_price", "last_price", "total_volume", "data_points")
+
+
+def scan(conn, start_time, end_time):
+    """The aggregate the endpoint used to run, with first/last ordered by open_time; None for no rows."""
+    row = conn.execute("""
+    SELECT MIN(low), MAX(high), arg_min(open_price, open_time), arg_max(close, open_time), SUM(volume), COUNT(*)
+    FROM BinanceData
+    WHERE open_time >= ? AND open_time <= ?
+    """, [start_time, end_time]).fetchone()
+    if row[5] == 0:
+        return None
+    return dict(zip(FIELDS, row))
+
+
+def same_summary(indexed, scanned):
+    if indexed is None or scanned is None:
+        return indexed is None and scanned is None
+    # Volume sums differ by summation order only
+    return all(
+        indexed[f] == scanned[f] or (f == "total_volume" and math.isclose(indexed[f], scanned[f], rel_tol=1e-9))
+        for f in FIELDS
+    )
+
+
+def random_ranges(rng, first, last, count):
+    """Empty, single-candle, within-block, block-aligned and arbitrary [start, end] ranges."""
+    span = last - first
+    ranges = [(first, last), (first - INTERVAL_MS, first - 1), (last + 1, last + INTERVAL_MS), (first, first)]
+    for _ in range(count):
+        kind = rng.random()
+        start = first + rng.randrange(-2 * INTERVAL_MS, span + 2 * INTERVAL_MS)
+        if kind < 0.2:
+            # Within one or two blocks
+            end = start + rng.randrange(0, 2 * BLOCK_SIZE * INTERVAL_MS)
+        elif kind < 0.3:
+            # Block-aligned edges
+            start = first + rng.randrange(0, span // INTERVAL_MS // BLOCK_SIZE + 1) * BLOCK_SIZE * INTERVAL_MS
+            end = start + rng.randrange(1, 64) * BLOCK_SIZE * INTERVAL_MS - INTERVAL_MS
+        else:
+            end = start + rng.randrange(0, span + 1)
+        ranges.append((start, end))
+    return ranges
+
+
+def time_queries(conn, index, ranges):
+    index_seconds, scan_seconds = 0.0, 0.0
+    for start_time, end_time in ranges:
+        t0 = time.perf_counter()
+        index.summary(start_time, end_time)
+        t1 = time.perf_counter()
+        scan(conn, start_time, end_time)
+        t2 = time.perf_counter()
+        index_seconds += t1 - t0
+        scan_seconds += t2 - t1
+    return {
+        "queries": len(ranges),
+        "index_us_per_query": index_seconds / len(ranges) * 1e6,
+        "scan_us_per_query": scan_seconds / len(ranges) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--appends", type=int, nargs="+", default=[1, 63, 1000, 20000])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    conn = duckdb.connect()
+    total = args.rows + sum(args.appends)
+    create_klines(conn, total, table="AllKlines")
+    conn.execute(f"CREATE TABLE BinanceData AS SELECT * FROM AllKlines ORDER BY open_time LIMIT {args.rows}")
+
+    index = SummaryIndex()
+    start = time.perf_counter()
+    index.refresh(conn, database_id=0)
+    report = {"rows": args.rows, "build_seconds": time.perf_counter() - start, "steps": []}
+
+    def step(label, rows):
+        last = START_MS + (rows - 1) * INTERVAL_MS
+        result = time_queries(conn, index, random_ranges(rng, START_MS, last, args.queries))
+        report["steps"].append({"step": label, "rows": rows, **result})
+
+    step("build", args.rows)
+    rows = args.rows
+    for database_id, appended in enumerate(args.appends, start=1):
+        conn.execute(f"INSERT INTO BinanceData SELECT * FROM AllKlines ORDER BY open_time LIMIT {appended} OFFSET {rows}")
+        rows += appended
+        start = time.perf_counter()
+        index.refresh(conn, database_id)
+        report["steps"].append({"step": f"append {appended}", "refresh_seconds": time.perf_counter() - start})
+        step(f"after append {appended}", rows)
+
+    # Rewriting an old candle forces a rebuild rather than an append
+    conn.execute(f"UPDATE BinanceData SET high = high * 2 WHERE open_time = {START_MS + 10 * INTERVAL_MS}")
+    start = time.perf_counter()
+    index.refresh(conn, database_id=len(args.appends) + 1)
+    report["steps"].append({"step": "rewrite", "refresh_seconds": time.perf_counter() - start})
+
+    report["index"] = index.stats()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
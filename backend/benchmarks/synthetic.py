@@ -0,0 +1,92 @@
+"""Synthetic BinanceData tables for benchmarks, generated inside DuckDB."""
+import duckdb
+
+# 2017-01-01 00:00 UTC, where the real table starts
+START_MS = 1483228800000
+INTERVAL_MS = 15 * 60 * 1000
+
+
+def create_klines(conn, rows, table="BinanceData", seed=42, start_ms=START_MS, interval_ms=INTERVAL_MS):
+    """
+    Creates (or replaces) a table with the BinanceData schema holding `rows`
+    consecutive candles. Prices follow a seeded random walk so every run
+    produces the same data.
+    """
+    conn.execute(f"SELECT setseed({seed / 2 ** 31})")
+    conn.execute(f"""
+    CREATE OR REPLACE TABLE {table} AS
+    WITH steps AS (
+        SELECT i, (random() - 0.5) * 0.004 AS step, random() AS r1, random() AS r2, random() AS r3
+        FROM range({rows}) t(i)
+    ),
+    walk AS (
+        SELECT i, r1, r2, r3,
+               20000 * exp(SUM(step) OVER (ORDER BY i ROWS UNBOUNDED PRECEDING)) AS close
+        FROM steps
+    ),
+    candles AS (
+        SELECT i, r1, r2, r3, close,
+               COALESCE(LAG(close) OVER (ORDER BY i), close) AS open_price
+        FROM walk
+    )
+    SELECT
+        ({start_ms} + i * {interval_ms})::BIGINT AS open_time,
+        open_price::DOUBLE AS open_price,
+        (GREATEST(open_price, close) * (1 + r1 * 0.002))::DOUBLE AS high,
+        (LEAST(open_price, close) * (1 - r2 * 0.002))::DOUBLE AS low,
+        close::DOUBLE AS close,
+        (50 + r3 * 500)::DOUBLE AS volume,
+        ({start_ms} + i * {interval_ms} + {interval_ms} - 1)::BIGINT AS close_time,
+        ((50 + r3 * 500) * close)::DOUBLE AS quote_asset_volume,
+        (1000 + r1 * 5000)::INTEGER AS ntrades,
+        ((50 + r3 * 500) * r2)::DOUBLE AS taker_buy_base_asset_volume,
+        ((50 + r3 * 500) * r2 * close)::DOUBLE AS taker_buy_quote_asset_volume,
+        0::INTEGER AS ignore
+    FROM candles
+    ORDER BY open_time
+    """)
+
+
+def create_series(conn, symbols, rows, interval="15m", interval_ms=INTERVAL_MS, table="BinanceData", start_ms=START_MS):
+    """
+    Creates (or replaces) a table with the symbol/interval columns holding
+    `rows` candles of each symbol, each its own seeded random walk, sorted on
+    (symbol, interval, open_time) like the loaded table.
+    """
+    conn.execute(f"DROP TABLE IF EXISTS {table}")
+    for i, symbol in enumerate(symbols):
+        create_klines(conn, rows, table="synthetic_series", seed=42 + i, start_ms=start_ms, interval_ms=interval_ms)
+        if i == 0:
+            conn.execute(f"CREATE TABLE {table} AS SELECT ''::VARCHAR AS symbol, ''::VARCHAR AS interval, * FROM synthetic_series LIMIT 0")
+        conn.execute(f"INSERT INTO {table} SELECT ?, ?, * FROM synthetic_series", [symbol, interval])
+    conn.execute("DROP TABLE IF EXISTS synthetic_series")
+    conn.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM {table} ORDER BY symbol, interval, open_time")
+
+
+def create_database(path, rows, symbols=None, **kwargs):
+    """
+    Writes a synthetic BinanceData table into a DuckDB file and returns its
+    path; with `symbols`, one series of `rows` candles per symbol.
+    """
+    conn = duckdb.connect(path)
+    try:
+        if symbols:
+            create_series(conn, symbols, rows, **kwargs)
+        else:
+            create_klines(conn, rows, **kwargs)
+    finally:
+        conn.close()
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic BinanceData table to a DuckDB file")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--symbols", type=int, default=0, help="write this many series of --rows candles each")
+    args = parser.parse_args()
+    symbols = [f"SYM{i:03d}USDT" for i in range(args.symbols)]
+    create_database(args.path, args.rows, symbols=symbols)
+    print(f"Wrote {args.rows} candles{f' of each of {len(symbols)} symbols' if symbols else ''} to {args.path}")
@@ -0,0 +1,70 @@
+"""
+A tiny randomly initialised causal LM with a tokenizer trained on analysis
+prompts, saved like a downloaded model so MODEL_PATH can point at it. Its
+output is gibberish, but it runs the real tokenizer/generate code paths on CPU
+in milliseconds per token, which is what inference benchmarks need.
+
+    python benchmarks/tiny_model.py /tmp/tiny-model
+"""
+import argparse
+import os
+
+import torch
+from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+SPECIAL_TOKENS = ["<pad>", "<s>", "</s>"]
+SAMPLE_TEXT = [
+    "You are a senior financial analyst specializing in cryptocurrency markets.",
+    "Market Overview Technical Analysis Risk Assessment Price Prediction Trading Recommendations Conclusion",
+    "Bitcoin price support resistance bullish bearish neutral momentum volatility liquidity volume",
+    "Starting Price Ending Price Price Change Highest Price Lowest Price Average Price 0123456789 $ % . , : -",
+]
+
+
+def create_tiny_model(path, texts=(), vocab_size=2048, hidden_size=64, layers=2, heads=4, seed=0):
+    """
+    Writes the tokenizer and model into `path` and returns it. The tokenizer
+    is trained on `texts` as well, e.g. real prompts, so they tokenize to
+    about as many tokens as with a real model's vocabulary.
+    """
+    torch.manual_seed(seed)
+    tokenizer = Tokenizer(models.BPE())
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(
+        vocab_size=vocab_size,
+        special_tokens=SPECIAL_TOKENS,
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet(),
+    )
+    tokenizer.train_from_iterator(list(SAMPLE_TEXT) * 50 + list(texts), trainer=trainer)
+    fast = PreTrainedTokenizerFast(tokenizer_object=tokenizer, pad_token="<pad>", bos_token="<s>", eos_token="</s>")
+
+    config = LlamaConfig(
+        vocab_size=len(fast),
+        hidden_size=hidden_size,
+        intermediate_size=hidden_size * 2,
+        num_hidden_layers=layers,
+        num_attention_heads=heads,
+        num_key_value_heads=heads,
+        max_position_embeddings=4096,
+        pad_token_id=fast.pad_token_id,
+        bos_token_id=fast.bos_token_id,
+        eos_token_id=fast.eos_token_id,
+    )
+    model = LlamaForCausalLM(config)
+    # Never pick end-of-sequence, so every analysis runs to its full token budget
+    with torch.no_grad():
+        model.lm_head.weight[fast.eos_token_id] = 0
+        model.lm_head.weight[fast.pad_token_id] = 0
+    os.makedirs(path, exist_ok=True)
+    fast.save_pretrained(path)
+    model.save_pretrained(path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    args = parser.parse_args()
+    print(create_tiny_model(args.path))
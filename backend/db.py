@@ -0,0 +1,246 @@
+"""Pooled, long-lived read-only DuckDB connections for the backend."""
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import duckdb
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free in time."""
+
+
+class _Generation:
+    """One open copy of the database file and the cursors created from it."""
+
+    def __init__(self, path, config=None):
+        # Attaching into a private in-memory instance bypasses DuckDB's per-path
+        # instance cache, so a swapped file is really reopened while cursors on
+        # the previous file are still in flight.
+        self.file_id = _file_id(path)
+        self.root = duckdb.connect(":memory:", config=config or {})
+        self.root.execute(f"ATTACH '{_quote(path)}' AS binance (READ_ONLY)")
+        self.root.execute("USE binance")
+        self.alive = 0
+        self.retired = False
+        self.lock = threading.Lock()
+
+    def new_cursor(self):
+        with self.lock:
+            cursor = self.root.cursor()
+            cursor.execute("USE binance")
+            self.alive += 1
+            return cursor
+
+    def close_cursor(self, cursor):
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        with self.lock:
+            self.alive -= 1
+            close_root = self.retired and self.alive <= 0
+        if close_root:
+            self.root.close()
+
+    def retire(self):
+        with self.lock:
+            self.retired = True
+            close_root = self.alive <= 0
+        if close_root:
+            self.root.close()
+
+
+def _quote(path):
+    return path.replace("'", "''")
+
+
+def _file_id(path):
+    """Identity of the database file, changes when the file is replaced or rewritten."""
+    st = os.stat(path)
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of read-only DuckDB cursors sharing one database instance.
+    Cursors are health-checked after sitting idle and the whole pool is reopened
+    when the database file on disk is swapped for a new one.
+    """
+
+    def __init__(self, path, size=4, timeout=10.0, health_check_interval=30.0, swap_check_interval=2.0, memory_limit=""):
+        self.path = path
+        # DuckDB keeps every block it has read cached up to its memory limit (80% of RAM by default)
+        self.config = {"memory_limit": memory_limit} if memory_limit else {}
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.swap_check_interval = swap_check_interval
+
+        self._idle = queue.LifoQueue()
+        self._current = None
+        self._reopen_lock = threading.Lock()
+        self._last_swap_check = 0.0
+
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._in_use = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._health_check_failures = 0
+        self._reopens = 0
+
+    @property
+    def database_id(self):
+        """Identity of the database file currently served; changes when the file is swapped."""
+        current = self._current
+        return current.file_id if current is not None else None
+
+    def open(self):
+        """Opens the database and fills the pool. Safe to call again after a failure."""
+        with self._reopen_lock:
+            if self._current is None:
+                self._swap_in(_Generation(self.path, self.config))
+
+    def close(self):
+        """Closes every idle cursor and the underlying database."""
+        with self._reopen_lock:
+            self._drain_idle()
+            if self._current is not None:
+                self._current.retire()
+                self._current = None
+
+    def _drain_idle(self):
+        drained = 0
+        while True:
+            try:
+                cursor, generation, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return drained
+            generation.close_cursor(cursor)
+            drained += 1
+
+    def _swap_in(self, generation):
+        # Idle cursors of the previous generation are closed now, checked out ones on release
+        old = self._current
+        drained = self._drain_idle()
+        self._current = generation
+        for _ in range(self.size if old is None else drained):
+            self._idle.put((generation.new_cursor(), generation, time.monotonic()))
+        if old is not None:
+            old.retire()
+            self._reopens += 1
+            logger.info("Database file %s changed, pool reopened", self.path)
+        self._last_swap_check = time.monotonic()
+
+    def _maybe_reopen(self):
+        now = time.monotonic()
+        if self._current is not None and now - self._last_swap_check < self.swap_check_interval:
+            return
+        with self._reopen_lock:
+            if self._current is not None and now - self._last_swap_check < self.swap_check_interval:
+                return
+            self._last_swap_check = now
+            try:
+                if self._current is None:
+                    self._swap_in(_Generation(self.path, self.config))
+                elif _file_id(self.path) != self._current.file_id:
+                    self._swap_in(_Generation(self.path, self.config))
+            except Exception as e:
+                # The file may be missing for a moment while it is being swapped
+                logger.warning("Database reopen check failed: %s", e)
+                if self._current is None:
+                    raise
+
+    def acquire(self):
+        """Checks out a cursor. Every acquire must be paired with a release."""
+        self._maybe_reopen()
+        wait_start = time.perf_counter()
+        try:
+            cursor, generation, last_used = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise PoolTimeout(f"No database connection available after {self.timeout:.1f}s")
+        waited = time.perf_counter() - wait_start
+
+        current = self._current
+        if generation is not current:
+            generation.close_cursor(cursor)
+            cursor, generation = current.new_cursor(), current
+        elif time.monotonic() - last_used > self.health_check_interval:
+            cursor = self._health_check(cursor, generation)
+
+        with self._stats_lock:
+            self._checkouts += 1
+            self._in_use += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return cursor, generation
+
+    def _health_check(self, cursor, generation):
+        try:
+            cursor.execute("SELECT 1").fetchone()
+            return cursor
+        except Exception as e:
+            logger.warning("Pooled connection failed health check, replacing it: %s", e)
+            with self._stats_lock:
+                self._health_check_failures += 1
+            generation.close_cursor(cursor)
+            return generation.new_cursor()
+
+    def release(self, lease, failed=False):
+        """Returns a checked out cursor, health-checking it first if the caller failed."""
+        cursor, generation = lease
+        with self._stats_lock:
+            self._in_use -= 1
+        try:
+            current = self._current
+            if current is None:
+                generation.close_cursor(cursor)
+                return
+            if generation is not current:
+                generation.close_cursor(cursor)
+                cursor, generation = current.new_cursor(), current
+            elif failed:
+                cursor = self._health_check(cursor, generation)
+        except Exception:
+            logger.exception("Could not return a connection to the pool")
+            # Never lose a pool slot, even if the replacement could not be created
+            cursor, generation = self._current.new_cursor(), self._current
+        self._idle.put((cursor, generation, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        """Checks out a cursor for the duration of the with-block."""
+        lease = self.acquire()
+        failed = False
+        try:
+            yield lease[0]
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.release(lease, failed)
+
+    def stats(self):
+        """Returns pool wait and checkout metrics."""
+        with self._stats_lock:
+            return {
+                "size": self.size,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "wait_seconds_total": self._wait_total,
+                "wait_seconds_avg": self._wait_total / self._checkouts if self._checkouts else 0.0,
+                "wait_seconds_max": self._wait_max,
+                "health_check_failures": self._health_check_failures,
+                "reopens": self._reopens,
+            }
@@ -0,0 +1,83 @@
+"""
+Point-selection downsamplers for line series. Each returns the sorted indices
+of the points to keep, so whole rows can be picked out of the original data.
+"""
+import numpy as np
+
+
+def _keep_extremes(keep, y, edges):
+    """
+    Forces the global minimum and maximum of y into the slot of the bucket that
+    holds them. If both fall in one bucket the second takes a neighbouring
+    slot, which needs at least two slots between the first and last point.
+    """
+    last = len(keep) - 1
+    taken = {}
+    for index in dict.fromkeys((int(np.argmin(y)), int(np.argmax(y)))):
+        slot = int(np.searchsorted(edges, index, side="right"))
+        if not 0 < slot < last:
+            continue  # first or last point, always kept
+        if slot in taken:
+            step = 1 if index > taken[slot] else -1
+            slot = slot + step if 0 < slot + step < last else slot - step
+        keep[slot] = index
+        taken[slot] = index
+    return np.sort(keep)
+
+
+def lttb(x, y, max_points):
+    """
+    Largest-Triangle-Three-Buckets: keeps the first and last point plus the
+    point per bucket spanning the largest triangle with its neighbours, then
+    swaps the global minimum and maximum of y in for their buckets' picks.
+    Below 4 points there is no room for both extremes next to the first and
+    last point, so min_max is used instead.
+    """
+    n = len(y)
+    if max_points >= n:
+        return np.arange(n)
+    if max_points < 4:
+        return min_max(x, y, max_points)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # max_points - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        next_x, next_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        px, py = x[previous], y[previous]
+        area = np.abs((px - next_x) * (y[lo:hi] - py) - (px - x[lo:hi]) * (next_y - py))
+        previous = lo + int(area.argmax())
+        keep[i + 1] = previous
+    return _keep_extremes(keep, y, edges)
+
+
+def min_max(x, y, max_points):
+    """
+    Splits the series into max_points // 2 equal buckets and keeps the lowest and
+    highest point of each, so the envelope of the series is preserved exactly.
+    """
+    n = len(y)
+    if max_points >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    width = -(-n // max(max_points // 2, 1))
+    buckets = -(-n // width)
+    padded = np.full(buckets * width, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, width)
+    offsets = np.arange(buckets) * width
+    lows = offsets + np.nanargmin(padded, axis=1)
+    highs = offsets + np.nanargmax(padded, axis=1)
+    return np.unique(np.concatenate([lows, highs]))
+
+
+DOWNSAMPLERS = {
+    "lttb": lttb,
+    "minmax": min_max,
+}
@@ -0,0 +1,34 @@
+"""
+Decoding profiles for the analysis model. Every profile generates at most
+max_new_tokens new tokens, so the budget does not shrink with the prompt.
+
+    greedy       one beam, no sampling; the cheapest
+    sampling     nucleus sampling at temperature 0.7
+    beam         beam search with GENERATION_NUM_BEAMS beams
+    speculative  greedy, with a small draft model proposing tokens that the
+                 analysis model verifies (assisted generation); needs
+                 DRAFT_MODEL_ID or DRAFT_MODEL_PATH and runs one prompt at a time
+"""
+import settings
+
+# Applied on top of every profile
+COMMON_KWARGS = {
+    "no_repeat_ngram_size": 3,
+    "repetition_penalty": 1.2,
+}
+
+PROFILES = {
+    "greedy": {"do_sample": False, "num_beams": 1},
+    "sampling": {"do_sample": True, "temperature": 0.7, "top_p": 0.9, "num_beams": 1},
+    "beam": {"do_sample": False, "num_beams": settings.GENERATION_NUM_BEAMS, "early_stopping": True},
+    "speculative": {"do_sample": False, "num_beams": 1},
+}
+
+
+def speculative_available():
+    return bool(settings.DRAFT_MODEL_ID or settings.DRAFT_MODEL_PATH)
+
+
+def generation_kwargs(profile, max_new_tokens):
+    """model.generate keyword arguments for a profile; also part of the analysis cache key."""
+    return {**COMMON_KWARGS, **PROFILES[profile], "max_new_tokens": max_new_tokens}
@@ -0,0 +1,271 @@
+"""
+Incremental ingestion of Binance kline CSVs into the database the backend is
+serving, without restarting it.
+
+Only CSV files from the month of a series' last stored candle onwards are
+read, and only candles whose (symbol, interval, open_time) is not stored yet
+are inserted. The work happens on a staging copy of the database file, which
+then replaces the live file atomically; the backend's connection pool notices
+the new file and moves its connections over. Rollup buckets are recomputed
+from the earliest inserted candle of each series onwards, and every run is
+recorded in the IngestLog table so the backend can update its in-memory
+indexes for exactly the changed range:
+
+    python ingest.py ../duckdb/binancedata.db ../BTCUSDT_15m_data ../ETHUSDT_1h_data
+
+Directories are named <symbol>_<interval>_data, as BinanceDataDownloader writes them.
+"""
+import glob
+import logging
+import os
+import re
+import shutil
+import time
+
+import duckdb
+
+from rollups import BASE_TABLE, ROLLUPS, bucket_start, refresh
+
+logger = logging.getLogger(__name__)
+
+LOG_TABLE = "IngestLog"
+
+CSV_COLUMNS = {
+    "open_time": "BIGINT",
+    "open_price": "DOUBLE",
+    "high": "DOUBLE",
+    "low": "DOUBLE",
+    "close": "DOUBLE",
+    "volume": "DOUBLE",
+    "close_time": "BIGINT",
+    "quote_asset_volume": "DOUBLE",
+    "ntrades": "INTEGER",
+    "taker_buy_base_asset_volume": "DOUBLE",
+    "taker_buy_quote_asset_volume": "DOUBLE",
+    "ignore": "INTEGER",
+}
+
+# Binance writes spot timestamps in microseconds from 2025 on; anything this large is not milliseconds
+MICROSECONDS_FROM = 10 ** 14
+
+_SERIES_DIR = re.compile(r"^(?P<symbol>[A-Z0-9]+)_(?P<interval>\w+)_data$")
+_FILE_MONTH = re.compile(r"(\d{4}-\d{2})(-\d{2})?\.csv$")
+
+
+def series_of(directory):
+    """(symbol, interval) of a <symbol>_<interval>_data directory."""
+    match = _SERIES_DIR.match(os.path.basename(os.path.normpath(directory)))
+    if match is None:
+        raise ValueError(f"{directory} is not named <symbol>_<interval>_data")
+    return match["symbol"], match["interval"]
+
+
+def new_files(directory, last_open_time):
+    """Monthly (or daily) CSVs of a series from the month of last_open_time on; all of them for a new series."""
+    files = sorted(glob.glob(os.path.join(directory, "*.csv")))
+    if last_open_time is None:
+        return files
+    last_month = time.strftime("%Y-%m", time.gmtime(last_open_time / 1000))
+    return [path for path in files if (m := _FILE_MONTH.search(path)) is None or m[1] >= last_month]
+
+
+def ensure_tables(conn):
+    """Creates the base table (with the series columns) and the ingestion log when missing."""
+    columns = ", ".join(f"{name} {sql_type}" for name, sql_type in CSV_COLUMNS.items())
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {BASE_TABLE} ({columns}, symbol VARCHAR, interval VARCHAR)")
+    # Same defaults as sql/rollups.sql for databases loaded before the series columns existed
+    for table in [BASE_TABLE] + sorted(_rollup_tables(conn)):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS symbol VARCHAR DEFAULT 'BTCUSDT'")
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS interval VARCHAR DEFAULT '15m'")
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {LOG_TABLE} (
+        version BIGINT,
+        symbol VARCHAR,
+        interval VARCHAR,
+        since BIGINT,
+        added_rows BIGINT,
+        total_rows BIGINT,
+        ingested_at TIMESTAMP
+    )
+    """)
+
+
+def append_series(conn, symbol, interval, files):
+    """
+    Inserts the candles of `files` that are not stored yet. Returns
+    (rows added, earliest added open_time or None).
+    """
+    if not files:
+        return 0, None
+    conn.execute(f"""
+    CREATE OR REPLACE TEMP TABLE incoming AS
+    SELECT DISTINCT ON (open_time) *
+    FROM (
+        SELECT * REPLACE (
+            CASE WHEN open_time >= {MICROSECONDS_FROM} THEN open_time // 1000 ELSE open_time END AS open_time,
+            CASE WHEN close_time >= {MICROSECONDS_FROM} THEN close_time // 1000 ELSE close_time END AS close_time
+        )
+        FROM read_csv(?, header = false, delim = ',', columns = ?)
+    )
+    ORDER BY open_time
+    """, [files, CSV_COLUMNS])
+    conn.execute(f"""
+    DELETE FROM incoming
+    USING {BASE_TABLE} b
+    WHERE b.symbol = ? AND b.interval = ? AND b.open_time = incoming.open_time
+    """, [symbol, interval])
+    added, since = conn.execute("SELECT COUNT(*), MIN(open_time) FROM incoming").fetchone()
+    if added:
+        conn.execute(f"INSERT INTO {BASE_TABLE} BY NAME SELECT *, ? AS symbol, ? AS interval FROM incoming", [symbol, interval])
+    conn.execute("DROP TABLE incoming")
+    return added, since
+
+
+def _rollup_tables(conn):
+    names = {table for table, _, _ in ROLLUPS}
+    return {name for (name,) in conn.execute("SELECT table_name FROM duckdb_tables()").fetchall() if name in names}
+
+
+def invalidate_rollups(conn, symbol, interval, since):
+    """Drops the rollup buckets of a series from the one holding `since` on, so the next refresh recomputes them."""
+    existing = _rollup_tables(conn)
+    for table, bucket_ms, _ in ROLLUPS:
+        if table in existing:
+            conn.execute(
+                f"DELETE FROM {table} WHERE symbol = ? AND interval = ? AND open_time >= ?",
+                [symbol, interval, bucket_start(since, bucket_ms)],
+            )
+
+
+def ingest(database, directories):
+    """
+    Appends the new candles of every series directory to a staging copy of
+    `database` and swaps it in. Returns {"version", "series": [...]}; the file
+    is left untouched when nothing was added.
+    """
+    staging = database + ".ingest"
+    # The staging file doubles as a lock against concurrent runs
+    fd = os.open(staging, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    os.close(fd)
+    try:
+        if os.path.exists(database):
+            shutil.copyfile(database, staging)
+        else:
+            os.remove(staging)
+        conn = duckdb.connect(staging)
+        try:
+            ensure_tables(conn)
+            version = conn.execute(f"SELECT COALESCE(MAX(version), 0) + 1 FROM {LOG_TABLE}").fetchone()[0]
+            changes = {}
+            for directory in directories:
+                symbol, interval = series_of(directory)
+                last = conn.execute(
+                    f"SELECT MAX(open_time) FROM {BASE_TABLE} WHERE symbol = ? AND interval = ?", [symbol, interval]
+                ).fetchone()[0]
+                added, since = append_series(conn, symbol, interval, new_files(directory, last))
+                logger.info("%s %s: %d new candles%s", symbol, interval, added, f" from {since}" if added else "")
+                if added:
+                    invalidate_rollups(conn, symbol, interval, since)
+                    changes[(symbol, interval)] = (since, added)
+            if not changes:
+                return {"version": version - 1, "series": []}
+
+            # Each series was appended in open_time order, so its rows stay in few
+            # row groups of their own; re-sorting the whole table is not worth it
+            refresh(conn, sort=False)
+            # One row per stored series, so readers can tell an unchanged series from one replaced outside ingest
+            totals = conn.execute(f"SELECT symbol, interval, COUNT(*) FROM {BASE_TABLE} GROUP BY symbol, interval").fetchall()
+            for symbol, interval, total in totals:
+                since, added = changes.get((symbol, interval), (None, 0))
+                conn.execute(
+                    f"INSERT INTO {LOG_TABLE} VALUES (?, ?, ?, ?, ?, ?, current_timestamp)",
+                    [version, symbol, interval, since, added, total],
+                )
+            conn.execute("CHECKPOINT")
+        finally:
+            conn.close()
+
+        with open(staging, "rb+") as f:
+            os.fsync(f.fileno())
+        # Atomic on POSIX: readers see either the old file or the complete new one
+        os.replace(staging, database)
+        return {
+            "version": version,
+            "series": [
+                {"symbol": symbol, "interval": interval, "since": since, "added_rows": added}
+                for (symbol, interval), (since, added) in changes.items()
+            ],
+        }
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+
+
+class SeriesLog:
+    """
+    The ingestion log of one series in the database behind `conn`, for
+    readers that keep state derived from the series and want to update it
+    for the changed range only. Queried lazily.
+    """
+
+    def __init__(self, conn, symbol, interval):
+        self.conn = conn
+        self.symbol = symbol
+        self.interval = interval
+        self._version = False
+
+    @property
+    def version(self):
+        """Latest ingestion recorded in the file, None without a log."""
+        if self._version is False:
+            self._version = None
+            exists = self.conn.execute(
+                "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = ?", [LOG_TABLE]
+            ).fetchone()[0]
+            if exists:
+                self._version = self.conn.execute(f"SELECT MAX(version) FROM {LOG_TABLE}").fetchone()[0]
+        return self._version
+
+    def changed_since(self, version):
+        """
+        Earliest open_time of the series inserted after ingestion `version`,
+        or None when nothing was. Raises LookupError when the log cannot vouch
+        for the series: `version` is not part of this file's log, or the table
+        was reloaded outside ingest since the last run.
+        """
+        latest = self.version
+        if latest is None or version is None:
+            raise LookupError("no ingestion log")
+        first, since = self.conn.execute(f"""
+        SELECT MIN(version), MIN(since) FILTER (WHERE version > ? AND symbol = ? AND interval = ?)
+        FROM {LOG_TABLE}
+        """, [version, self.symbol, self.interval]).fetchone()
+        if not first <= version <= latest:
+            raise LookupError(f"version {version} is not in the ingestion log")
+        total = self.conn.execute(
+            f"SELECT total_rows FROM {LOG_TABLE} WHERE version = ? AND symbol = ? AND interval = ?",
+            [latest, self.symbol, self.interval],
+        ).fetchone()
+        count = self.conn.execute(
+            f"SELECT COUNT(*) FROM {BASE_TABLE} WHERE symbol = ? AND interval = ?", [self.symbol, self.interval]
+        ).fetchone()[0]
+        if total is None or total[0] != count:
+            raise LookupError("series changed outside ingest")
+        return since
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Append new Binance kline CSVs to the database and swap it in")
+    parser.add_argument("database", nargs="?", default="../duckdb/binancedata.db")
+    parser.add_argument("directories", nargs="*", help="<symbol>_<interval>_data directories (default: all under ..)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    directories = args.directories or sorted(glob.glob(os.path.join("..", "*_data")))
+    start = time.time()
+    result = ingest(args.database, directories)
+    print(json.dumps(result))
+    print(f"Ingested in {time.time() - start:.2f} seconds")
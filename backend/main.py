@@ -1,19 +1,129 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-import duckdb
+from fastapi.responses import Response, StreamingResponse
 from typing import Optional, List
-import traceback
+import logging
 import time
+import asyncio
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from pydantic import BaseModel
-from datetime import datetime, timedelta
+from pydantic import BaseModel, Field
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, AutoModelForSeq2SeqLM
-import pandas as pd
 import numpy as np
 import gc
+from contextlib import asynccontextmanager, contextmanager, nullcontext
 
-app = FastAPI()
+import settings
+import metrics
+from metrics import stage
+from db import ConnectionPool, PoolTimeout
+from workers import BoundedExecutor, BatchingExecutor, QueueFull, JobTimeout
+from model_registry import ModelRegistry
+from analysis_cache import AnalysisCache, make_key
+from rollups import (
+    BASE_TABLE, choose_resolution, available_rollups, aggregate_query, bucket_expression, bucket_start, exact_query,
+)
+from downsampling import DOWNSAMPLERS
+from summary_index import SummaryIndex
+from series import INTERVALS_MS, asset_name, catalog as series_catalog
+from ingest import SeriesLog
+from market_stats import INDICATOR_PERIODS, window_stats
+from prompt_cache import PrefixCache
+from streaming import AnalysisStream, EchoFilter, StreamStats, sse_event
+from queries import KLINE_COLUMNS, where
+from generation import PROFILES, generation_kwargs, speculative_available
+from serialization import (
+    negotiate_format, format_response, kline_rows, json_response, set_next_cursor, NEXT_CURSOR_HEADER,
+    EXPORT_FORMATS, ExportEncoder, arrow_batches, grouped_columns_response,
+)
+
+logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+db_pool = ConnectionPool(
+    settings.DB_PATH,
+    size=settings.DB_POOL_SIZE,
+    timeout=settings.DB_POOL_TIMEOUT,
+    health_check_interval=settings.DB_HEALTH_CHECK_INTERVAL,
+    swap_check_interval=settings.DB_SWAP_CHECK_INTERVAL,
+    memory_limit=settings.DB_MEMORY_LIMIT,
+)
+
+# DuckDB queries and model inference are blocking, so they run on their own
+# bounded thread pools and never on the event loop
+db_executor = BoundedExecutor("duckdb", settings.DB_WORKERS, settings.DB_QUEUE_SIZE)
+inference_executor = BoundedExecutor("inference", settings.INFERENCE_WORKERS, settings.INFERENCE_QUEUE_SIZE)
+
+model_registry = ModelRegistry(
+    settings.MODEL_ID,
+    local_path=settings.MODEL_PATH,
+    dtype=settings.MODEL_DTYPE,
+    warmup=settings.MODEL_WARMUP,
+    idle_unload_seconds=settings.MODEL_IDLE_UNLOAD_SECONDS,
+)
+
+# Draft model for the speculative profile, loaded on its first use
+draft_registry = ModelRegistry(
+    settings.DRAFT_MODEL_ID,
+    local_path=settings.DRAFT_MODEL_PATH,
+    dtype=settings.MODEL_DTYPE,
+    idle_unload_seconds=settings.MODEL_IDLE_UNLOAD_SECONDS,
+) if speculative_available() else None
+
+analysis_cache = AnalysisCache(
+    max_entries=settings.ANALYSIS_CACHE_SIZE,
+    ttl_seconds=settings.ANALYSIS_CACHE_TTL,
+    disk_path=settings.ANALYSIS_CACHE_PATH,
+)
+
+# Concurrent analyses are collected into batches for one generate call each
+analysis_batcher = BatchingExecutor(
+    "analysis",
+    lambda items: run_analysis_batch(items),  # defined further down
+    inference_executor,
+    max_batch_size=settings.INFERENCE_BATCH_SIZE,
+    max_wait_seconds=settings.INFERENCE_BATCH_WAIT_MS / 1000,
+    max_queue=settings.INFERENCE_QUEUE_SIZE,
+)
+
+# past_key_values of the analysis instructions, which are the same for every
+# analysis of a period up to the data section (see analysis_prompt)
+prompt_cache = PrefixCache("Data Summary for Analysis:\n", max_entries=settings.PROMPT_CACHE_SIZE)
+
+# Counts and times to first token of /crypto_analysis/stream
+stream_stats = StreamStats()
+
+# Prefix sums and range min/max over each series behind /price_summary, least recently used first
+summary_indexes = OrderedDict()  # (symbol, interval) -> SummaryIndex
+summary_indexes_lock = threading.Lock()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Opens the DuckDB connection pool for the lifetime of the worker."""
+    try:
+        db_pool.open()
+    except Exception as e:
+        # Keep serving; the pool retries opening on the next checkout
+        logger.exception("Database connection error: %s", e)
+    if settings.MODEL_PRELOAD:
+        try:
+            # Load on the inference worker so the model is ready before the first analysis
+            await inference_executor.run(model_registry.start)
+        except Exception as e:
+            # Keep serving chart data; the model is loaded on the first analysis instead
+            logger.exception("Model load error: %s", e)
+    yield
+    analysis_batcher.shutdown()
+    model_registry.shutdown()
+    if draft_registry is not None:
+        draft_registry.shutdown()
+    analysis_cache.close()
+    inference_executor.shutdown()
+    db_executor.shutdown()
+    db_pool.close()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,17 +131,80 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "Server-Timing"],
 )
 
+# Stage timings of every request: Server-Timing header and /metrics histograms
+app.add_middleware(metrics.TimingMiddleware)
+
+# Identity of the database file behind the connection each thread has checked out
+db_lease = threading.local()
+
+def leased_database_id():
+    """
+    Identity of the file this thread's connection reads, for caches derived
+    from it. Unlike the pool's database_id it cannot run ahead of the
+    connection when the file is swapped during the checkout.
+    """
+    return db_lease.database_id
+
+@contextmanager
 def get_db_connection():
-    """Establishes and returns a DuckDB connection."""
+    """Checks out a pooled DuckDB connection for the duration of the with-block."""
     try:
-        conn = duckdb.connect('../duckdb/binancedata.db', read_only=True)
-        return conn
+        with stage("db_acquire"):
+            lease = db_pool.acquire()
+    except PoolTimeout as e:
+        logger.warning("Database connection error: %s", e)
+        raise HTTPException(status_code=503, detail=f"Database connection error: {e}")
     except Exception as e:
-        print(f"Database connection error: {e}")
-        traceback.print_exc()
+        logger.exception("Database connection error: %s", e)
         raise HTTPException(status_code=500, detail=f"Database connection error: {e}")
+    db_lease.database_id = lease[1].file_id
+    failed = False
+    try:
+        yield lease[0]
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        db_pool.release(lease, failed)
+
+async def run_db(fn, *args):
+    """Runs a blocking DuckDB job on the database thread pool."""
+    try:
+        return await db_executor.run(fn, *args)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+async def run_inference(fn, *args):
+    """Runs a blocking model job on the inference worker."""
+    try:
+        return await inference_executor.run(fn, *args)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+async def run_analysis(prompt, profile, max_new_tokens):
+    """Generates one analysis as part of the next inference batch."""
+    try:
+        # The stage timings of this request travel with the job into the batch
+        job = ((prompt, profile, max_new_tokens), metrics.current())
+        return await analysis_batcher.run(job, settings.INFERENCE_TIMEOUT or None)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except JobTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+def check_interval(interval):
+    if interval not in INTERVALS_MS:
+        raise HTTPException(status_code=400, detail=f"Unknown interval '{interval}', expected one of {list(INTERVALS_MS)}")
+
+def series_conditions(conn, symbol, interval):
+    """(sql, value) filters selecting one symbol/interval series; 404 when the database does not hold it."""
+    conditions = series_catalog(conn, leased_database_id()).conditions(symbol, interval)
+    if conditions is None:
+        raise HTTPException(status_code=404, detail=f"No data for {symbol} {interval}")
+    return conditions
 
 class BinanceData(BaseModel):
     open_time: str
@@ -52,395 +225,862 @@ async def read_binance_data(
     start_time: Optional[int] = None,
     end_time: Optional[int] = None,
     limit: int = 10000,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[int] = None,
+    fmt: Optional[str] = Query(None, alias="format"),
+    max_points: Optional[int] = Query(None, ge=2),
+    downsample: Optional[str] = None,
+    symbol: str = settings.DEFAULT_SYMBOL,
+    interval: str = settings.DEFAULT_INTERVAL,
+    accept: Optional[str] = Header(None)
 ):
     """
-    Retrieves Binance kline data from the DuckDB database.
-    Optimized for chart rendering with efficient time filtering.
+    Retrieves Binance kline data of one symbol/interval series from the
+    DuckDB database. Optimized for chart rendering with efficient time filtering.
+
+    The range is returned as candles of the smallest bucket size that keeps it
+    within max_points (default CHART_TARGET_POINTS). With downsample=lttb|minmax
+    the original rows are thinned out on the close price instead, for line
+    charts.
+
+    For paging, pass the X-Next-Cursor header of a full page back as
+    ?cursor=, which seeks past it instead of scanning and skipping like offset.
+
+    Row JSON is returned by default. Packed column JSON with epoch-ms
+    timestamps and Arrow IPC are available via ?format=columns|arrow or the
+    matching Accept media type.
     """
+    fmt = negotiate_format(accept, fmt)
+    if downsample is not None and downsample not in DOWNSAMPLERS:
+        raise HTTPException(status_code=400, detail=f"Unknown downsample '{downsample}', expected one of {sorted(DOWNSAMPLERS)}")
+    check_interval(interval)
+    return await run_db(query_binance_data, start_time, end_time, limit, offset, fmt, max_points, downsample, cursor, symbol, interval)
+
+def seek_bound(conn, table, conditions, lower, end_time, rows, step_ms):
+    """
+    Upper open_time bound that still covers the first `rows` rows from `lower`,
+    or None if the query should stay open-ended. `conditions` are the query's
+    (sql, value) filters. With a filter on the table,
+    DuckDB reads every matching row group for ORDER BY ... LIMIT, so bounding
+    the range is what makes deep pages cheap. Rows are at least step_ms apart;
+    the window is widened when gaps in the data leave it short.
+    """
+    bound = lower + rows * step_ms
+    sql, params = where(conditions)
+    while bound < end_time:
+        with stage("query"):
+            count = conn.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE {sql} AND open_time <= ?", params + [bound]
+            ).fetchone()[0]
+        if count >= rows:
+            return bound
+        bound = lower + 2 * (bound - lower)
+    return None
+
+def query_binance_data(start_time, end_time, limit, offset, fmt="rows", max_points=None, downsample=None, cursor=None,
+                       symbol=settings.DEFAULT_SYMBOL, interval=settings.DEFAULT_INTERVAL):
+    """Blocking part of read_binance_data, runs on the DuckDB thread pool."""
     start = time.time()
-    conn = get_db_connection()
-    try:
-        # Set a default end time to current time
-        if end_time is None:
-            end_time = int(time.time() * 1000)  # Current time in ms
+    with get_db_connection() as conn:
+        try:
+            # Set a default end time to current time
+            if end_time is None:
+                end_time = int(time.time() * 1000)  # Current time in ms
             
-        # Make sure end_time is not in the future
-        current_time = int(time.time() * 1000)
-        if end_time > current_time:
-            end_time = current_time
+            # Make sure end_time is not in the future
+            current_time = int(time.time() * 1000)
+            if end_time > current_time:
+                end_time = current_time
             
-        # For "all" time range, ensure we get earliest data
-        if start_time is not None and start_time < 1000000000000:  # Very old timestamp likely an error
-            # Set to Bitcoin's genesis approximate time
-            start_time = int(datetime(2017, 1, 1).timestamp() * 1000)
+            # For "all" time range, ensure we get earliest data
+            if start_time is not None and start_time < 1000000000000:  # Very old timestamp likely an error
+                # Set to Bitcoin's genesis approximate time
+                start_time = int(datetime(2017, 1, 1).timestamp() * 1000)
             
-        # Print the actual datetime for debugging
-        print(f"Processed request with start_time: {datetime.fromtimestamp(start_time/1000).isoformat() if start_time else 'None'}")
-        print(f"Processed request with end_time: {datetime.fromtimestamp(end_time/1000).isoformat() if end_time else 'None'}")
+            # Log the actual datetime for debugging
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Processed request with start_time: %s", datetime.fromtimestamp(start_time/1000).isoformat() if start_time else None)
+                logger.debug("Processed request with end_time: %s", datetime.fromtimestamp(end_time/1000).isoformat() if end_time else None)
         
-        # Optimized query with index hints and reduced columns when possible
-        query = """
-        SELECT 
-            open_time,
-            open_price,
-            high,
-            low,
-            close,
-            volume,
-            close_time,
-            quote_asset_volume,
-            ntrades,
-            taker_buy_base_asset_volume,
-            taker_buy_quote_asset_volume,
-            ignore
-        FROM BinanceData
-        """
-        conditions = []
+            # Optimized query with index hints and reduced columns when possible
+            query = f"""
+            SELECT {KLINE_COLUMNS}
+            FROM BinanceData
+            """
+            series = series_conditions(conn, symbol, interval)
+            conditions = list(series)
 
-        if start_time is not None:
-            conditions.append(f"open_time >= {start_time}")
+            if start_time is not None:
+                conditions.append(("open_time >= ?", start_time))
         
-        if end_time is not None:
-            conditions.append(f"open_time <= {end_time}")
+            if end_time is not None:
+                conditions.append(("open_time <= ?", end_time))
 
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
+            # Keyset pagination: rows are ordered by open_time, so seek past the previous page
+            seek = ("open_time > ?", cursor) if cursor is not None else None
+            if seek:
+                conditions.append(seek)
 
-        # Add dynamic resampling based on time range to reduce data points for large ranges
-        if start_time is not None and end_time is not None:
-            range_size = end_time - start_time
-            print(f"Range size: {range_size / (24 * 60 * 60 * 1000):.2f} days")
-            
-            # For very large ranges, consider resampling/aggregating data
-            if range_size > 90 * 24 * 60 * 60 * 1000:  # More than 90 days
-                print("Using resampled data for large time range")
-                # Create a temp view with resampled data for large ranges
-                if range_size > 365 * 24 * 60 * 60 * 1000:  # More than 1 year
-                    interval = '1 day'
-                elif range_size > 90 * 24 * 60 * 60 * 1000:  # More than 90 days
-                    interval = '4 hours'
-                else:
-                    interval = '1 hour'
-                
-                try:
-                    conn.execute(f"""
-                    CREATE OR REPLACE TEMP VIEW resampled_data AS
-                    SELECT 
-                        MIN(open_time) AS open_time,
-                        FIRST(open_price) AS open_price,
-                        MAX(high) AS high,
-                        MIN(low) AS low,
-                        LAST(close) AS close,
-                        SUM(volume) AS volume,
-                        MAX(close_time) AS close_time,
-                        SUM(quote_asset_volume) AS quote_asset_volume,
-                        SUM(ntrades) AS ntrades,
-                        SUM(taker_buy_base_asset_volume) AS taker_buy_base_asset_volume,
-                        SUM(taker_buy_quote_asset_volume) AS taker_buy_quote_asset_volume,
-                        NULL AS ignore
-                    FROM BinanceData
-                    WHERE {" AND ".join(conditions)}
-                    GROUP BY time_bucket(INTERVAL '{interval}', to_timestamp(open_time/1000))
-                    ORDER BY open_time
-                    """)
-                    
-                    query = """
-                    SELECT 
-                        open_time,
-                        open_price,
-                        high,
-                        low,
-                        close,
-                        volume,
-                        close_time,
-                        quote_asset_volume,
-                        ntrades,
-                        taker_buy_base_asset_volume,
-                        taker_buy_quote_asset_volume,
-                        ignore
-                    FROM resampled_data
-                    """
-                except Exception as e:
-                    print(f"Error in resampling: {e}")
-                    # Fall back to non-resampled query if resampling fails
-                    pass
-
-        query += f" ORDER BY open_time LIMIT {limit} OFFSET {offset}"
-        
-        # Print query for debugging
-        print(f"Executing query: {query}")
+            sql, params = where(conditions)
+            query += " WHERE " + sql
 
-        df = conn.execute(query).fetchdf()
-        
-        # Convert timestamps to ISO format strings after fetching data
-        if not df.empty:
-            df['open_time'] = df['open_time'].apply(lambda x: datetime.fromtimestamp(x/1000).isoformat())
-            df['close_time'] = df['close_time'].apply(lambda x: datetime.fromtimestamp(x/1000).isoformat())
+            target_points = max_points or settings.CHART_TARGET_POINTS
+            table, bucket_ms, bucket_expr = BASE_TABLE, INTERVALS_MS[interval], None
+            if downsample is not None:
+                # Pick whole rows along the close price instead of aggregating candles
+                with stage("query"):
+                    points = conn.execute(
+                        f"SELECT open_time, close FROM BinanceData WHERE {sql} ORDER BY open_time", params
+                    ).fetchnumpy()
+                keep = DOWNSAMPLERS[downsample](points["open_time"], points["close"], target_points)
+                logger.debug("Downsampled %d points to %d with %s", len(points["open_time"]), len(keep), downsample)
+                query += " AND open_time IN (SELECT UNNEST(?::BIGINT[]))"
+                params.append(np.asarray(points["open_time"])[keep].tolist())
+            elif start_time is not None or max_points is not None:
+                # Serve large ranges from a coarser resolution to reduce data points
+                range_start = start_time
+                if range_start is None:
+                    series_sql, series_params = where(series)
+                    with stage("query"):
+                        range_start = conn.execute(
+                            f"SELECT MIN(open_time) FROM BinanceData WHERE {series_sql}", series_params
+                        ).fetchone()[0] or end_time
+                range_size = end_time - range_start
+                logger.debug("Range size: %.2f days", range_size / (24 * 60 * 60 * 1000))
+
+                table, bucket_ms, bucket_expr = choose_resolution(
+                    range_size, target_points, available_rollups(conn, leased_database_id()), base_ms=bucket_ms
+                )
+                if table != BASE_TABLE:
+                    # Rollup rows are merged with the partial edge buckets grouped from the base table
+                    bucket_expr = bucket_expr or bucket_expression(bucket_ms)
+                if bucket_expr is not None:
+                    logger.debug("Aggregating %s into %d minute buckets", table, bucket_ms // 60000)
+                    inner, lower = conditions, range_start
+                    if seek:
+                        # Start at the cursor's bucket so it is not cut short, then skip past it
+                        lower = bucket_start(cursor, bucket_ms)
+                        inner = [c for c in conditions if c is not seek] + [("open_time >= ?", lower)]
+                    sql, params = where(inner)
+                    if table != BASE_TABLE:
+                        _, first, last = series_catalog(conn, leased_database_id()).series[(symbol, interval)]
+                        inner, params = exact_query(
+                            table, bucket_ms, sql, params, max(lower, range_start), end_time, KLINE_COLUMNS, first=first, last=last
+                        )
+                    else:
+                        inner = aggregate_query(bucket_expr, sql, table)
+                    query = f"SELECT * FROM ({inner}) AS resampled_data"
+                    if seek:
+                        query += f" WHERE {seek[0]}"
+                        params.append(seek[1])
+
+            lower = cursor if cursor is not None else start_time
+            if downsample is None and bucket_expr is None and lower is not None:
+                bound = seek_bound(conn, table, conditions, lower, end_time, offset + limit, bucket_ms)
+                if bound is not None:
+                    query += " AND open_time <= ?"
+                    params.append(bound)
+
+            query += " ORDER BY open_time LIMIT ? OFFSET ?"
+            params += [limit, offset]
         
-        results = [BinanceData(**item) for item in df.to_dict(orient="records")]
-        end = time.time()
+            # Log query for debugging; formatting the parameters is skipped unless enabled
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Executing query: %s with %s", query, [p if np.ndim(p) == 0 else f"<{len(p)} values>" for p in params])
+
+            # A cursor is the open_time of the last row or candle, where the seek
+            # above resumes. Downsampled rows are picked over the whole range, so
+            # resuming from one would pick a different set: those pages get none.
+            page_limit = limit if downsample is None else None
+            with stage("query"):
+                result = conn.execute(query, params)
+            if fmt != "rows":
+                response = format_response(result, fmt, page_limit)
+                logger.debug("Query executed in %.2f seconds, returned %d bytes of %s", time.time() - start, len(response.body), fmt)
+                return response
+
+            # Timestamps are converted column-wise and the rows are written out
+            # directly, matching the BinanceData response model byte for byte
+            with stage("fetch"):
+                columns = result.fetchnumpy()
+            results = kline_rows(columns, BinanceData)
+            end = time.time()
         
-        if len(results) > 0:
-            print(f"First record date: {results[0].open_time}")
-            print(f"Last record date: {results[-1].open_time}")
+            if len(results) > 0:
+                logger.debug("First record date: %s", results[0]["open_time"])
+                logger.debug("Last record date: %s", results[-1]["open_time"])
             
-        print(f"Query executed in {end-start:.2f} seconds, returned {len(results)} records")
-        return results
+            logger.debug("Query executed in %.2f seconds, returned %d records", end - start, len(results))
+            last_open_time = columns["open_time"][-1] if results else None
+            return set_next_cursor(json_response(results), len(results), last_open_time, page_limit)
 
-    except Exception as e:
-        print(f"Error in read_binance_data: {e}")
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception("Error in read_binance_data: %s", e)
+            raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/binance_data/export")
+async def export_binance_data(
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    fmt: str = Query("ndjson", alias="format"),
+    batch_size: int = Query(settings.EXPORT_BATCH_ROWS, ge=1, le=1000000),
+    symbol: str = settings.DEFAULT_SYMBOL,
+    interval: str = settings.DEFAULT_INTERVAL,
+):
+    """
+    Streams every candle of a series in the range as NDJSON, CSV or an Arrow
+    IPC stream, with epoch-ms timestamps. Rows are read batch_size at a time and
+    the next batch is only read once the previous one has been sent, so memory
+    use does not grow with the range.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{fmt}', expected one of {sorted(EXPORT_FORMATS)}")
+    check_interval(interval)
+    encoder = ExportEncoder(fmt)
+    if end_time is None:
+        end_time = int(time.time() * 1000)
+    # Checked up front so an unknown series is a 404 rather than a broken stream
+    await run_db(check_series, symbol, interval)
+    return StreamingResponse(
+        export_chunks(encoder, start_time, end_time, batch_size, symbol, interval),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="binancedata-{symbol}-{interval}.{fmt}"'},
+    )
+
+def check_series(symbol, interval):
+    with get_db_connection() as conn:
+        series_conditions(conn, symbol, interval)
+
+async def export_chunks(encoder, start_time, end_time, batch_size, symbol, interval):
+    """Walks the range with keyset seeks, one DuckDB job per chunk, so no connection is held between chunks."""
+    cursor = start_time - 1 if start_time is not None else None
+    while True:
+        data, rows, last_open_time = await run_db(read_export_chunk, encoder, cursor, end_time, batch_size, symbol, interval)
+        if data:
+            yield data
+        if rows < batch_size:
+            break
+        cursor = last_open_time
+    tail = encoder.finish()
+    if tail:
+        yield tail
+
+def read_export_chunk(encoder, cursor, end_time, batch_size, symbol=settings.DEFAULT_SYMBOL, interval=settings.DEFAULT_INTERVAL):
+    """Blocking part of export_binance_data: reads and encodes the batch_size rows after cursor."""
+    with get_db_connection() as conn:
+        try:
+            conditions = series_conditions(conn, symbol, interval) + [("open_time <= ?", end_time)]
+            if cursor is None:
+                # Start from the first row so even the first chunk is a bounded seek
+                sql, params = where(conditions)
+                with stage("query"):
+                    first = conn.execute(f"SELECT MIN(open_time) FROM BinanceData WHERE {sql}", params).fetchone()[0]
+                cursor = first - 1 if first is not None else None
+            if cursor is not None:
+                conditions.append(("open_time > ?", cursor))
+                bound = seek_bound(conn, BASE_TABLE, conditions, cursor, end_time, batch_size, INTERVALS_MS[interval])
+                if bound is not None:
+                    conditions.append(("open_time <= ?", bound))
+
+            sql, params = where(conditions)
+            query = f"""
+            SELECT {KLINE_COLUMNS}
+            FROM BinanceData
+            WHERE {sql}
+            ORDER BY open_time
+            LIMIT ?
+            """
+            params.append(batch_size)
+            if encoder.fmt == "ndjson":
+                # DuckDB writes the JSON lines itself, much faster than per-row Python
+                query = f"SELECT open_time, to_json(k)::VARCHAR || chr(10) AS line FROM ({query}) AS k ORDER BY open_time"
+
+            with stage("query"):
+                result = conn.execute(query, params)
+            with stage("serialize"):
+                return encoder.encode(arrow_batches(result, batch_size))
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception("Error in export_binance_data: %s", e)
+            raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/series")
+async def list_series():
+    """Symbol/interval series in the database, with their row counts and first/last open_time."""
+    return await run_db(query_series)
+
+def query_series():
+    with get_db_connection() as conn:
+        return series_catalog(conn, leased_database_id()).listing()
+
+@app.get("/binance_data/batch")
+async def read_binance_data_batch(
+    symbols: str,
+    interval: str = settings.DEFAULT_INTERVAL,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    max_points: Optional[int] = Query(None, ge=2),
+    limit: int = Query(10000, ge=1),
+):
+    """
+    Klines of several symbols (comma-separated) at one interval in a single
+    query, as {symbol: packed columns} with epoch-ms timestamps. Like
+    /binance_data/, large ranges are served as coarser candles, the same
+    resolution for every symbol; limit applies per symbol.
+    """
+    names = list(dict.fromkeys(name.strip().upper() for name in symbols.split(",") if name.strip()))
+    if not names:
+        raise HTTPException(status_code=400, detail="No symbols given")
+    if len(names) > settings.BATCH_MAX_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BATCH_MAX_SYMBOLS} symbols per request")
+    check_interval(interval)
+    return await run_db(query_binance_data_batch, names, interval, start_time, end_time, max_points, limit)
+
+def query_binance_data_batch(symbols, interval, start_time, end_time, max_points, limit):
+    """Blocking part of read_binance_data_batch, runs on the DuckDB thread pool."""
+    start = time.time()
+    with get_db_connection() as conn:
+        try:
+            series = series_catalog(conn, leased_database_id())
+            missing = [symbol for symbol in symbols if series.conditions(symbol, interval) is None]
+            if missing:
+                raise HTTPException(status_code=404, detail=f"No data for {', '.join(missing)} {interval}")
+
+            if end_time is None:
+                end_time = int(time.time() * 1000)
+            if series.has_columns:
+                conditions = [("interval = ?", interval), ("symbol IN (SELECT UNNEST(?::VARCHAR[]))", symbols)]
+                keys, label = ("symbol",), []
+            else:
+                # A database without series columns holds only the default series
+                conditions, keys, label = [], (), [symbols[0]]
+            if start_time is not None:
+                conditions.append(("open_time >= ?", start_time))
+            conditions.append(("open_time <= ?", end_time))
+            sql, params = where(conditions)
+
+            table, bucket_expr = BASE_TABLE, None
+            if start_time is not None or max_points is not None:
+                range_start = start_time
+                if range_start is None:
+                    range_start = min(series.series[(symbol, interval)][1] for symbol in symbols)
+                table, bucket_ms, bucket_expr = choose_resolution(
+                    end_time - range_start,
+                    max_points or settings.CHART_TARGET_POINTS,
+                    available_rollups(conn, leased_database_id()),
+                    base_ms=INTERVALS_MS[interval],
+                )
+            if table != BASE_TABLE:
+                logger.debug("Aggregating %s into %d minute buckets for %d symbols", table, bucket_ms // 60000, len(symbols))
+                columns = "".join(f"{key}, " for key in keys) + KLINE_COLUMNS
+                spans = [series.series[(symbol, interval)] for symbol in symbols]
+                inner, params = exact_query(
+                    table, bucket_ms, sql, params, range_start, end_time, columns, keys,
+                    first=min(first for _, first, _ in spans), last=max(last for _, _, last in spans),
+                )
+            elif bucket_expr is not None:
+                logger.debug("Aggregating %s into %d minute buckets for %d symbols", table, bucket_ms // 60000, len(symbols))
+                inner = aggregate_query(bucket_expr, sql, table, keys)
+            else:
+                inner = f"SELECT {''.join(f'{key}, ' for key in keys)}{KLINE_COLUMNS} FROM {table} WHERE {sql}"
+
+            symbol_column = "? AS symbol, " if label else ""
+            query = f"""
+            SELECT {symbol_column}* FROM ({inner}) AS k
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY open_time) <= ?
+            ORDER BY symbol, open_time
+            """
+            params = label + params + [limit]
+            with stage("query"):
+                result = conn.execute(query, params)
+            response = grouped_columns_response(result, "symbol", symbols)
+            logger.debug("Batch query for %d symbols executed in %.2f seconds, returned %d bytes", len(symbols), time.time() - start, len(response.body))
+            return response
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception("Error in read_binance_data_batch: %s", e)
+            raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/binance_data/{open_time}", response_model=BinanceData)
-async def read_single_binance_record(open_time: int):
-    """Retrieves a single Binance data record by open_time."""
-    conn = get_db_connection()
-    try:
-        query = f"""
-        SELECT 
-            open_time,
-            open_price,
-            high,
-            low,
-            close,
-            volume,
-            close_time,
-            quote_asset_volume,
-            ntrades,
-            taker_buy_base_asset_volume,
-            taker_buy_quote_asset_volume,
-            ignore
-        FROM BinanceData
-        WHERE open_time = {open_time}
-        """
-        df = conn.execute(query).fetchdf()
+async def read_single_binance_record(
+    open_time: int,
+    symbol: str = settings.DEFAULT_SYMBOL,
+    interval: str = settings.DEFAULT_INTERVAL,
+):
+    """Retrieves a single Binance data record of a series by open_time."""
+    check_interval(interval)
+    return await run_db(query_single_binance_record, open_time, symbol, interval)
 
-        if df.empty:
-            raise HTTPException(status_code=404, detail="Record not found")
+def query_single_binance_record(open_time, symbol=settings.DEFAULT_SYMBOL, interval=settings.DEFAULT_INTERVAL):
+    """Blocking part of read_single_binance_record, runs on the DuckDB thread pool."""
+    with get_db_connection() as conn:
+        try:
+            sql, params = where(series_conditions(conn, symbol, interval) + [("open_time = ?", open_time)])
+            query = f"""
+            SELECT {KLINE_COLUMNS}
+            FROM BinanceData
+            WHERE {sql}
+            """
+            with stage("query"):
+                result = conn.execute(query, params)
+            with stage("fetch"):
+                columns = result.fetchnumpy()
+            results = kline_rows(columns, BinanceData)
 
-        # Convert timestamps to ISO format strings
-        df['open_time'] = df['open_time'].apply(lambda x: datetime.fromtimestamp(x/1000).isoformat())
-        df['close_time'] = df['close_time'].apply(lambda x: datetime.fromtimestamp(x/1000).isoformat())
+            if not results:
+                raise HTTPException(status_code=404, detail="Record not found")
 
-        return BinanceData(**df.iloc[0].to_dict())
+            return json_response(results[0])
 
-    except Exception as e:
-        print(f"Error in read_single_binance_record: {e}")
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception("Error in read_single_binance_record: %s", e)
+            raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Per-stage and per-route latency histograms in the Prometheus text format."""
+    if metrics.prom is None:
+        raise HTTPException(status_code=501, detail="Metrics require prometheus-client on the server")
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
 
 @app.get("/health")
 async def health_check():
     """Simple health check endpoint."""
     return {"status": "OK"}
 
+@app.get("/db_pool_stats")
+async def db_pool_stats():
+    """Connection pool wait time and checkout metrics."""
+    return db_pool.stats()
+
+@app.get("/worker_stats")
+async def worker_stats():
+    """Queue depth and throughput of the DuckDB and inference thread pools."""
+    return {
+        "duckdb": db_executor.stats(),
+        "inference": inference_executor.stats(),
+        "inference_batches": analysis_batcher.stats(),
+    }
+
+@app.get("/model_stats")
+async def model_stats():
+    """Load time, warmup time and resident memory of the analysis model (and the draft model, if configured)."""
+    return {
+        **model_registry.stats(),
+        "draft": draft_registry.stats() if draft_registry is not None else None,
+        "prompt_cache": prompt_cache.stats(),
+    }
+
+@app.get("/analysis_cache_stats")
+async def analysis_cache_stats():
+    """Hit, miss and eviction counters of the analysis result cache."""
+    return analysis_cache.stats()
+
+@app.get("/analysis_stream_stats")
+async def analysis_stream_stats():
+    """Streamed analyses and their recent times to first token."""
+    return stream_stats.stats()
+
+@app.get("/summary_index_stats")
+async def summary_index_stats():
+    """Size and build/append counters of the price summary index of each series."""
+    return {f"{symbol} {interval}": index.stats() for (symbol, interval), index in list(summary_indexes.items())}
+
+SUMMARY_TIMEFRAMES = ("1d", "7d", "1m", "3m", "all")
+
+def timeframe_start(timeframe, now):
+    """Start of a /price_summary timeframe ending at `now`; unknown timeframes fall back to 1d."""
+    if timeframe == "1d":
+        return now - 24 * 60 * 60 * 1000
+    elif timeframe == "7d":
+        return now - 7 * 24 * 60 * 60 * 1000
+    elif timeframe == "1m":
+        return now - 30 * 24 * 60 * 60 * 1000
+    elif timeframe == "3m":
+        return now - 90 * 24 * 60 * 60 * 1000
+    elif timeframe == "all":
+        # Use a timestamp from 2017 for "all" data
+        return int(datetime(2017, 1, 1).timestamp() * 1000)
+    return now - 24 * 60 * 60 * 1000
+
+def summarize(index, start_time, end_time, timeframe):
+    """Summary response for one range from a series' index, or None when it holds no candles."""
+    result = index.summary(start_time, end_time)
+    if result is None:
+        return None
+    price_change = result["last_price"] - result["first_price"]
+    first_price = result["first_price"]
+    return {
+        **result,
+        "price_change": price_change,
+        "price_change_percent": (price_change / first_price * 100) if first_price != 0 else 0,
+        "timeframe": timeframe,
+    }
+
 @app.get("/price_summary")
-async def price_summary(timeframe: str = "7d"):
-    """Get price summary statistics for a specified timeframe."""
-    conn = get_db_connection()
+async def price_summary(
+    timeframe: str = "7d",
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    symbol: str = settings.DEFAULT_SYMBOL,
+    interval: str = settings.DEFAULT_INTERVAL,
+):
+    """
+    Get price summary statistics of a series for a specified timeframe, or for
+    an explicit [start_time, end_time] range when start_time is given.
+    """
+    check_interval(interval)
+    return await run_db(query_price_summary, timeframe, start_time, end_time, symbol, interval)
+
+@app.get("/price_summary/batch")
+async def price_summary_batch(
+    timeframes: str = ",".join(SUMMARY_TIMEFRAMES),
+    symbol: str = settings.DEFAULT_SYMBOL,
+    interval: str = settings.DEFAULT_INTERVAL,
+):
+    """Price summaries for several comma-separated timeframes in one call, null where there is no data."""
+    names = [name.strip() for name in timeframes.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SUMMARY_TIMEFRAMES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown timeframes {unknown}, expected some of {list(SUMMARY_TIMEFRAMES)}")
+    check_interval(interval)
+    return await run_db(query_price_summary_batch, names, symbol, interval)
+
+def refresh_summary_index(symbol, interval):
+    """Brings the summary index of a series up to date with the current database file and returns it."""
+    with get_db_connection() as conn:
+        database_id = leased_database_id()
+        conditions = series_conditions(conn, symbol, interval)
+        with summary_indexes_lock:
+            index = summary_indexes.get((symbol, interval))
+            if index is None or index.conditions != conditions:
+                index = summary_indexes[(symbol, interval)] = SummaryIndex(conditions)
+            summary_indexes.move_to_end((symbol, interval))
+        with stage("query"):
+            index.refresh(conn, database_id, SeriesLog(conn, symbol, interval) if conditions else None)
+    evict_summary_indexes(keep=(symbol, interval))
+    return index
+
+def evict_summary_indexes(keep):
+    """Drops the least recently used indexes other than `keep` until they fit in SUMMARY_INDEX_MEMORY_MB."""
+    budget = settings.SUMMARY_INDEX_MEMORY_MB * 2 ** 20
+    with summary_indexes_lock:
+        total = sum(index.nbytes for index in summary_indexes.values())
+        for key in list(summary_indexes):
+            if total <= budget:
+                break
+            if key != keep:
+                total -= summary_indexes.pop(key).nbytes
+                logger.info("Dropped the summary index of %s %s to stay within %d MB", *key, settings.SUMMARY_INDEX_MEMORY_MB)
+
+def query_price_summary(timeframe, start_time=None, end_time=None, symbol=settings.DEFAULT_SYMBOL, interval=settings.DEFAULT_INTERVAL):
+    """Blocking part of price_summary, runs on the DuckDB thread pool."""
     try:
+        index = refresh_summary_index(symbol, interval)
         now = int(time.time() * 1000)
-        
-        # Determine start time based on timeframe
-        if timeframe == "1d":
-            start_time = now - 24 * 60 * 60 * 1000
-        elif timeframe == "7d":
-            start_time = now - 7 * 24 * 60 * 60 * 1000
-        elif timeframe == "1m":
-            start_time = now - 30 * 24 * 60 * 60 * 1000
-        elif timeframe == "3m":
-            start_time = now - 90 * 24 * 60 * 60 * 1000
-        elif timeframe == "all":
-            # Use a timestamp from 2017 for "all" data
-            start_time = int(datetime(2017, 1, 1).timestamp() * 1000)
-        else:
-            start_time = now - 24 * 60 * 60 * 1000
-        
-        print(f"Price summary from {datetime.fromtimestamp(start_time/1000).isoformat()} to {datetime.fromtimestamp(now/1000).isoformat()}")
-            
-        query = f"""
-        SELECT 
-            MIN(low) AS min_price,
-            MAX(high) AS max_price,
-            FIRST(open_price) AS first_price,
-            LAST(close) AS last_price,
-            SUM(volume) AS total_volume,
-            COUNT(*) AS data_points
-        FROM BinanceData
-        WHERE open_time >= {start_time} AND open_time <= {now}
-        """
-        
-        result = conn.execute(query).fetchone()
-        
-        if result and result[0] is not None:
-            first_price = float(result[2])
-            last_price = float(result[3])
-            price_change = last_price - first_price
-            price_change_percent = (price_change / first_price * 100) if first_price != 0 else 0
-            
-            return {
-                "min_price": float(result[0]),
-                "max_price": float(result[1]),
-                "first_price": first_price,
-                "last_price": last_price,
-                "price_change": price_change,
-                "price_change_percent": price_change_percent,
-                "total_volume": float(result[4]),
-                "data_points": int(result[5]),
-                "timeframe": timeframe
-            }
+        if start_time is not None:
+            timeframe = "custom"
         else:
-            raise HTTPException(status_code=404, detail="No data available for selected timeframe")
-        
+            start_time = timeframe_start(timeframe, now)
+        if end_time is None:
+            end_time = now
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Price summary from %s to %s", datetime.fromtimestamp(start_time/1000).isoformat(), datetime.fromtimestamp(end_time/1000).isoformat())
+
+        result = summarize(index, start_time, end_time, timeframe)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in price_summary: {e}")
-        traceback.print_exc()
+        logger.exception("Error in price_summary: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if result is None:
+        raise HTTPException(status_code=404, detail="No data available for selected timeframe")
+    return result
+
+def query_price_summary_batch(timeframes, symbol=settings.DEFAULT_SYMBOL, interval=settings.DEFAULT_INTERVAL):
+    """Blocking part of price_summary_batch: one index refresh, then one lookup per timeframe."""
+    try:
+        index = refresh_summary_index(symbol, interval)
+        now = int(time.time() * 1000)
+        return {name: summarize(index, timeframe_start(name, now), now, name) for name in timeframes}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error in price_summary_batch: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
 
 class AnalysisRequest(BaseModel):
     timeframe: str = "7d"  # Default to 7 days
     end_date: Optional[str] = None
+    symbol: str = settings.DEFAULT_SYMBOL
+    interval: str = settings.DEFAULT_INTERVAL
+    profile: Optional[str] = None  # generation profile, GENERATION_PROFILE by default
+    max_new_tokens: Optional[int] = Field(None, ge=1, le=settings.GENERATION_MAX_NEW_TOKENS_LIMIT)
     
 class AnalysisResponse(BaseModel):
     analysis: str
     timeframe: str
+    symbol: str
+    interval: str
     generated_at: str
     execution_time: float
+    profile: str
+    generation_time: Optional[float] = None  # seconds spent in generate for this analysis' batch
+    generated_tokens: Optional[int] = None
+    tokens_per_second: Optional[float] = None
+
+def analysis_options(request):
+    """The generation profile and token budget of an analysis request."""
+    profile = request.profile or settings.GENERATION_PROFILE
+    if profile not in PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown profile '{profile}', expected one of {sorted(PROFILES)}")
+    if profile == "speculative" and draft_registry is None:
+        raise HTTPException(status_code=400, detail="The speculative profile needs DRAFT_MODEL_ID or DRAFT_MODEL_PATH")
+    return profile, request.max_new_tokens or settings.GENERATION_MAX_NEW_TOKENS
+
+def analysis_window(request):
+    """
+    The (start_time_ms, end_time_ms, period_desc) of an analysis request.
+    Unknown timeframes fall back to 1d, and request.timeframe is updated to match.
+    """
+    # Use provided end date or default to Dec 31, 2024
+    if request.end_date:
+        try:
+            end_date_obj = datetime.fromisoformat(request.end_date.replace('Z', '+00:00'))
+            endDate = int(end_date_obj.timestamp() * 1000)
+        except ValueError:
+            # If invalid date format, use default
+            endDate = int(datetime(2024, 12, 31, 23, 59, 59).timestamp() * 1000)
+    else:
+        endDate = int(datetime(2024, 12, 31, 23, 59, 59).timestamp() * 1000)
+    
+    if request.timeframe == "1d":
+        start_time_ms = endDate - 24 * 60 * 60 * 1000
+        period_desc = "last 24 hours"
+    elif request.timeframe == "3d":
+        start_time_ms = endDate - 3 * 24 * 60 * 60 * 1000
+        period_desc = "last 3 days"
+    elif request.timeframe == "7d":
+        start_time_ms = endDate - 7 * 24 * 60 * 60 * 1000
+        period_desc = "last 7 days"
+    else:
+        # Default to 24 hours if invalid timeframe
+        start_time_ms = endDate - 24 * 60 * 60 * 1000
+        period_desc = "last 24 hours"
+        request.timeframe = "1d"
+    return start_time_ms, endDate, period_desc
+
+async def analysis_inputs(request):
+    """Loads and checks the statistics for an analysis request; returns (prompt, cache_key)."""
+    start_time_ms, endDate, period_desc = analysis_window(request)
+    profile, max_new_tokens = analysis_options(request)
+    check_interval(request.interval)
+    
+    stats = await run_db(load_analysis_stats, start_time_ms, endDate, request.symbol, request.interval)
+    
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No data available for selected timeframe")
+    
+    # Check if we have enough data
+    if stats["data_points"] < 10:
+        raise HTTPException(status_code=400, detail="Insufficient data for meaningful analysis")
+    
+    # Identical requests share one cached (or in-flight) generation
+    cache_key = make_key(
+        timeframe=request.timeframe,
+        series=[request.symbol, request.interval],
+        window=[start_time_ms, endDate],
+        model=model_registry.source,
+        draft=draft_registry.source if profile == "speculative" else None,
+        generation=generation_kwargs(profile, max_new_tokens),
+        stats=stats,
+    )
+    return analysis_prompt(stats, period_desc, asset_name(request.symbol)), cache_key
 
 @app.post("/crypto_analysis/", response_model=AnalysisResponse)
 async def generate_crypto_analysis(request: AnalysisRequest, background_tasks: BackgroundTasks):
     """Generate AI analysis of crypto data for specified timeframe"""
     start_time = time.time()
+    profile, max_new_tokens = analysis_options(request)
     
-        # Use provided end date or default to Dec 31, 2024
-        
     try:
-        if request.end_date:
-            try:
-                end_date_obj = datetime.fromisoformat(request.end_date.replace('Z', '+00:00'))
-                endDate = int(end_date_obj.timestamp() * 1000)
-            except ValueError:
-                # If invalid date format, use default
-                endDate = int(datetime(2024, 12, 31, 23, 59, 59).timestamp() * 1000)
-        else:
-            endDate = int(datetime(2024, 12, 31, 23, 59, 59).timestamp() * 1000)
-        # Use the same fixed date approach that works in the charts
-        startDate = int(datetime(2017, 1, 1).timestamp() * 1000)
-        
-        if request.timeframe == "1d":
-            start_time_ms = endDate - 24 * 60 * 60 * 1000
-            period_desc = "last 24 hours"
-        elif request.timeframe == "3d":
-            start_time_ms = endDate - 3 * 24 * 60 * 60 * 1000
-            period_desc = "last 3 days"
-        elif request.timeframe == "7d":
-            start_time_ms = endDate - 7 * 24 * 60 * 60 * 1000
-            period_desc = "last 7 days"
-        else:
-            # Default to 24 hours if invalid timeframe
-            start_time_ms = endDate - 24 * 60 * 60 * 1000
-            period_desc = "last 24 hours"
-            request.timeframe = "1d"
-        
-        # Query data from DuckDB with the fixed date approach
-        conn = get_db_connection()
-        
-        query = f"""
-        SELECT 
-            open_time,
-            open_price,
-            high,
-            low,
-            close,
-            volume
-        FROM BinanceData
-        WHERE open_time >= {start_time_ms} AND open_time <= {endDate}
-        ORDER BY open_time
-        """
-        
-        print(f"Executing query for AI analysis: {query}")
-        df = conn.execute(query).fetchdf()
-        conn.close()
-        
-        if df.empty:
-            raise HTTPException(status_code=404, detail="No data available for selected timeframe")
-        
-        # Convert timestamps to datetime
-        df['open_time'] = df['open_time'].apply(lambda x: datetime.fromtimestamp(x/1000))
-        
-        # Prepare data for AI analysis
-        df['return'] = df['close'].pct_change()
+        prompt, cache_key = await analysis_inputs(request)
         
-        # Check if we have enough data
-        if len(df) < 10:
-            raise HTTPException(status_code=400, detail="Insufficient data for meaningful analysis")
+        async def generate():
+            # Generate AI analysis
+            generated = await run_analysis(prompt, profile, max_new_tokens)
+            # Add cleanup task to run in background after response is sent
+            background_tasks.add_task(cleanup_gpu_memory)
+            return {**generated, "generated_at": datetime.now().isoformat()}
         
-        # Generate AI analysis
-        analysis = run_ai_model(df, period_desc)
-        
-        # Add cleanup task to run in background after response is sent
-        background_tasks.add_task(cleanup_gpu_memory)
+        try:
+            result = await analysis_cache.get_or_compute(cache_key, generate)
+        except HTTPException:
+            raise
+        except Exception as e:
+            # Model failures are reported in the analysis text and never cached
+            result = {
+                "analysis": f"An error occurred while generating the analysis: {str(e)}",
+                "generated_at": datetime.now().isoformat(),
+            }
         
         end_time = time.time()
         execution_time = end_time - start_time
         
         return {
-            "analysis": analysis,
+            "analysis": result["analysis"],
             "timeframe": request.timeframe,
-            "generated_at": datetime.now().isoformat(),
-            "execution_time": execution_time
+            "symbol": request.symbol,
+            "interval": request.interval,
+            "generated_at": result["generated_at"],
+            "execution_time": execution_time,
+            "profile": profile,
+            "generation_time": result.get("generation_time"),
+            "generated_tokens": result.get("generated_tokens"),
+            "tokens_per_second": result.get("tokens_per_second"),
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in generate_crypto_analysis: {e}")
-        traceback.print_exc()
+        logger.exception("Error in generate_crypto_analysis: %s", e)
         # Ensure cleanup happens even if there's an error
         cleanup_gpu_memory()
         raise HTTPException(status_code=500, detail=str(e))
 
-def run_ai_model(df, period_desc):
-    """Run the AI model on the provided data and return analysis"""
+@app.post("/crypto_analysis/stream")
+async def stream_crypto_analysis(request: AnalysisRequest):
+    """
+    Streams the analysis as Server-Sent Events while it is generated: `data`
+    events carry pieces of text, then one `done` event carries the timings
+    (or an `error` event the failure). Cached analyses are sent in one piece.
+    """
+    start_time = time.time()
+    profile, max_new_tokens = analysis_options(request)
+    if PROFILES[profile].get("num_beams", 1) > 1:
+        raise HTTPException(status_code=400, detail=f"The {profile} profile cannot be streamed")
+    
     try:
-        # Clear any existing GPU memory
-        torch.cuda.empty_cache()
-        
-        # Check if CUDA is available
-        device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
-        print(f"Using device: {device}")
-        
-        # Load model and tokenizer
-        tokenizer = AutoTokenizer.from_pretrained("unsloth/DeepSeek-R1-Distill-Qwen-1.5B-bnb-4bit")
-        model = AutoModelForCausalLM.from_pretrained(
-            "unsloth/DeepSeek-R1-Distill-Qwen-1.5B-bnb-4bit",
-            # trust_remote_code=True,
-            torch_dtype=torch.float16
-        ).to(device)
+        prompt, cache_key = await analysis_inputs(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error in stream_crypto_analysis: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    cached = await analysis_cache.lookup(cache_key)
+    if cached is not None:
+        events = cached_analysis_events(cached, request.timeframe, profile, start_time)
+    else:
+        events = analysis_events(prompt, request.timeframe, profile, max_new_tokens, cache_key, start_time)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def cached_analysis_events(result, timeframe, profile, start_time):
+    yield sse_event({"text": result["analysis"]})
+    yield sse_event({
+        "timeframe": timeframe,
+        "generated_at": result["generated_at"],
+        "execution_time": time.time() - start_time,
+        "profile": profile,
+        "cached": True,
+    }, event="done")
+
+async def analysis_events(prompt, timeframe, profile, max_new_tokens, cache_key, start_time):
+    """
+    Runs one streamed generation on the inference worker and relays its text.
+    If the client goes away, the generator is closed and the generation is
+    cancelled at its next token.
+    """
+    stream = AnalysisStream(asyncio.get_running_loop())
+    echo = EchoFilter()
+    stream_stats.started += 1
+    try:
+        future = inference_executor.submit(
+            generate_analyses, [prompt], generation_kwargs(profile, max_new_tokens),
+            draft=profile == "speculative", stream=stream,
+        )
+    except QueueFull as e:
+        stream_stats.failed += 1
+        yield sse_event({"detail": str(e)}, event="error")
+        return
+    future.add_done_callback(lambda _: stream.finish())
+    
+    first_token = None
+    finished = False
+    try:
+        async for text in stream.read():
+            if first_token is None:
+                # Timed at the first generated piece, even while EchoFilter still holds it back
+                first_token = time.time() - start_time
+                stream_stats.first_token(first_token)
+            text = echo.feed(text)
+            if text:
+                yield sse_event({"text": text})
+        tail = echo.finish()
+        if tail:
+            yield sse_event({"text": tail})
         
-        # Prepare the summary statistics
-        stats = {
-            "start_price": df['open_price'].iloc[0],
-            "end_price": df['close'].iloc[-1],
-            "price_change": df['close'].iloc[-1] - df['open_price'].iloc[0],
-            "price_change_pct": (df['close'].iloc[-1] / df['open_price'].iloc[0] - 1) * 100,
-            "max_price": df['high'].max(),
-            "min_price": df['low'].min(),
-            "avg_price": df['close'].mean(),
-            "volatility": df['return'].std() * 100,  # Standard deviation of returns as percentage
-            "total_volume": df['volume'].sum(),
-            "avg_volume": df['volume'].mean()
-        }
+        try:
+            result = future.result()[0]
+        except Exception as e:
+            stream_stats.failed += 1
+            finished = True
+            yield sse_event({"detail": f"An error occurred while generating the analysis: {str(e)}"}, event="error")
+            return
         
-        # Create prompt with data summary rather than raw data to save tokens
-        instruction_prompt = f"""
-        You are a senior financial analyst specializing in cryptocurrency markets. Analyze the following Bitcoin trading data for the {period_desc} and provide a comprehensive professional analysis of the market trends, risks, and price predictions. Your response should be structured as follows:
+        result["generated_at"] = datetime.now().isoformat()
+        await analysis_cache.set(cache_key, result)
+        stream_stats.completed += 1
+        finished = True
+        yield sse_event({
+            "timeframe": timeframe,
+            "generated_at": result["generated_at"],
+            "execution_time": time.time() - start_time,
+            "profile": profile,
+            "time_to_first_token": first_token,
+            "generation_time": result["generation_time"],
+            "generated_tokens": result["generated_tokens"],
+            "tokens_per_second": result["tokens_per_second"],
+        }, event="done")
+    finally:
+        if not finished:
+            # Client disconnected: stop generating at the next token
+            stream.cancel()
+            future.cancel()
+            stream_stats.cancelled += 1
+            logger.info("Analysis stream cancelled after %.2fs", time.time() - start_time)
+
+def load_analysis_stats(start_time_ms, end_time_ms, symbol=settings.DEFAULT_SYMBOL, interval=settings.DEFAULT_INTERVAL):
+    """
+    Summary statistics and indicators fed to the model for an analysis window
+    of a series, aggregated inside DuckDB. Runs on the DuckDB thread pool.
+    Returns None when the window has no data.
+    """
+    logger.debug("Executing query for AI analysis of %s %s from %s to %s", symbol, interval, start_time_ms, end_time_ms)
+    with get_db_connection() as conn:
+        conditions = series_conditions(conn, symbol, interval)
+        with stage("query"):
+            return window_stats(conn, start_time_ms, end_time_ms, conditions)
+
+def analysis_prompt(stats, period_desc, asset="Bitcoin"):
+    """Instruction prompt for one analysis, built from the summary statistics rather than raw data to save tokens."""
+    return f"""
+        You are a senior financial analyst specializing in cryptocurrency markets. Analyze the following {asset} trading data for the {period_desc} and provide a comprehensive professional analysis of the market trends, risks, and price predictions. Your response should be structured as follows:
 
         1. **Market Overview**:
            - Summarize the overall trend observed in the provided data.
@@ -468,7 +1108,7 @@ def run_ai_model(df, period_desc):
            - Summarize your findings in a concise paragraph.
 
         Data Summary for Analysis:
-        - Time Period: {df['open_time'].min().strftime('%Y-%m-%d %H:%M')} to {df['open_time'].max().strftime('%Y-%m-%d %H:%M')}
+        - Time Period: {stats['period_start']} to {stats['period_end']}
         - Starting Price: ${stats['start_price']:.2f}
         - Ending Price: ${stats['end_price']:.2f}
         - Price Change: ${stats['price_change']:.2f} ({stats['price_change_pct']:.2f}%)
@@ -478,57 +1118,126 @@ def run_ai_model(df, period_desc):
         - Volatility (Std Dev of Returns): {stats['volatility']:.2f}%
         - Total Trading Volume: {stats['total_volume']:.2f}
         - Average Daily Volume: {stats['avg_volume']:.2f}
+        - VWAP: ${stats['vwap']:.2f}
+        - ATR ({INDICATOR_PERIODS} periods): ${stats['atr']:.2f}
+        - RSI ({INDICATOR_PERIODS} periods): {stats['rsi']:.2f}
+        - Pivot Point: ${stats['pivot']:.2f}
+        - Support Levels: ${stats['support_1']:.2f}, ${stats['support_2']:.2f}
+        - Resistance Levels: ${stats['resistance_1']:.2f}, ${stats['resistance_2']:.2f}
 
         Provide your analysis in a professional tone, suitable for investors and traders. Ensure all insights are data-driven.
         """
+
+def clean_analysis(response):
+    """Strips any echoed prompt from a generated analysis."""
+    if "Data Summary for Analysis:" in response:
+        response = response.split("Data Summary for Analysis:")[1]
+        # Find the actual start of the analysis after the stats
+        analysis_markers = ["Market Overview", "1.", "Analysis:", "Based on"]
+        for marker in analysis_markers:
+            if marker in response:
+                response = response[response.find(marker):]
+                break
+    
+    return response.strip()
+
+def run_analysis_batch(items):
+    """
+    Batch function of analysis_batcher: runs the (job, stage timings) items
+    through run_ai_batch, counting the batch's stages towards every request in it.
+    """
+    with metrics.shared([timings for _, timings in items]):
+        return run_ai_batch([job for job, _ in items])
+
+def run_ai_batch(jobs):
+    """
+    Runs the AI model on a batch of (prompt, profile, max_new_tokens) jobs and
+    returns one result per job: the analysis with its generation time and
+    token counts. Jobs sharing a profile and budget are padded into a single
+    generate call; identical jobs are only generated once.
+    """
+    unique = list(dict.fromkeys(jobs))
+    groups = {}
+    for prompt, profile, max_new_tokens in unique:
+        groups.setdefault((profile, max_new_tokens), []).append(prompt)
+    
+    results = {}
+    for (profile, max_new_tokens), prompts in groups.items():
+        kwargs = generation_kwargs(profile, max_new_tokens)
+        if profile == "speculative":
+            # Assisted generation only handles one sequence at a time
+            for prompt in prompts:
+                results[(prompt, profile, max_new_tokens)] = generate_analyses([prompt], kwargs, draft=True)[0]
+        else:
+            for prompt, result in zip(prompts, generate_analyses(prompts, kwargs)):
+                results[(prompt, profile, max_new_tokens)] = result
+    return [results[job] for job in jobs]
+
+def generate_analyses(prompts, kwargs, draft=False, stream=None):
+    """
+    Runs one generate call over the padded prompts and decodes the analyses.
+    A streaming.AnalysisStream receives the text of a single prompt as it is generated.
+    """
+    try:
+        # Borrow the resident model, loading it only if it was never loaded or was idle-unloaded
+        with model_registry.use() as (tokenizer, model, device), \
+                (draft_registry.use() if draft else nullcontext((None, None, None))) as (_, assistant, _):
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            # Decoder-only models continue from the last position, so pad on the left
+            tokenizer.padding_side = "left"
+            
+            # Tokenize the inputs, reusing the cached instruction prefix
+            # (assisted generation does not take a prefilled cache)
+            with stage("tokenize"):
+                inputs = prompt_cache.encode(
+                    tokenizer, model, prompts, device, max_length=1024,
+                    use_cache=not draft, num_beams=kwargs.get("num_beams", 1),
+                )
+            
+            if stream is not None:
+                kwargs = {**kwargs, **stream.generate_kwargs(tokenizer)}
+            
+            # Generate the outputs
+            start = time.perf_counter()
+            with torch.no_grad():
+                outputs = model.generate(
+                    **inputs,
+                    pad_token_id=tokenizer.pad_token_id,
+                    assistant_model=assistant,
+                    **kwargs,
+                )
+            seconds = time.perf_counter() - start
+            metrics.record("generate", seconds)
+            
+            # Decode only the generated tokens, after the (padded) prompts
+            with stage("decode"):
+                generated = outputs[:, inputs["input_ids"].shape[1]:]
+                responses = [clean_analysis(text) for text in tokenizer.batch_decode(generated, skip_special_tokens=True)]
+                token_counts = (generated != tokenizer.pad_token_id).sum(dim=1).tolist()
         
-        # Tokenize the input
-        inputs = tokenizer(instruction_prompt, return_tensors="pt", max_length=1024, truncation=True).to(device)
-        
-        # Generate the output
-        with torch.no_grad():
-            outputs = model.generate(
-                inputs["input_ids"],
-                max_length=1024,  
-                min_length=256,
-                num_beams=5,
-                temperature=0.7,
-                no_repeat_ngram_size=3,
-                early_stopping=True,
-                repetition_penalty=1.2
-            )
-        
-        # Decode the output and remove the input prompt
-        response = tokenizer.decode(outputs[0], skip_special_tokens=True)
-        
-        # Clean up the response to remove the prompt
-        if "Data Summary for Analysis:" in response:
-            response = response.split("Data Summary for Analysis:")[1]
-            # Find the actual start of the analysis after the stats
-            analysis_markers = ["Market Overview", "1.", "Analysis:", "Based on"]
-            for marker in analysis_markers:
-                if marker in response:
-                    response = response[response.find(marker):]
-                    break
-        
-        return response.strip()
+        return [
+            {
+                "analysis": response,
+                "generation_time": seconds,
+                "generated_tokens": tokens,
+                "tokens_per_second": tokens / seconds if seconds > 0 else None,
+            }
+            for response, tokens in zip(responses, token_counts)
+        ]
         
     except Exception as e:
-        print(f"Error running AI model: {e}")
-        traceback.print_exc()
-        return f"An error occurred while generating the analysis: {str(e)}"
-    finally:
-        # Clean up resources
-        if 'model' in locals():
-            del model
-        if 'tokenizer' in locals():
-            del tokenizer
-        torch.cuda.empty_cache()
+        logger.exception("Error running AI model: %s", e)
+        raise
+
+def run_ai_model(stats, period_desc, profile=settings.GENERATION_PROFILE, max_new_tokens=settings.GENERATION_MAX_NEW_TOKENS):
+    """Run the AI model on the provided summary statistics and return analysis"""
+    return run_ai_batch([(analysis_prompt(stats, period_desc), profile, max_new_tokens)])[0]["analysis"]
 
 def cleanup_gpu_memory():
     """Clean up GPU memory after model usage"""
-    print("Cleaning up GPU memory...")
+    logger.debug("Cleaning up GPU memory...")
     gc.collect()
     if torch.cuda.is_available():
         torch.cuda.empty_cache()
-        print(f"GPU memory after cleanup: {torch.cuda.memory_allocated(0) / 1024 ** 2:.2f} MB")
\ No newline at end of file
+        logger.debug("GPU memory after cleanup: %.2f MB", torch.cuda.memory_allocated(0) / 1024 ** 2)
\ No newline at end of file
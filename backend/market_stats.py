@@ -0,0 +1,108 @@
+"""
+Summary statistics and indicators of an analysis window, computed by DuckDB
+in one aggregate so only a single row of scalars leaves the database.
+
+Returns are close-to-close percentage changes, as pandas' pct_change gives.
+ATR and RSI look at the last INDICATOR_PERIODS candles of the window and use
+simple averages (Cutler's RSI) instead of Wilder's recursive smoothing, which
+a single aggregate cannot express. Support and resistance are the classic
+floor-trader pivots of the window's high, low and last close.
+"""
+from datetime import datetime
+
+from queries import where
+from rollups import BASE_TABLE
+
+INDICATOR_PERIODS = 14
+
+STATS_QUERY = """
+WITH candles AS (
+    SELECT
+        open_time,
+        open_price,
+        high,
+        low,
+        close,
+        volume,
+        close / LAG(close) OVER w - 1 AS ret,
+        close - LAG(close) OVER w AS change,
+        GREATEST(high - low, ABS(high - LAG(close) OVER w), ABS(low - LAG(close) OVER w)) AS true_range,
+        ROW_NUMBER() OVER (ORDER BY open_time DESC) AS from_end
+    FROM {table}
+    WHERE {where}
+    WINDOW w AS (ORDER BY open_time)
+)
+SELECT
+    COUNT(*),
+    MIN(open_time),
+    MAX(open_time),
+    ARG_MIN(open_price, open_time),
+    ARG_MAX(close, open_time),
+    MAX(high),
+    MIN(low),
+    AVG(close),
+    STDDEV_SAMP(ret),
+    SUM(volume),
+    AVG(volume),
+    SUM((high + low + close) / 3 * volume) / NULLIF(SUM(volume), 0),
+    AVG(true_range) FILTER (WHERE from_end <= ?),
+    SUM(GREATEST(change, 0)) FILTER (WHERE from_end <= ?),
+    SUM(GREATEST(-change, 0)) FILTER (WHERE from_end <= ?)
+FROM candles
+"""
+
+
+def rsi(gains, losses):
+    """Relative strength index from summed gains and losses; 50 when the price did not move."""
+    if not gains and not losses:
+        return 50.0
+    return 100.0 * gains / (gains + losses)
+
+
+def pivots(high, low, close):
+    """Floor-trader pivot point with two support and two resistance levels."""
+    pivot = (high + low + close) / 3
+    return {
+        "pivot": pivot,
+        "support_1": 2 * pivot - high,
+        "support_2": pivot - (high - low),
+        "resistance_1": 2 * pivot - low,
+        "resistance_2": pivot + (high - low),
+    }
+
+
+def window_stats(conn, start_time, end_time, conditions=(), table=BASE_TABLE):
+    """
+    Statistics of the candles with start_time <= open_time <= end_time that
+    match the (sql, value) `conditions` (e.g. one symbol), or None when there
+    are none. Plain floats, so they can be hashed into the analysis cache key.
+    """
+    sql, params = where(list(conditions) + [("open_time >= ?", start_time), ("open_time <= ?", end_time)])
+    row = conn.execute(
+        STATS_QUERY.format(table=table, where=sql),
+        params + [INDICATOR_PERIODS] * 3,
+    ).fetchone()
+    (count, first_time, last_time, start_price, end_price, max_price, min_price, avg_price,
+     volatility, total_volume, avg_volume, vwap, atr, gains, losses) = row
+    if not count:
+        return None
+
+    return {
+        "period_start": datetime.fromtimestamp(first_time / 1000).strftime('%Y-%m-%d %H:%M'),
+        "period_end": datetime.fromtimestamp(last_time / 1000).strftime('%Y-%m-%d %H:%M'),
+        "data_points": count,
+        "start_price": float(start_price),
+        "end_price": float(end_price),
+        "price_change": float(end_price - start_price),
+        "price_change_pct": float((end_price / start_price - 1) * 100),
+        "max_price": float(max_price),
+        "min_price": float(min_price),
+        "avg_price": float(avg_price),
+        "volatility": float(volatility * 100) if volatility is not None else 0.0,  # std dev of returns as percentage
+        "total_volume": float(total_volume),
+        "avg_volume": float(avg_volume),
+        "vwap": float(vwap) if vwap is not None else float(avg_price),
+        "atr": float(atr),
+        "rsi": rsi(gains or 0.0, losses or 0.0),
+        **pivots(float(max_price), float(min_price), float(end_price)),
+    }
@@ -0,0 +1,158 @@
+"""
+Per-stage timings of the hot paths: Prometheus histograms for /metrics and a
+Server-Timing header on every response.
+
+Code times a stage with `with stage("query"):`. The timings of the request
+being served are collected in a context variable, which BoundedExecutor
+carries into its worker threads, so stages run on the DuckDB and inference
+pools count towards the request that submitted them. A batched generate call
+records into every request of the batch (see shared).
+
+    db_acquire   waiting for and checking out a pooled connection
+    query        DuckDB executing the statement
+    fetch        moving the result out of DuckDB (fetchnumpy, Arrow export)
+    timestamps   epoch milliseconds to ISO strings
+    serialize    encoding the response body
+    model_load   loading tokenizer and weights
+    tokenize     building the model inputs, including the prefix prefill
+    generate     model.generate
+    decode       token ids back to text
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+import settings
+
+try:
+    import prometheus_client as prom
+except ImportError:  # /metrics is optional
+    prom = None
+
+STAGES = ("db_acquire", "query", "fetch", "timestamps", "serialize", "model_load", "tokenize", "generate", "decode")
+
+# From sub-millisecond lookups up to minute-long generations
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+ENABLED = settings.METRICS_ENABLED
+
+if prom is not None and ENABLED:
+    STAGE_SECONDS = prom.Histogram(
+        "cryptoanalysis_stage_seconds", "Seconds spent in one stage of serving a request", ["stage"], buckets=BUCKETS,
+    )
+    REQUEST_SECONDS = prom.Histogram(
+        "cryptoanalysis_request_seconds", "Seconds from receiving a request to sending its response headers",
+        ["method", "route", "status"], buckets=BUCKETS,
+    )
+    # labels() takes a lock per call; the known stages are resolved once
+    _stage_children = {name: STAGE_SECONDS.labels(name) for name in STAGES}
+else:
+    STAGE_SECONDS = REQUEST_SECONDS = None
+    _stage_children = {}
+
+_timings = contextvars.ContextVar("stage_timings", default=None)
+
+
+def current():
+    """The (stage, seconds) list of the request being served, or None outside a request."""
+    return _timings.get()
+
+
+def record(name, seconds):
+    """Adds one stage duration to the histogram and to the current request's timings."""
+    child = _stage_children.get(name)
+    if child is None and STAGE_SECONDS is not None:
+        child = _stage_children[name] = STAGE_SECONDS.labels(name)
+    if child is not None:
+        child.observe(seconds)
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def stage(name):
+    """Times the with-block as stage `name`."""
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+class _Shared(list):
+    """Timings list that also appends to the lists of other requests."""
+
+    def __init__(self, targets):
+        super().__init__()
+        self.targets = targets
+
+    def append(self, item):
+        super().append(item)
+        for target in self.targets:
+            target.append(item)
+
+
+@contextmanager
+def shared(timings_lists):
+    """Within the block, stages count towards every one of `timings_lists` (None entries are skipped)."""
+    token = _timings.set(_Shared([timings for timings in timings_lists if timings is not None]))
+    try:
+        yield
+    finally:
+        _timings.reset(token)
+
+
+def server_timing(timings, total):
+    """Server-Timing header value: one entry per stage with its summed milliseconds, then the total."""
+    summed = {}
+    for name, seconds in timings:
+        summed[name] = summed.get(name, 0.0) + seconds
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in summed.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware that collects the stage timings of each HTTP request,
+    adds them as a Server-Timing header and records the request duration
+    under its route template (not the raw path, to bound the label values).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        timings = []
+        token = _timings.set(timings)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - start
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", server_timing(timings, total).encode("latin-1"))
+                ]
+                if REQUEST_SECONDS is not None:
+                    route = scope.get("route")
+                    REQUEST_SECONDS.labels(
+                        scope["method"], getattr(route, "path", "unmatched"), str(message["status"])
+                    ).observe(total)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+
+
+def render():
+    """(body, content type) of the Prometheus text exposition."""
+    return prom.generate_latest(), prom.CONTENT_TYPE_LATEST
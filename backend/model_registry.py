@@ -0,0 +1,181 @@
+"""Keeps the analysis LLM resident between requests instead of reloading it every call."""
+import gc
+import logging
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+import torch
+from transformers import AutoTokenizer, AutoModelForCausalLM
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def resident_memory_bytes():
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # No procfs (e.g. macOS): fall back to the peak, reported in bytes there
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class ModelRegistry:
+    """
+    Loads the tokenizer and model once and hands them out to inference jobs.
+    Optionally runs a warmup generation after loading and unloads the model
+    again after it has been idle for idle_unload_seconds (0 keeps it forever).
+    """
+
+    def __init__(self, model_id, local_path="", dtype="float16", warmup=False, idle_unload_seconds=0):
+        self.model_id = model_id
+        self.local_path = local_path
+        self.dtype = getattr(torch, dtype)
+        self.warmup = warmup
+        self.idle_unload_seconds = idle_unload_seconds
+        self.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+
+        self.tokenizer = None
+        self.model = None
+        self._lock = threading.RLock()
+        self._active = 0
+        self._last_used = time.monotonic()
+        self._stop = threading.Event()
+        self._watcher = None
+
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.loads = 0
+        self.unloads = 0
+        self.rss_before_load = None
+        self.rss_after_load = None
+
+    @property
+    def source(self):
+        """Where the weights come from: a local directory if configured, else the hub id."""
+        return self.local_path or self.model_id
+
+    @property
+    def loaded(self):
+        return self.model is not None
+
+    def start(self):
+        """Preloads the model before the first request needs it."""
+        self.load()
+
+    def shutdown(self):
+        self._stop.set()
+        self.unload()
+
+    def load(self):
+        """Loads tokenizer and model unless they are already resident."""
+        with self._lock:
+            if self.loaded:
+                return
+            logger.info("Loading model %s on %s", self.source, self.device)
+            self.rss_before_load = resident_memory_bytes()
+            start = time.perf_counter()
+            # A local path never touches the network
+            local_only = bool(self.local_path)
+            tokenizer = AutoTokenizer.from_pretrained(self.source, local_files_only=local_only)
+            model = AutoModelForCausalLM.from_pretrained(
+                self.source,
+                # trust_remote_code=True,
+                dtype=self.dtype,
+                local_files_only=local_only,
+            ).to(self.device)
+            model.eval()
+            self.load_seconds = time.perf_counter() - start
+            metrics.record("model_load", self.load_seconds)
+            self.tokenizer, self.model = tokenizer, model
+            self.loads += 1
+            self._last_used = time.monotonic()
+            self.rss_after_load = resident_memory_bytes()
+            logger.info("Model loaded in %.2f seconds", self.load_seconds)
+            self._start_watcher()
+
+            if self.warmup:
+                self._run_warmup()
+
+    def _start_watcher(self):
+        # Started by the first load, however the model got loaded (preload or first use)
+        if self.idle_unload_seconds > 0 and self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch_idle, name="model-idle-unload", daemon=True)
+            self._watcher.start()
+
+    def _run_warmup(self):
+        start = time.perf_counter()
+        try:
+            inputs = self.tokenizer("Bitcoin price analysis:", return_tensors="pt").to(self.device)
+            with torch.no_grad():
+                self.model.generate(inputs["input_ids"], attention_mask=inputs["attention_mask"], max_new_tokens=8)
+            self.warmup_seconds = time.perf_counter() - start
+            logger.info("Model warmup took %.2f seconds", self.warmup_seconds)
+        except Exception:
+            logger.exception("Model warmup failed")
+
+    def unload(self):
+        """Drops the model and tokenizer and frees their memory."""
+        with self._lock:
+            if not self.loaded or self._active:
+                return
+            self.model = None
+            self.tokenizer = None
+            self.unloads += 1
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            logger.info("Model %s unloaded", self.source)
+
+    @contextmanager
+    def use(self):
+        """Yields (tokenizer, model, device), loading the model first if it was unloaded."""
+        with self._lock:
+            self.load()
+            self._active += 1
+            tokenizer, model = self.tokenizer, self.model
+        try:
+            yield tokenizer, model, self.device
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._last_used = time.monotonic()
+
+    def _watch_idle(self):
+        interval = max(1.0, min(60.0, self.idle_unload_seconds / 4))
+        while not self._stop.wait(interval):
+            with self._lock:
+                idle_for = time.monotonic() - self._last_used
+                if self.loaded and not self._active and idle_for >= self.idle_unload_seconds:
+                    logger.info("Model idle for %.0f seconds, unloading", idle_for)
+                    self.unload()
+
+    def stats(self):
+        """
+        Snapshot of the counters. Reads them without the lock, which load()
+        holds for the whole load, so /model_stats never waits on a load.
+        """
+        model = self.model
+        rss_before, rss_after = self.rss_before_load, self.rss_after_load
+        return {
+            "model_id": self.model_id,
+            "source": self.source,
+            "device": str(self.device),
+            "loaded": model is not None,
+            "active": self._active,
+            "loads": self.loads,
+            "unloads": self.unloads,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "idle_seconds": time.monotonic() - self._last_used,
+            "idle_unload_seconds": self.idle_unload_seconds,
+            "model_memory_bytes": model.get_memory_footprint() if model is not None else 0,
+            "rss_bytes": resident_memory_bytes(),
+            "rss_load_delta_bytes": (rss_after - rss_before)
+            if rss_after is not None and rss_before is not None else None,
+        }
@@ -0,0 +1,136 @@
+"""
+Reuses the attention keys/values of the constant instruction part of the
+analysis prompt. Every prompt is split at its data section: the instruction
+prefix is prefilled through the model once and its past_key_values kept, so
+a request only prefills the statistics that follow. Entries belong to the
+model that computed them and are dropped when another model is loaded; a
+changed template produces a different prefix and so a different entry.
+"""
+import copy
+import threading
+import weakref
+from collections import OrderedDict
+
+import torch
+
+
+class PrefixCache:
+    """
+    LRU cache of prefix past_key_values keyed by the prefix text. encode()
+    always tokenizes prefix and tail separately, so the cached and uncached
+    paths feed the model the same token ids.
+    """
+
+    def __init__(self, split_after, max_entries=8):
+        self.split_after = split_after
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # prefix -> (prefix_ids, past_key_values)
+        self._model = None  # weakref to the model the entries belong to
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.tokens_reused = 0
+        self.invalidations = 0
+
+    def split(self, prompt):
+        """(prefix, tail) of a prompt; the prefix is empty without the split marker."""
+        index = prompt.find(self.split_after)
+        if index < 0:
+            return "", prompt
+        index += len(self.split_after)
+        return prompt[:index], prompt[index:]
+
+    def encode(self, tokenizer, model, prompts, device, max_length=1024, use_cache=True, num_beams=1):
+        """
+        Returns generate() keyword arguments for the prompts: input_ids and
+        attention_mask, plus past_key_values when the prompts share a cached
+        prefix. Rows are laid out as [prefix][padding][tail], so the prefix
+        sits at the same positions in every row; attention_mask hides the
+        padding and positions are counted from it.
+        """
+        parts = [self.split(prompt) for prompt in prompts]
+        prefixes = {prefix for prefix, _ in parts}
+        if len(prefixes) > 1 or "" in prefixes:
+            # Different instructions in one batch: left-padded prompts without the cache
+            self.bypassed += 1
+            rows = [self._tokens(tokenizer, prefix, tail, max_length) for prefix, tail in parts]
+            width = max(len(row) for row in rows)
+            return {
+                "input_ids": torch.tensor([[tokenizer.pad_token_id] * (width - len(row)) + row for row in rows], device=device),
+                "attention_mask": torch.tensor([[0] * (width - len(row)) + [1] * len(row) for row in rows], device=device),
+            }
+
+        prefix = prefixes.pop()
+        prefix_ids, past = self._prefix(tokenizer, model, prefix, device, use_cache)
+        tails = [self._tokens(tokenizer, "", tail, max_length - prefix_ids.shape[1]) for _, tail in parts]
+        width = max(len(tail) for tail in tails)
+        rows, masks = [], []
+        for tail in tails:
+            pad = width - len(tail)
+            rows.append(prefix_ids[0].tolist() + [tokenizer.pad_token_id] * pad + tail)
+            masks.append([1] * prefix_ids.shape[1] + [0] * pad + [1] * len(tail))
+        kwargs = {
+            "input_ids": torch.tensor(rows, device=device),
+            "attention_mask": torch.tensor(masks, device=device),
+        }
+        if past is not None:
+            # generate() extends the cache in place, so every call gets its own copy
+            past = copy.deepcopy(past)
+            past.batch_repeat_interleave(len(prompts) * num_beams)
+            kwargs["past_key_values"] = past
+            self.tokens_reused += prefix_ids.shape[1] * len(prompts)
+        return kwargs
+
+    @staticmethod
+    def _tokens(tokenizer, prefix, tail, max_length):
+        """Token ids of prefix + tail, tokenized separately; the tail is truncated to fit max_length."""
+        if not prefix:
+            return tokenizer(tail, max_length=max_length, truncation=True)["input_ids"]
+        ids = tokenizer(prefix)["input_ids"]
+        budget = max(max_length - len(ids), 1)
+        return ids + tokenizer(tail, add_special_tokens=False, max_length=budget, truncation=True)["input_ids"]
+
+    def _prefix(self, tokenizer, model, prefix, device, use_cache):
+        if not use_cache or self.max_entries <= 0:
+            self.bypassed += 1
+            return tokenizer(prefix, return_tensors="pt")["input_ids"].to(device), None
+        with self._lock:
+            if self._model is None or self._model() is not model:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                # Also frees the entries once the model itself is unloaded
+                self._model = weakref.ref(model, lambda _: self.clear())
+            entry = self._entries.get(prefix)
+            if entry is not None:
+                self._entries.move_to_end(prefix)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        prefix_ids = tokenizer(prefix, return_tensors="pt")["input_ids"].to(device)
+        with torch.no_grad():
+            past = model(prefix_ids, use_cache=True).past_key_values
+        with self._lock:
+            if self._model() is model:
+                self._entries[prefix] = (prefix_ids, past)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return prefix_ids, past
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "tokens_reused": self.tokens_reused,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,26 @@
+"""
+Shared SQL pieces for the endpoint queries. Values are always bound as
+parameters (`?` in the SQL) and never formatted into the query text.
+"""
+
+KLINE_COLUMNS = """
+    open_time,
+    open_price,
+    high,
+    low,
+    close,
+    volume,
+    close_time,
+    quote_asset_volume,
+    ntrades,
+    taker_buy_base_asset_volume,
+    taker_buy_quote_asset_volume,
+    ignore"""
+
+
+def where(conditions):
+    """
+    Joins (sql, value) conditions such as ("open_time >= ?", start_time) into
+    a WHERE body and its parameters, in order. No conditions match every row.
+    """
+    return " AND ".join(sql for sql, _ in conditions) or "TRUE", [value for _, value in conditions]
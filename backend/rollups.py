@@ -0,0 +1,200 @@
+"""
+Pre-aggregated OHLCV rollup tables (1h/4h/1d/1w) and the logic that picks one for a chart request.
+
+The tables are built by sql/rollups.sql, which SparkPreprocessor runs after each
+load. For a database produced before rollups existed, run:
+
+    python rollups.py ../duckdb/binancedata.db [--rebuild]
+"""
+import os
+import threading
+
+import duckdb
+
+SQL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sql", "rollups.sql")
+
+BASE_TABLE = "BinanceData"
+BASE_INTERVAL_MS = 15 * 60 * 1000
+
+WEEK_MS = 7 * 24 * 60 * 60 * 1000
+# 1970-01-01 was a Thursday, so week buckets are shifted four days to start on Monday
+WEEK_OFFSET_MS = 4 * 24 * 60 * 60 * 1000
+
+
+def bucket_expression(bucket_ms):
+    """SQL expression giving the start of the bucket_ms bucket an open_time falls in."""
+    if bucket_ms % WEEK_MS == 0:
+        return f"open_time - ((open_time - {WEEK_OFFSET_MS}) % {bucket_ms})"
+    return f"open_time - (open_time % {bucket_ms})"
+
+
+def bucket_start(open_time, bucket_ms):
+    """Python equivalent of bucket_expression() for a single timestamp."""
+    offset = WEEK_OFFSET_MS if bucket_ms % WEEK_MS == 0 else 0
+    return open_time - ((open_time - offset) % bucket_ms)
+
+
+# Finest first: (table, bucket size in ms, SQL expression giving the bucket start)
+ROLLUPS = [
+    (f"{BASE_TABLE}_{name}", bucket_ms, bucket_expression(bucket_ms))
+    for name, bucket_ms in (
+        ("1h", 60 * 60 * 1000),
+        ("4h", 4 * 60 * 60 * 1000),
+        ("1d", 24 * 60 * 60 * 1000),
+        ("1w", WEEK_MS),
+    )
+]
+
+
+def choose_resolution(range_ms, target_points, tables=None, base_ms=BASE_INTERVAL_MS):
+    """
+    Picks the smallest bucket size that keeps range_ms at or under target_points
+    candles. Returns (table, bucket_ms, bucket_expr): the coarsest stored table
+    whose buckets divide bucket_ms, and the expression to regroup it by, which
+    is None when the table already has the right resolution.
+
+    base_ms is the interval of the series in the base table; only rollups
+    coarser than it are used, and only those listed in `tables` when given.
+    """
+    usable = lambda rollup, bucket_ms: bucket_ms > base_ms and (tables is None or rollup in tables)
+    # An inclusive range touches at most range_ms // bucket_ms + 1 buckets
+    needed = -(-range_ms // max(target_points - 1, 1))
+    table, level_ms = BASE_TABLE, base_ms
+    for rollup, bucket_ms, _ in ROLLUPS:
+        if bucket_ms <= needed and usable(rollup, bucket_ms):
+            table, level_ms = rollup, bucket_ms
+    bucket_ms = max(-(-needed // level_ms), 1) * level_ms
+    for rollup, rollup_ms, _ in ROLLUPS:
+        if rollup_ms == bucket_ms and usable(rollup, rollup_ms):
+            table, level_ms = rollup, rollup_ms
+    if bucket_ms == level_ms:
+        return table, bucket_ms, None
+    return table, bucket_ms, bucket_expression(bucket_ms)
+
+
+def aggregate_query(bucket_expr, where, table=BASE_TABLE, keys=()):
+    """
+    Groups `table` (the base table or a finer rollup) into buckets on the fly.
+    Same first-open/last-close semantics as sql/rollups.sql. Columns in `keys`
+    (e.g. symbol) are selected and grouped by as well.
+    """
+    selected = "".join(f"{key}, " for key in keys)
+    return f"""
+    SELECT
+        {selected}MIN(open_time) AS open_time,
+        arg_min(open_price, open_time) AS open_price,
+        MAX(high) AS high,
+        MIN(low) AS low,
+        arg_max(close, open_time) AS close,
+        SUM(volume) AS volume,
+        MAX(close_time) AS close_time,
+        SUM(quote_asset_volume) AS quote_asset_volume,
+        SUM(ntrades) AS ntrades,
+        SUM(taker_buy_base_asset_volume) AS taker_buy_base_asset_volume,
+        SUM(taker_buy_quote_asset_volume) AS taker_buy_quote_asset_volume,
+        NULL AS ignore
+    FROM {table}
+    WHERE {where}
+    GROUP BY {selected}{bucket_expr}
+    """
+
+
+def exact_query(table, bucket_ms, where, params, lower, upper, columns, keys=(), first=None, last=None):
+    """
+    Candles of bucket_ms over the open_times lower..upper from rollup `table`,
+    whose buckets divide bucket_ms. Stored buckets that lie wholly inside the
+    range are read from the rollup; the partial ones at either edge are grouped
+    from the base table instead, so the candles (and their high and low) cover
+    exactly the range. Only the edges are grouped when the rollup already has
+    the resolution. `where` selects the range on either table and `columns`
+    (keys first) are the ones aggregate_query returns. first and last, the
+    earliest and latest open_time of the series queried, let an edge the range
+    does not cut into be read from the rollup as is. Returns (sql, params).
+    """
+    level_ms = next(rollup_ms for rollup, rollup_ms, _ in ROLLUPS if rollup == table)
+    edges, edge_params = [], []
+    edge = f"SELECT {columns} FROM {BASE_TABLE} WHERE {where} AND open_time {{}} ?"
+    # Rollup rows are stamped with their first open_time, so an uncut edge is bounded by the range itself
+    if first is not None and lower <= first:
+        head_end = lower
+    else:
+        # First bucket boundary at or after lower
+        head_end = bucket_start(lower - 1, level_ms) + level_ms
+        edges.append(edge.format("<"))
+        edge_params += params + [head_end]
+    if last is not None and upper >= last:
+        tail_start = upper + 1
+    else:
+        # Start of the bucket holding upper, the head's own when the range lies within one bucket
+        tail_start = max(bucket_start(upper, level_ms), head_end)
+        edges.append(edge.format(">="))
+        edge_params += params + [tail_start]
+    body = f"SELECT {columns} FROM {table} WHERE {where} AND open_time >= ? AND open_time < ?"
+    body_params = params + [head_end, tail_start]
+    # Separate range reads rather than one OR, so the base table's zone maps still skip the middle
+    bucket_expr = bucket_expression(bucket_ms)
+    if bucket_ms == level_ms:
+        if not edges:
+            return body, body_params
+        edges = aggregate_query(bucket_expr, "TRUE", f"({' UNION ALL '.join(edges)}) AS edges", keys)
+        return f"{body} UNION ALL {edges}", body_params + edge_params
+    source = " UNION ALL ".join(edges + [body])
+    return aggregate_query(bucket_expr, "TRUE", f"({source}) AS edges", keys), edge_params + body_params
+
+
+_available_lock = threading.Lock()
+_available = {}  # database file id -> set of rollup tables
+
+
+def available_rollups(conn, db_id):
+    """Rollup tables present in the database, looked up once per database file."""
+    with _available_lock:
+        tables = _available.get(db_id)
+    if tables is None:
+        names = {table for table, _, _ in ROLLUPS}
+        rows = conn.execute("SELECT table_name FROM duckdb_tables()").fetchall()
+        tables = {name for (name,) in rows if name in names}
+        with _available_lock:
+            _available.clear()
+            _available[db_id] = tables
+    return tables
+
+
+def read_statements(path=SQL_PATH):
+    with open(path) as f:
+        script = "".join(line for line in f if not line.lstrip().startswith("--"))
+    return [sql.strip() for sql in script.split(";") if sql.strip()]
+
+
+def refresh(conn, rebuild=False, sort=True):
+    """
+    Adds the symbol/interval columns to a database that predates them,
+    re-sorts the base table, creates missing rollup tables and incrementally
+    brings all of them up to date. sort=False skips the re-sort, for callers
+    that append each series in open_time order themselves.
+    """
+    if rebuild:
+        for table, _, _ in ROLLUPS:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+    for sql in read_statements():
+        if not sort and sql.startswith(f"CREATE OR REPLACE TABLE {BASE_TABLE} "):
+            continue
+        conn.execute(sql)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build or update the OHLCV rollup tables")
+    parser.add_argument("database", nargs="?", default="../duckdb/binancedata.db")
+    parser.add_argument("--rebuild", action="store_true", help="drop and rebuild every rollup table")
+    args = parser.parse_args()
+
+    start = time.time()
+    conn = duckdb.connect(args.database)
+    try:
+        refresh(conn, rebuild=args.rebuild)
+    finally:
+        conn.close()
+    print(f"Rollups refreshed in {time.time() - start:.2f} seconds")
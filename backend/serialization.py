@@ -0,0 +1,297 @@
+"""Wire formats for kline responses: row JSON, packed column JSON and Arrow IPC."""
+import io
+import os
+import time
+import typing
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pydantic_core import to_json
+
+from metrics import record, stage
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # Arrow output is optional
+    pa = None
+
+ROWS_MEDIA_TYPE = "application/json"
+COLUMNS_MEDIA_TYPE = "application/vnd.cryptoanalysis.columns+json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+FORMATS = {
+    "rows": ROWS_MEDIA_TYPE,
+    "columns": COLUMNS_MEDIA_TYPE,
+    "arrow": ARROW_MEDIA_TYPE,
+}
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": ARROW_MEDIA_TYPE,
+}
+
+
+TIME_COLUMNS = ("open_time", "close_time")
+
+# Keyset pagination: open_time of the last row, sent when the page came back full
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _local_zone_key():
+    """
+    IANA name of the zone datetime.fromtimestamp() converts into, or None if it
+    cannot be determined reliably.
+    """
+    key = os.environ.get("TZ", "").lstrip(":")
+    if not key:
+        path = os.path.realpath("/etc/localtime")
+        key = path.split("zoneinfo/", 1)[1] if "zoneinfo/" in path else ("UTC" if not os.path.exists(path) else "")
+    if "zoneinfo/" in key:
+        key = key.split("zoneinfo/", 1)[1]
+    try:
+        zone = ZoneInfo(key)
+    except Exception:
+        return None
+    # Cross-check against the C library now and half a year out (catches DST); a mismatch falls back to the exact path
+    now = int(time.time())
+    for ts in (now, now + 182 * 24 * 3600):
+        if datetime.fromtimestamp(ts, zone).utcoffset().total_seconds() != time.localtime(ts).tm_gmtoff:
+            return None
+    return key
+
+
+_LOCAL_ZONE = _local_zone_key()
+
+
+def local_iso_times(epoch_ms):
+    """
+    Vectorized equivalent of datetime.fromtimestamp(ms / 1000).isoformat() over
+    an array of epoch-millisecond timestamps.
+    """
+    epoch_ms = np.asarray(epoch_ms, dtype=np.int64)
+    if _LOCAL_ZONE is None:
+        return np.array([datetime.fromtimestamp(x / 1000).isoformat() for x in epoch_ms.tolist()], dtype=object)
+    local = (
+        pd.DatetimeIndex(epoch_ms.astype("datetime64[ms]"), tz="UTC")
+        .tz_convert(_LOCAL_ZONE)
+        .tz_localize(None)
+        .values.astype("datetime64[us]")
+    )
+    # isoformat() drops the fraction entirely when there are no microseconds
+    with_fraction = np.datetime_as_string(local, unit="us")
+    whole_seconds = np.datetime_as_string(local, unit="s")
+    return np.where(epoch_ms % 1000 == 0, whole_seconds, with_fraction)
+
+
+def _field_casts(model):
+    """Maps each model field to the Python type its values are coerced to."""
+    casts = {}
+    for name, field in model.model_fields.items():
+        annotation = field.annotation
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        casts[name] = args[0] if args else annotation
+    return casts
+
+
+def kline_rows(columns, model):
+    """
+    Turns DuckDB columns (as returned by fetchnumpy()) into plain dicts shaped
+    like `model`, converting timestamps column-wise instead of building and
+    validating one model per row.
+    """
+    start = time.perf_counter()
+    timestamps = 0.0
+    values = []
+    for name, cast in _field_casts(model).items():
+        column = columns[name]
+        if name in TIME_COLUMNS:
+            converted = time.perf_counter()
+            column = local_iso_times(column)
+            timestamps += time.perf_counter() - converted
+        elif cast is float:
+            column = column.astype(np.float64)
+        elif cast is int:
+            column = column.astype(np.int64)
+        # Masked (NULL) entries come out of tolist() as None
+        values.append(column.tolist())
+    names = list(_field_casts(model))
+    rows = [dict(zip(names, row)) for row in zip(*values)]
+    record("timestamps", timestamps)
+    record("serialize", time.perf_counter() - start - timestamps)
+    return rows
+
+
+def json_response(content):
+    """
+    Serializes with pydantic-core, the same encoder FastAPI uses for
+    response_model output, so the bytes match without revalidating every row.
+    """
+    with stage("serialize"):
+        body = to_json(content, inf_nan_mode="null")
+    return Response(content=body, media_type=ROWS_MEDIA_TYPE)
+
+
+def negotiate_format(accept, fmt=None):
+    """
+    Picks the response format from an explicit ?format= value, else from the
+    Accept header. Row JSON stays the default for anything else.
+    """
+    if fmt:
+        if fmt not in FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unknown format '{fmt}', expected one of {sorted(FORMATS)}")
+        return fmt
+    if accept:
+        # First listed media type we can produce wins; q-values are not weighed
+        for part in accept.split(","):
+            media_type = part.split(";")[0].strip().lower()
+            if media_type == ARROW_MEDIA_TYPE:
+                return "arrow"
+            if media_type == COLUMNS_MEDIA_TYPE:
+                return "columns"
+            if media_type in (ROWS_MEDIA_TYPE, "*/*"):
+                return "rows"
+    return "rows"
+
+
+def set_next_cursor(response, rows, last_open_time, limit):
+    """Adds the next-page cursor header when a page of `limit` rows came back full."""
+    if limit and rows == limit:
+        response.headers[NEXT_CURSOR_HEADER] = str(int(last_open_time))
+    return response
+
+
+def columns_response(result, limit=None):
+    """
+    Packs a DuckDB result as {"column": [values...], ...} with open_time and
+    close_time left as epoch-millisecond integers.
+    """
+    with stage("fetch"):
+        columns = result.fetchnumpy()
+    with stage("serialize"):
+        body = to_json({name: values.tolist() for name, values in columns.items()}, inf_nan_mode="null")
+    response = Response(content=body, media_type=COLUMNS_MEDIA_TYPE)
+    open_times = columns["open_time"]
+    return set_next_cursor(response, len(open_times), open_times[-1] if len(open_times) else None, limit)
+
+
+def grouped_columns_response(result, key, groups=()):
+    """
+    Packs a DuckDB result ordered by `key` as {key value: {"column": [values...]}},
+    one packed column object per group, with epoch-millisecond timestamps.
+    Groups listed in `groups` are included even when they have no rows.
+    """
+    with stage("fetch"):
+        columns = result.fetchnumpy()
+    with stage("serialize"):
+        labels = np.asarray(columns.pop(key))
+        content = {group: {name: [] for name in columns} for group in groups}
+        _, starts = np.unique(labels, return_index=True)
+        bounds = sorted(starts.tolist()) + [len(labels)]
+        for lo, hi in zip(bounds, bounds[1:]):
+            content[str(labels[lo])] = {name: values[lo:hi].tolist() for name, values in columns.items()}
+        body = to_json(content, inf_nan_mode="null")
+    return Response(content=body, media_type=COLUMNS_MEDIA_TYPE)
+
+
+def arrow_response(result, limit=None):
+    """Streams a DuckDB result out as an Arrow IPC stream, straight from DuckDB's Arrow export."""
+    if pa is None:
+        raise HTTPException(status_code=406, detail="Arrow output requires pyarrow on the server")
+    with stage("fetch"):
+        data = result.arrow()
+    # Depending on the DuckDB version .arrow() returns a Table or a RecordBatchReader
+    batches = data if isinstance(data, pa.RecordBatchReader) else data.to_batches()
+    sink = io.BytesIO()
+    rows, last_open_time = 0, None
+    with stage("serialize"), pa.ipc.new_stream(sink, data.schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            if batch.num_rows:
+                rows += batch.num_rows
+                last_open_time = batch.column("open_time")[-1].as_py()
+    response = Response(content=sink.getvalue(), media_type=ARROW_MEDIA_TYPE)
+    return set_next_cursor(response, rows, last_open_time, limit)
+
+
+def format_response(result, fmt, limit=None):
+    """Serializes a DuckDB result in one of the non-default formats."""
+    if fmt == "arrow":
+        return arrow_response(result, limit)
+    return columns_response(result, limit)
+
+
+def arrow_batches(result, batch_size):
+    """Arrow record batch reader over a DuckDB result, batch_size rows at a time."""
+    # Newer DuckDB versions renamed fetch_record_batch to to_arrow_reader
+    if hasattr(result, "to_arrow_reader"):
+        return result.to_arrow_reader(batch_size)
+    return result.fetch_record_batch(batch_size)
+
+
+def _concatenated_text(array):
+    """All values of an Arrow string array back to back, read straight from its data buffer."""
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        _, offsets, data = array.buffers()
+        offset_type = np.int64 if pa.types.is_large_string(array.type) else np.int32
+        offsets = np.frombuffer(offsets, dtype=offset_type)[array.offset:array.offset + len(array) + 1]
+        return memoryview(data)[offsets[0]:offsets[-1]]
+    return "".join(array.to_pylist()).encode()
+
+
+class ExportEncoder:
+    """
+    Encodes consecutive record batch readers into one NDJSON, CSV or Arrow IPC
+    stream, handing back the bytes produced for each so they can be sent
+    before the next one is read.
+
+    NDJSON readers carry the ready-made lines, newline included, in a `line` column.
+    """
+
+    def __init__(self, fmt):
+        if pa is None:
+            raise HTTPException(status_code=406, detail="Export requires pyarrow on the server")
+        self.fmt = fmt
+        self._sink = io.BytesIO()
+        self._writer = None
+        self._header_written = False
+
+    def encode(self, reader):
+        """Encodes every batch of `reader`. Returns (bytes, rows, open_time of the last row)."""
+        rows, last_open_time = 0, None
+        if self.fmt == "arrow" and self._writer is None:
+            self._writer = pa.ipc.new_stream(self._sink, reader.schema)
+        for batch in reader:
+            if not batch.num_rows:
+                continue
+            if self.fmt == "ndjson":
+                self._sink.write(_concatenated_text(batch.column("line")))
+            elif self.fmt == "csv":
+                pa_csv.write_csv(batch, self._sink, pa_csv.WriteOptions(include_header=not self._header_written))
+                self._header_written = True
+            else:
+                self._writer.write_batch(batch)
+            rows += batch.num_rows
+            last_open_time = batch.column("open_time")[-1].as_py()
+        if self.fmt == "csv" and not self._header_written:
+            # An empty export still gets its header row
+            pa_csv.write_csv(reader.schema.empty_table(), self._sink)
+            self._header_written = True
+        return self._take(), rows, last_open_time
+
+    def finish(self):
+        """Bytes that close the stream (the Arrow end-of-stream marker)."""
+        if self._writer is not None:
+            self._writer.close()
+        return self._take()
+
+    def _take(self):
+        data = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate()
+        return data
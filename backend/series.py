@@ -0,0 +1,94 @@
+"""
+Symbol/interval series stored in BinanceData. Every candle carries a `symbol`
+(e.g. BTCUSDT) and a Binance kline `interval` (e.g. 15m), and the table is
+kept sorted on (symbol, interval, open_time) so a single series is read from
+its own run of row groups.
+
+Databases written before these columns existed hold one series, which is
+served as DEFAULT_SYMBOL/DEFAULT_INTERVAL (python rollups.py adds the columns).
+"""
+import threading
+
+import settings
+from rollups import BASE_TABLE
+
+# Binance kline intervals that tile UTC days, so the rollups can be built from any of them
+INTERVALS_MS = {
+    "1m": 60 * 1000,
+    "3m": 3 * 60 * 1000,
+    "5m": 5 * 60 * 1000,
+    "15m": 15 * 60 * 1000,
+    "30m": 30 * 60 * 1000,
+    "1h": 60 * 60 * 1000,
+    "2h": 2 * 60 * 60 * 1000,
+    "4h": 4 * 60 * 60 * 1000,
+    "6h": 6 * 60 * 60 * 1000,
+    "8h": 8 * 60 * 60 * 1000,
+    "12h": 12 * 60 * 60 * 1000,
+    "1d": 24 * 60 * 60 * 1000,
+}
+
+ASSET_NAMES = {"BTCUSDT": "Bitcoin"}
+
+
+def asset_name(symbol):
+    """How the analysis prompt refers to a symbol's base asset."""
+    return ASSET_NAMES.get(symbol, symbol)
+
+
+class Catalog:
+    """The series held by one database file, with their row counts and time ranges."""
+
+    def __init__(self, has_columns, series):
+        self.has_columns = has_columns
+        self.series = series  # (symbol, interval) -> (rows, first open_time, last open_time)
+
+    def conditions(self, symbol, interval):
+        """
+        (sql, value) filters selecting one series, [] for a database without
+        series columns, or None when the database does not hold the series.
+        """
+        if (symbol, interval) not in self.series:
+            return None
+        if not self.has_columns:
+            return []
+        return [("symbol = ?", symbol), ("interval = ?", interval)]
+
+    def listing(self):
+        return [
+            {"symbol": symbol, "interval": interval, "rows": rows, "first_open_time": first, "last_open_time": last}
+            for (symbol, interval), (rows, first, last) in sorted(self.series.items())
+        ]
+
+
+def load_catalog(conn, table=BASE_TABLE):
+    columns = {
+        name for (name,) in conn.execute(
+            "SELECT column_name FROM duckdb_columns() WHERE table_name = ?", [table]
+        ).fetchall()
+    }
+    if {"symbol", "interval"} <= columns:
+        rows = conn.execute(f"""
+        SELECT symbol, interval, COUNT(*), MIN(open_time), MAX(open_time)
+        FROM {table}
+        GROUP BY symbol, interval
+        """).fetchall()
+        return Catalog(True, {(symbol, interval): (n, first, last) for symbol, interval, n, first, last in rows})
+    n, first, last = conn.execute(f"SELECT COUNT(*), MIN(open_time), MAX(open_time) FROM {table}").fetchone()
+    return Catalog(False, {(settings.DEFAULT_SYMBOL, settings.DEFAULT_INTERVAL): (n, first, last)})
+
+
+_catalog_lock = threading.Lock()
+_catalogs = {}  # database file id -> Catalog
+
+
+def catalog(conn, db_id):
+    """The series of the database behind `conn`, looked up once per database file."""
+    with _catalog_lock:
+        result = _catalogs.get(db_id)
+    if result is None:
+        result = load_catalog(conn)
+        with _catalog_lock:
+            _catalogs.clear()
+            _catalogs[db_id] = result
+    return result
@@ -0,0 +1,87 @@
+"""Runtime settings for the backend, read from environment variables."""
+import os
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+# DuckDB database file produced by SparkPreprocessor
+DB_PATH = os.getenv("DUCKDB_PATH", "../duckdb/binancedata.db")
+
+# Connection pool
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 4)
+DB_POOL_TIMEOUT = _env_float("DB_POOL_TIMEOUT", 10.0)  # seconds to wait for a free cursor
+DB_HEALTH_CHECK_INTERVAL = _env_float("DB_HEALTH_CHECK_INTERVAL", 30.0)  # idle seconds before re-checking a cursor
+DB_SWAP_CHECK_INTERVAL = _env_float("DB_SWAP_CHECK_INTERVAL", 2.0)  # seconds between database file stat checks
+DB_MEMORY_LIMIT = os.getenv("DB_MEMORY_LIMIT", "512MB")  # bounds DuckDB's block cache; empty keeps its default of 80% of RAM
+
+# Thread pools for blocking work; jobs beyond workers + queue size are rejected with 503
+DB_WORKERS = _env_int("DB_WORKERS", DB_POOL_SIZE)
+DB_QUEUE_SIZE = _env_int("DB_QUEUE_SIZE", 64)
+INFERENCE_WORKERS = _env_int("INFERENCE_WORKERS", 1)
+INFERENCE_QUEUE_SIZE = _env_int("INFERENCE_QUEUE_SIZE", 8)
+
+# Concurrent analyses are generated together as one padded batch
+INFERENCE_BATCH_SIZE = _env_int("INFERENCE_BATCH_SIZE", 4)
+INFERENCE_BATCH_WAIT_MS = _env_float("INFERENCE_BATCH_WAIT_MS", 50.0)  # how long a batch waits for more prompts
+INFERENCE_TIMEOUT = _env_float("INFERENCE_TIMEOUT", 600.0)  # seconds before an analysis fails with 504; 0 waits forever
+
+# Analysis model, loaded once at startup and kept resident
+MODEL_ID = os.getenv("MODEL_ID", "unsloth/DeepSeek-R1-Distill-Qwen-1.5B-bnb-4bit")
+MODEL_PATH = os.getenv("MODEL_PATH", "")  # local directory with tokenizer and weights, skips the network
+MODEL_DTYPE = os.getenv("MODEL_DTYPE", "float16")
+MODEL_PRELOAD = _env_bool("MODEL_PRELOAD", True)
+MODEL_WARMUP = _env_bool("MODEL_WARMUP", False)
+MODEL_IDLE_UNLOAD_SECONDS = _env_float("MODEL_IDLE_UNLOAD_SECONDS", 0)  # 0 keeps the model loaded
+
+# Decoding of analyses, see generation.py; requests may pick another profile and budget
+GENERATION_PROFILE = os.getenv("GENERATION_PROFILE", "greedy")  # greedy, sampling, beam or speculative
+GENERATION_MAX_NEW_TOKENS = _env_int("GENERATION_MAX_NEW_TOKENS", 512)
+GENERATION_MAX_NEW_TOKENS_LIMIT = _env_int("GENERATION_MAX_NEW_TOKENS_LIMIT", 2048)  # largest budget a request may ask for
+GENERATION_NUM_BEAMS = _env_int("GENERATION_NUM_BEAMS", 2)  # beams of the "beam" profile
+
+# Instruction prefixes whose past_key_values are kept; 0 prefills every prompt in full
+PROMPT_CACHE_SIZE = _env_int("PROMPT_CACHE_SIZE", 8)
+
+# Draft model for the "speculative" profile; must share the analysis model's tokenizer
+DRAFT_MODEL_ID = os.getenv("DRAFT_MODEL_ID", "")
+DRAFT_MODEL_PATH = os.getenv("DRAFT_MODEL_PATH", "")
+
+# Cache of generated analyses; set ANALYSIS_CACHE_PATH to a SQLite file to keep entries across restarts
+ANALYSIS_CACHE_SIZE = _env_int("ANALYSIS_CACHE_SIZE", 128)
+ANALYSIS_CACHE_TTL = _env_float("ANALYSIS_CACHE_TTL", 3600.0)
+ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH", "")
+
+# Default max_points for /binance_data/: longer ranges are served in coarser buckets
+CHART_TARGET_POINTS = _env_int("CHART_TARGET_POINTS", 10000)
+
+# Rows read and sent per chunk by /binance_data/export
+EXPORT_BATCH_ROWS = _env_int("EXPORT_BATCH_ROWS", 50000)
+
+# Memory for the /price_summary indexes; the least recently used series are dropped beyond it
+SUMMARY_INDEX_MEMORY_MB = _env_int("SUMMARY_INDEX_MEMORY_MB", 512)
+
+# Series served when a request names no symbol/interval, and the only one in databases without those columns
+DEFAULT_SYMBOL = os.getenv("DEFAULT_SYMBOL", "BTCUSDT")
+DEFAULT_INTERVAL = os.getenv("DEFAULT_INTERVAL", "15m")
+# Most symbols one /binance_data/batch request may ask for
+BATCH_MAX_SYMBOLS = _env_int("BATCH_MAX_SYMBOLS", 100)
+
+# Python logging level; per-request lines (SQL, ranges, timings) are only formatted at DEBUG
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Per-stage timing histograms on /metrics (needs prometheus-client) and the Server-Timing header
+METRICS_ENABLED = _env_bool("METRICS_ENABLED", True)
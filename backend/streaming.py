@@ -0,0 +1,164 @@
+"""
+Streams an analysis to the client as Server-Sent Events while it is being
+generated. The inference worker decodes tokens as they are produced and hands
+the text to the event loop; a client that disconnects cancels the generation
+at the next token so the worker is freed.
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+
+import torch
+from transformers import StoppingCriteria, StoppingCriteriaList, TextStreamer
+
+ECHO_MARKER = "Data Summary for Analysis:"
+ANALYSIS_MARKERS = ["Market Overview", "1.", "Analysis:", "Based on"]
+
+
+def sse_event(data, event=None):
+    """One Server-Sent Event carrying `data` as JSON."""
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data)}\n\n"
+
+
+class _QueueStreamer(TextStreamer):
+    """TextStreamer that passes each decoded piece to the stream instead of printing it."""
+
+    def __init__(self, tokenizer, stream):
+        super().__init__(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        self.stream = stream
+
+    def on_finalized_text(self, text, stream_end=False):
+        if text:
+            self.stream.put(text)
+
+
+class _Cancelled(StoppingCriteria):
+    """Stops generation once the stream has been cancelled."""
+
+    def __init__(self, event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+
+class EchoFilter:
+    """
+    Incremental clean_analysis: text after an echoed "Data Summary for
+    Analysis:" is dropped up to the first analysis marker. Only as many
+    characters as the longest marker are held back, so the rest streams
+    through as soon as it is decoded. Unlike clean_analysis, text before the
+    echo has already been sent and is kept.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._skipped = ""  # text after the echo, kept in case no marker follows
+        self._skipping = False
+        self._started = False
+
+    def feed(self, text):
+        self._pending += text
+        out = []
+        while True:
+            if self._skipping:
+                found = [(self._pending.find(m), m) for m in ANALYSIS_MARKERS if m in self._pending]
+                if not found:
+                    keep = max(len(m) for m in ANALYSIS_MARKERS) - 1
+                    cut = max(len(self._pending) - keep, 0)
+                    self._skipped += self._pending[:cut]
+                    self._pending = self._pending[cut:]
+                    break
+                self._pending = self._pending[min(found)[0]:]
+                self._skipped = ""
+                self._skipping = False
+            index = self._pending.find(ECHO_MARKER)
+            if index < 0:
+                cut = max(len(self._pending) - len(ECHO_MARKER) + 1, 0)
+                out.append(self._pending[:cut])
+                self._pending = self._pending[cut:]
+                break
+            out.append(self._pending[:index])
+            self._pending = self._pending[index + len(ECHO_MARKER):]
+            self._skipping = True
+        return self._emit("".join(out))
+
+    def finish(self):
+        """The held-back tail, once generation has ended."""
+        tail = self._skipped + self._pending if self._skipping else self._pending
+        self._pending = self._skipped = ""
+        return self._emit(tail).rstrip()
+
+    def _emit(self, text):
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+
+class AnalysisStream:
+    """
+    One streamed generation. generate_kwargs() is passed to model.generate on
+    the inference worker; read() yields the decoded text on the event loop
+    until finish() is called.
+    """
+
+    _DONE = object()
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.cancelled = threading.Event()
+
+    def generate_kwargs(self, tokenizer):
+        return {
+            "streamer": _QueueStreamer(tokenizer, self),
+            "stopping_criteria": StoppingCriteriaList([_Cancelled(self.cancelled)]),
+        }
+
+    def put(self, text):
+        # Called from the inference worker thread
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, text)
+
+    def finish(self):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, self._DONE)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    async def read(self):
+        while True:
+            text = await self.queue.get()
+            if text is self._DONE:
+                return
+            yield text
+
+
+class StreamStats:
+    """Counts streamed analyses and keeps their recent times to first token."""
+
+    def __init__(self, window=256):
+        self._first_token = deque(maxlen=window)
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def first_token(self, seconds):
+        self._first_token.append(seconds)
+
+    def stats(self):
+        samples = sorted(self._first_token)
+        percentile = lambda p: samples[min(int(p * len(samples)), len(samples) - 1)] if samples else None
+        return {
+            "started": self.started,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+            "active": self.started - self.completed - self.cancelled - self.failed,
+            "time_to_first_token_mean": sum(samples) / len(samples) if samples else None,
+            "time_to_first_token_p50": percentile(0.5),
+            "time_to_first_token_p95": percentile(0.95),
+        }
@@ -0,0 +1,236 @@
+"""
+In-memory summary index over BinanceData answering min/max/first/last/volume/
+count for any [start, end] open_time range without scanning the table.
+
+Volume and count come from prefix sums, first/last from the sorted open_time
+column, and min/max from a sparse table over fixed-size blocks: a query looks
+at most two partial blocks plus two sparse-table cells.
+"""
+import threading
+
+import numpy as np
+
+from queries import where
+
+BLOCK_SIZE = 64
+
+
+class _RangeExtreme:
+    """Range min or max over an array: per-block extremes plus a sparse table over the blocks."""
+
+    def __init__(self, values, op):
+        self.values = values
+        self.op = op  # np.minimum or np.maximum
+        self.levels = self._build(self._blocks(values))
+
+    def _blocks(self, values):
+        n = len(values)
+        if not n:
+            return values[:0]
+        padded = np.resize(values, -(-n // BLOCK_SIZE) * BLOCK_SIZE)
+        padded[n:] = values[-1]  # padding with a real value leaves every extreme unchanged
+        return self.op.reduce(padded.reshape(-1, BLOCK_SIZE), axis=1)
+
+    def _build(self, blocks):
+        levels = [blocks]
+        width = 1
+        while 2 * width <= len(blocks):
+            previous = levels[-1]
+            levels.append(self.op(previous[:len(previous) - width], previous[width:]))
+            width *= 2
+        return levels
+
+    def extended(self, values, old_n):
+        """A copy over `values`, the first old_n rows of the old array followed by new ones, reusing the untouched blocks."""
+        index = _RangeExtreme.__new__(_RangeExtreme)
+        index.values = values
+        index.op = self.op
+        keep = old_n // BLOCK_SIZE  # the last, possibly partial, block is recomputed
+        blocks = np.concatenate([self.levels[0][:keep], self._blocks(values[keep * BLOCK_SIZE:])])
+        index.levels = index._build(blocks)
+        return index
+
+    def query(self, i, j):
+        """Extreme of values[i:j], j > i."""
+        first_block, last_block = i // BLOCK_SIZE, (j - 1) // BLOCK_SIZE
+        if first_block == last_block:
+            return self.op.reduce(self.values[i:j])
+        result = self.op(
+            self.op.reduce(self.values[i:(first_block + 1) * BLOCK_SIZE]),
+            self.op.reduce(self.values[last_block * BLOCK_SIZE:j]),
+        )
+        lo, hi = first_block + 1, last_block - 1
+        if lo <= hi:
+            level = (hi - lo + 1).bit_length() - 1
+            table = self.levels[level]
+            result = self.op(result, self.op(table[lo], table[hi - (1 << level) + 1]))
+        return result
+
+
+class _Snapshot:
+    """Immutable index state; a refresh builds a new one and swaps it in."""
+
+    def __init__(self, open_time, open_price, close, volume_prefix, low, high):
+        self.open_time = open_time
+        self.open_price = open_price
+        self.close = close
+        self.volume_prefix = volume_prefix
+        self.low = low
+        self.high = high
+
+    def __len__(self):
+        return len(self.open_time)
+
+    @property
+    def nbytes(self):
+        arrays = [self.open_time, self.open_price, self.close, self.volume_prefix, self.low.values, self.high.values]
+        return sum(a.nbytes for a in arrays + self.low.levels + self.high.levels)
+
+
+def _columns(conn, conditions, after=None):
+    if after is not None:
+        conditions = conditions + [("open_time > ?", after)]
+    sql, params = where(conditions)
+    columns = conn.execute(f"""
+    SELECT open_time, open_price, close, volume, low, high
+    FROM BinanceData
+    WHERE {sql}
+    ORDER BY open_time
+    """, params).fetchnumpy()
+    return {name: np.asarray(values) for name, values in columns.items()}
+
+
+class SummaryIndex:
+    """
+    Built from the database on first use. refresh() appends rows newer than
+    the last indexed candle and rebuilds from scratch if anything older changed.
+    With the ingestion log of the series (ingest.SeriesLog) it instead keeps
+    the rows before the earliest ingested candle and rereads only the rest.
+    One index covers one series, selected by (sql, value) conditions such as
+    ("symbol = ?", "BTCUSDT"); none index the whole table.
+    """
+
+    def __init__(self, conditions=()):
+        self.conditions = list(conditions)
+        self._snapshot = None
+        self._database_id = None
+        self._version = None  # ingestion log version the snapshot reflects
+        self._lock = threading.Lock()
+        self._builds = 0
+        self._appends = 0
+        self._splices = 0
+
+    def refresh(self, conn, database_id, log=None):
+        """Brings the index up to date with the database behind `conn`; cheap when nothing changed."""
+        if self._snapshot is not None and database_id == self._database_id:
+            return
+        with self._lock:
+            if self._snapshot is not None and database_id == self._database_id:
+                return
+            snapshot = self._snapshot
+            version = log.version if log is not None else None
+            if snapshot is not None and len(snapshot) and log is not None:
+                try:
+                    since = log.changed_since(self._version)
+                except LookupError:
+                    pass
+                else:
+                    if since is not None:
+                        keep = int(np.searchsorted(snapshot.open_time, since, side="left"))
+                        self._snapshot = self._splice(snapshot, keep, _columns(conn, self.conditions, after=since - 1))
+                        self._splices += 1
+                    self._database_id, self._version = database_id, version
+                    return
+            if snapshot is not None and len(snapshot) and self._unchanged(conn, snapshot):
+                self._snapshot = self._append(snapshot, _columns(conn, self.conditions, after=int(snapshot.open_time[-1])))
+                self._database_id, self._version = database_id, version
+                self._appends += 1
+                return
+            self._snapshot = self._build(_columns(conn, self.conditions))
+            self._database_id, self._version = database_id, version
+            self._builds += 1
+
+    def _unchanged(self, conn, snapshot):
+        """Whether the already indexed rows still match the database, so new rows can simply be appended."""
+        sql, params = where(self.conditions + [("open_time <= ?", int(snapshot.open_time[-1]))])
+        count, open_sum, close_sum, volume, low, high = conn.execute(f"""
+        SELECT COUNT(*), SUM(open_price), SUM(close), SUM(volume), MIN(low), MAX(high)
+        FROM BinanceData
+        WHERE {sql}
+        """, params).fetchone()
+        n = len(snapshot)
+        return (
+            count == n
+            and np.isclose(open_sum, snapshot.open_price.sum(), rtol=1e-12)
+            and np.isclose(close_sum, snapshot.close.sum(), rtol=1e-12)
+            and np.isclose(volume, snapshot.volume_prefix[-1], rtol=1e-9)
+            and low == snapshot.low.query(0, n)
+            and high == snapshot.high.query(0, n)
+        )
+
+    @staticmethod
+    def _build(columns):
+        volume = columns["volume"].astype(np.float64)
+        return _Snapshot(
+            columns["open_time"].astype(np.int64),
+            columns["open_price"].astype(np.float64),
+            columns["close"].astype(np.float64),
+            np.concatenate([[0.0], np.cumsum(volume)]),
+            _RangeExtreme(columns["low"].astype(np.float64), np.minimum),
+            _RangeExtreme(columns["high"].astype(np.float64), np.maximum),
+        )
+
+    @staticmethod
+    def _append(snapshot, columns):
+        if not len(columns["open_time"]):
+            return snapshot
+        return SummaryIndex._splice(snapshot, len(snapshot), columns)
+
+    @staticmethod
+    def _splice(snapshot, keep, columns):
+        """The first `keep` indexed rows followed by `columns`."""
+        volume = columns["volume"].astype(np.float64)
+        return _Snapshot(
+            np.concatenate([snapshot.open_time[:keep], columns["open_time"].astype(np.int64)]),
+            np.concatenate([snapshot.open_price[:keep], columns["open_price"].astype(np.float64)]),
+            np.concatenate([snapshot.close[:keep], columns["close"].astype(np.float64)]),
+            np.concatenate([snapshot.volume_prefix[:keep + 1], snapshot.volume_prefix[keep] + np.cumsum(volume)]),
+            snapshot.low.extended(np.concatenate([snapshot.low.values[:keep], columns["low"].astype(np.float64)]), keep),
+            snapshot.high.extended(np.concatenate([snapshot.high.values[:keep], columns["high"].astype(np.float64)]), keep),
+        )
+
+    def summary(self, start_time, end_time):
+        """
+        min/max/first/last/volume/count over open_time in [start_time, end_time],
+        or None when the range holds no candles.
+        """
+        snapshot = self._snapshot
+        i = int(np.searchsorted(snapshot.open_time, start_time, side="left"))
+        j = int(np.searchsorted(snapshot.open_time, end_time, side="right"))
+        if j <= i:
+            return None
+        return {
+            "min_price": float(snapshot.low.query(i, j)),
+            "max_price": float(snapshot.high.query(i, j)),
+            "first_price": float(snapshot.open_price[i]),
+            "last_price": float(snapshot.close[j - 1]),
+            "total_volume": float(snapshot.volume_prefix[j] - snapshot.volume_prefix[i]),
+            "data_points": j - i,
+        }
+
+    @property
+    def nbytes(self):
+        """Memory held by the indexed columns and sparse tables."""
+        snapshot = self._snapshot
+        return snapshot.nbytes if snapshot is not None else 0
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "rows": len(snapshot) if snapshot is not None else 0,
+            "memory_bytes": snapshot.nbytes if snapshot is not None else 0,
+            "builds": self._builds,
+            "appends": self._appends,
+            "splices": self._splices,
+            "version": self._version,
+        }
@@ -0,0 +1,73 @@
+"""
+Correctness tests for the backend, run from backend/:
+
+    python -m pytest tests
+
+They use small synthetic tables (benchmarks/synthetic.py); the timing side of
+each optimization lives in benchmarks/. Tests marked slow need multi-million
+row tables and only run with --slow.
+"""
+import os
+import sys
+
+import duckdb
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_database
+from rollups import refresh
+
+ROWS = 10_000
+SYMBOLS = ["BTCUSDT", "ETHUSDT"]
+
+
+def pytest_addoption(parser):
+    parser.addoption("--slow", action="store_true", help="also run the tests marked slow")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: needs multi-million row tables, runs only with --slow")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--slow"):
+        return
+    skip = pytest.mark.skip(reason="needs --slow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def backend(tmp_path_factory):
+    """
+    The main module serving a database file of ROWS candles per symbol in
+    SYMBOLS, with rollups. Its endpoint functions are called directly. The
+    model is read from an empty directory until tiny_model fills it.
+    """
+    path = create_database(str(tmp_path_factory.mktemp("db") / "binancedata.db"), ROWS, symbols=SYMBOLS)
+    conn = duckdb.connect(path)
+    try:
+        refresh(conn, sort=False)
+    finally:
+        conn.close()
+    with pytest.MonkeyPatch.context() as env:
+        env.setenv("DUCKDB_PATH", path)
+        env.setenv("MODEL_PRELOAD", "0")
+        env.setenv("ANALYSIS_CACHE_PATH", "")
+        env.setenv("MODEL_PATH", str(tmp_path_factory.mktemp("model")))
+        env.setenv("MODEL_DTYPE", "float32")
+        import main
+        yield main
+    main.db_pool.close()
+
+
+@pytest.fixture(scope="session")
+def tiny_model(backend):
+    """Writes a tiny random model (benchmarks/tiny_model.py) where the backend loads its model from."""
+    from benchmarks.inference_batching import prompts
+    from benchmarks.tiny_model import create_tiny_model
+
+    create_tiny_model(backend.settings.MODEL_PATH, prompts(backend.analysis_prompt, 5))
+    return backend
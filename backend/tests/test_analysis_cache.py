@@ -0,0 +1,60 @@
+"""The analysis cache persists to SQLite without running SQLite on the event loop."""
+import asyncio
+import threading
+
+import pytest
+
+from analysis_cache import AnalysisCache, _DiskStore
+
+
+@pytest.fixture
+def disk_threads(monkeypatch):
+    """Names of the threads every _DiskStore get/set ran on."""
+    threads = []
+    for name in ("get", "set"):
+        method = getattr(_DiskStore, name)
+
+        def recorded(self, *args, method=method):
+            threads.append(threading.current_thread().name)
+            return method(self, *args)
+
+        monkeypatch.setattr(_DiskStore, name, recorded)
+    return threads
+
+
+def test_disk_tier_survives_a_restart_off_the_loop(tmp_path, disk_threads):
+    path = str(tmp_path / "cache.sqlite")
+
+    async def store():
+        cache = AnalysisCache(disk_path=path)
+        await cache.set("key", {"analysis": "text"})
+        cache.close()
+
+    async def reload():
+        cache = AnalysisCache(disk_path=path)
+        try:
+            return await cache.lookup("key"), await cache.lookup("missing"), cache.stats()
+        finally:
+            cache.close()
+
+    asyncio.run(store())
+    value, missing, stats = asyncio.run(reload())
+    assert value == {"analysis": "text"} and missing is None
+    assert (stats["hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
+    assert len(disk_threads) == 3
+    assert threading.main_thread().name not in disk_threads
+
+
+def test_memory_hits_skip_the_disk(tmp_path, disk_threads):
+    async def run():
+        cache = AnalysisCache(disk_path=str(tmp_path / "cache.sqlite"))
+        try:
+            computed = await cache.get_or_compute("key", lambda: asyncio.sleep(0, {"analysis": "text"}))
+            return computed, await cache.get_or_compute("key", None)
+        finally:
+            cache.close()
+
+    computed, cached = asyncio.run(run())
+    assert computed == cached == {"analysis": "text"}
+    # The miss looked at the disk and stored to it; the hit came from memory
+    assert len(disk_threads) == 2
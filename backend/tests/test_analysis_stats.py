@@ -0,0 +1,56 @@
+"""The DuckDB analysis statistics match the old pandas computation, and the prompt formats them."""
+import math
+import random
+
+import duckdb
+import pytest
+
+from benchmarks.analysis_stats import pandas_stats
+from benchmarks.inference_batching import STATS
+from benchmarks.synthetic import create_klines, START_MS, INTERVAL_MS
+from market_stats import window_stats
+
+ROWS = 10_000
+DAY_MS = 24 * 60 * 60 * 1000
+LAST = START_MS + (ROWS - 1) * INTERVAL_MS
+
+
+def windows(count=50):
+    """The endpoint's 1d/3d/7d windows at random end dates, then one-candle, two-candle and empty ones."""
+    rng = random.Random(0)
+    picked = []
+    for _ in range(count):
+        end = rng.randint(START_MS, LAST + DAY_MS)
+        picked.append((end - rng.choice([1, 3, 7]) * DAY_MS, end))
+    return picked + [(START_MS, START_MS), (START_MS, START_MS + INTERVAL_MS), (START_MS - DAY_MS, START_MS - 1)]
+
+
+@pytest.fixture(scope="module")
+def conn():
+    conn = duckdb.connect()
+    create_klines(conn, ROWS)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("window", windows())
+def test_matches_pandas(conn, window):
+    reference, stats = pandas_stats(conn, *window), window_stats(conn, *window)
+    if reference is None:
+        assert stats is None
+        return
+    if reference["data_points"] < 3:
+        reference.pop("volatility")  # undefined (NaN) in pandas for one or two candles
+    for key, expected in reference.items():
+        if isinstance(expected, float):
+            assert math.isclose(stats[key], expected, rel_tol=1e-9, abs_tol=1e-9), key
+        else:
+            assert stats[key] == expected, key
+
+
+def test_prompt_takes_every_statistic(backend, conn):
+    stats = window_stats(conn, LAST - DAY_MS, LAST)
+    assert f"{stats['rsi']:.2f}" in backend.analysis_prompt(stats, "last 24 hours")
+    # The sample statistics the inference benchmarks generate from must stay complete
+    assert STATS.keys() >= stats.keys()
+    backend.analysis_prompt(STATS, "last 24 hours")
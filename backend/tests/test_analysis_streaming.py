@@ -0,0 +1,69 @@
+"""Streamed analyses: echo filtering, time to first token and cache accounting."""
+import asyncio
+import json
+import random
+
+import pytest
+
+from benchmarks.inference_batching import STATS
+from streaming import EchoFilter
+
+ECHOES = [
+    "1. Market Overview: the price rose.",
+    "  Data Summary for Analysis:\n- Time Period: ...\n\nMarket Overview\nThe trend is up. 1. Buy.",
+    "Data Summary for Analysis: - Starting Price: $1.00 Based on the data, hold.",
+    "Data Summary for Analysis: no marker follows here  ",
+]
+
+
+@pytest.mark.parametrize("text", ECHOES)
+def test_echo_filter_matches_clean_analysis(backend, text):
+    """Fed in random chunks, the incremental filter gives what clean_analysis gives on the whole text."""
+    rng = random.Random(0)
+    for _ in range(200):
+        echo, out, i = EchoFilter(), [], 0
+        while i < len(text):
+            step = rng.randint(1, 8)
+            out.append(echo.feed(text[i:i + step]))
+            i += step
+        out.append(echo.finish())
+        assert "".join(out) == backend.clean_analysis(text)
+
+
+def collect(events):
+    async def run():
+        return [event async for event in events]
+    return asyncio.run(run())
+
+
+def done_event(events):
+    event = next(event for event in events if event.startswith("event: done"))
+    return json.loads(event.split("data: ", 1)[1])
+
+
+def test_short_stream_reports_time_to_first_token(tiny_model):
+    """Output shorter than the echo filter's hold-back arrives in one piece at the end, and is still timed."""
+    backend = tiny_model
+    prompt = backend.analysis_prompt(STATS, "last 24 hours")
+    samples = backend.stream_stats.stats()
+    events = collect(backend.analysis_events(prompt, "1d", "greedy", 2, backend.make_key(prompt=prompt, test="short"), 0.0))
+    assert done_event(events)["time_to_first_token"] is not None
+    after = backend.stream_stats.stats()
+    assert after["completed"] == samples["completed"] + 1
+    assert after["time_to_first_token_mean"] is not None
+
+
+def test_stream_counts_cache_hits(tiny_model):
+    """The second identical stream is answered from the analysis cache and counted as a hit."""
+    backend = tiny_model
+    request = backend.AnalysisRequest(timeframe="1d", end_date="2017-03-01T00:00:00", profile="greedy", max_new_tokens=4)
+
+    async def stream():
+        response = await backend.stream_crypto_analysis(request)
+        return [event async for event in response.body_iterator]
+
+    before = backend.analysis_cache.stats()
+    assert "cached" not in done_event(asyncio.run(stream()))
+    assert done_event(asyncio.run(stream()))["cached"] is True
+    after = backend.analysis_cache.stats()
+    assert (after["misses"], after["hits"]) == (before["misses"] + 1, before["hits"] + 1)
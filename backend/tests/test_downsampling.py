@@ -0,0 +1,119 @@
+"""The max_points paths of /binance_data/ stay within max_points and keep the envelope."""
+import json
+
+import duckdb
+import numpy as np
+import pytest
+
+from downsampling import DOWNSAMPLERS, lttb, min_max
+
+DAY_MS = 24 * 60 * 60 * 1000
+INTERVAL_MS = 15 * 60 * 1000
+MAX_POINTS = (2, 3, 4, 5, 200, 800)
+
+
+@pytest.fixture(scope="module", params=[(7, 0), (90, 0), (30, 20), None], ids=["7d", "90d", "30d-inside", "all"])
+def window(request, backend):
+    """
+    (start, end) of a BTCUSDT range of some days starting mid-bucket and
+    ending some days (and, if any, mid-bucket) before the last candle.
+    """
+    conn = duckdb.connect(backend.settings.DB_PATH, read_only=True)
+    try:
+        first, last = conn.execute("SELECT MIN(open_time), MAX(open_time) FROM BinanceData WHERE symbol = 'BTCUSDT'").fetchone()
+    finally:
+        conn.close()
+    if request.param is None:
+        return first, last
+    days, before = request.param
+    end = last - before * DAY_MS - (5 * 60 * 60 * 1000 if before else 0)
+    return end - days * DAY_MS + 7 * 60 * 60 * 1000, end
+
+
+def true_envelope(backend, window, column_high="high", column_low="low"):
+    conn = duckdb.connect(backend.settings.DB_PATH, read_only=True)
+    try:
+        return conn.execute(
+            f"SELECT MAX({column_high}), MIN({column_low}) FROM BinanceData WHERE symbol = 'BTCUSDT' AND open_time BETWEEN ? AND ?",
+            list(window),
+        ).fetchone()
+    finally:
+        conn.close()
+
+
+def assert_within(candles, window):
+    """The candles hold no row from outside the window, even when they are partial buckets."""
+    start, end = window
+    assert min(candles["open_time"]) >= start
+    assert max(candles["close_time"]) < end + INTERVAL_MS
+
+
+@pytest.mark.parametrize("max_points", MAX_POINTS)
+def test_candles_keep_high_and_low(backend, window, max_points):
+    body = json.loads(backend.query_binance_data(*window, 10_000, 0, "columns", max_points, None, None, "BTCUSDT", "15m").body)
+    assert len(body["open_time"]) <= max_points
+    assert (max(body["high"]), min(body["low"])) == true_envelope(backend, window)
+    assert_within(body, window)
+
+
+@pytest.mark.parametrize("max_points", MAX_POINTS)
+def test_batch_candles_keep_high_and_low(backend, window, max_points):
+    body = json.loads(backend.query_binance_data_batch(["BTCUSDT", "ETHUSDT"], "15m", *window, max_points, 10_000).body)
+    btc = body["BTCUSDT"]
+    assert len(btc["open_time"]) <= max_points
+    assert (max(btc["high"]), min(btc["low"])) == true_envelope(backend, window)
+    assert_within(btc, window)
+
+
+def test_cursor_pages_match_one_response(backend, window):
+    start, end = window
+    whole = json.loads(backend.query_binance_data(start, end, 10_000, 0, "columns", 200, None, None, "BTCUSDT", "15m").body)
+    pages, cursor = {"open_time": [], "high": []}, None
+    while True:
+        response = backend.query_binance_data(start, end, 7, 0, "columns", 200, None, cursor, "BTCUSDT", "15m")
+        page = json.loads(response.body)
+        for column in pages:
+            pages[column] += page[column]
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+        cursor = int(cursor)
+    assert pages == {column: whole[column] for column in pages}
+
+
+@pytest.mark.parametrize("fmt", ["rows", "columns", "arrow"])
+def test_full_pages_carry_a_cursor_unless_downsampled(backend, window, fmt):
+    candles = backend.query_binance_data(*window, 3, 0, fmt, 200, None, None, "BTCUSDT", "15m")
+    assert "x-next-cursor" in candles.headers
+    for name in DOWNSAMPLERS:
+        picked = backend.query_binance_data(*window, 3, 0, fmt, 200, name, None, "BTCUSDT", "15m")
+        assert "x-next-cursor" not in picked.headers
+
+
+@pytest.mark.parametrize("max_points", MAX_POINTS)
+@pytest.mark.parametrize("name", sorted(DOWNSAMPLERS))
+def test_downsamplers_keep_highest_and_lowest_close(backend, window, name, max_points):
+    body = json.loads(backend.query_binance_data(*window, 10_000, 0, "columns", max_points, name, None, "BTCUSDT", "15m").body)
+    assert len(body["open_time"]) <= max_points
+    assert (max(body["close"]), min(body["close"])) == true_envelope(backend, window, "close", "close")
+
+
+@pytest.mark.parametrize("max_points", [2, 3, 4])
+def test_lttb_keeps_extremes_with_few_points(max_points):
+    y = np.array([5, 1, 9, 3, 7, 2, 8, 4, 6, 5.5])
+    keep = lttb(np.arange(len(y)), y, max_points)
+    assert len(keep) <= max_points
+    assert {1, 2} <= set(keep.tolist())
+
+
+@pytest.mark.parametrize("y", [[1, 9, 0, 2, 3, 4, 5, 6, 7, 8], [8, 7, 6, 5, 4, 3, 2, 1, 9, 0]])
+def test_lttb_extremes_in_one_bucket(y):
+    # Both extremes fall in the same bucket; neither displaces the first or last point
+    keep = lttb(np.arange(len(y)), y, 4).tolist()
+    assert keep[0] == 0 and keep[-1] == len(y) - 1
+    assert {int(np.argmin(y)), int(np.argmax(y))} <= set(keep)
+
+
+def test_short_series_returned_whole():
+    assert lttb(np.arange(3), [1, 2, 3], 5).tolist() == [0, 1, 2]
+    assert min_max(np.arange(3), [1, 2, 3], 5).tolist() == [0, 1, 2]
@@ -0,0 +1,17 @@
+"""Streaming /binance_data/export keeps the server's peak memory flat as the table grows."""
+import os
+
+import pytest
+
+from benchmarks.export_memory import measure, unbounded_formats
+
+pytestmark = [
+    pytest.mark.slow,
+    pytest.mark.skipif(not os.path.exists("/proc/self/clear_refs"), reason="peak RSS is reset through Linux procfs"),
+]
+
+
+def test_export_peak_rss_does_not_grow_with_the_table():
+    # Three times the rows may add no more than 64MB of peak RSS in any format
+    report = measure([2_000_000, 6_000_000], "128MB")
+    assert unbounded_formats(report, tolerance_mb=64) == [], report
@@ -0,0 +1,218 @@
+"""
+Incremental ingestion (ingest.py) stores every candle of the monthly CSVs
+exactly once, keeps the rollups and the summary index what a full rebuild
+gives, and leaves the database untouched when nothing is new or a run fails.
+"""
+import os
+import random
+import shutil
+from contextlib import closing
+from datetime import datetime, timezone
+
+import duckdb
+import numpy as np
+import pytest
+
+from benchmarks.incremental_ingest import write_month
+from benchmarks.summary_index import random_ranges, same_summary
+from benchmarks.synthetic import create_series, START_MS, INTERVAL_MS
+from ingest import CSV_COLUMNS, LOG_TABLE, SeriesLog, ingest
+from rollups import BASE_TABLE, ROLLUPS, refresh
+from summary_index import SummaryIndex
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT"]
+ROWS = 8_000  # 2017-01-01 to late March in 15m candles
+COLUMNS = ", ".join(CSV_COLUMNS)
+SERIES = [("symbol = ?", "BTCUSDT"), ("interval = ?", "15m")]
+
+
+def month_ms(month):
+    return int(datetime.strptime(month, "%Y-%m").replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def stored(database):
+    with closing(duckdb.connect(database, read_only=True)) as conn:
+        return conn.execute(f"SELECT symbol, interval, {COLUMNS} FROM {BASE_TABLE} ORDER BY symbol, open_time").fetchall()
+
+
+def published(source, until):
+    """The source candles before `until`, as stored() returns them."""
+    return source.execute(f"""
+    SELECT symbol, interval, {COLUMNS} FROM source WHERE open_time < ? ORDER BY symbol, open_time
+    """, [until]).fetchall()
+
+
+@pytest.fixture(scope="module")
+def source():
+    conn = duckdb.connect()
+    create_series(conn, SYMBOLS, ROWS, table="source")
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def database(tmp_path):
+    return str(tmp_path / "binancedata.db")
+
+
+@pytest.fixture
+def publish(source, tmp_path):
+    """publish(month, fraction=1.0, symbols=SYMBOLS) writes that month's CSVs; returns every series directory."""
+    directories = [str(tmp_path / f"{symbol}_15m_data") for symbol in SYMBOLS]
+    for directory in directories:
+        os.mkdir(directory)
+
+    def run(month, fraction=1.0, symbols=SYMBOLS):
+        for symbol, directory in zip(SYMBOLS, directories):
+            if symbol in symbols:
+                write_month(source, directory, symbol, month, fraction)
+        return directories
+
+    return run
+
+
+def test_appends_only_candles_not_stored_yet(source, publish, database):
+    publish("2017-01")
+    first = ingest(database, publish("2017-02", 0.5))
+    with closing(duckdb.connect(database, read_only=True)) as conn:
+        last = dict(conn.execute(f"SELECT symbol, MAX(open_time) FROM {BASE_TABLE} GROUP BY symbol").fetchall())
+    # February is read again in full; its first half is stored already
+    publish("2017-02")
+    second = ingest(database, publish("2017-03"))
+
+    assert stored(database) == published(source, month_ms("2017-04"))
+    assert [series["since"] for series in second["series"]] == [last[symbol] + INTERVAL_MS for symbol in SYMBOLS]
+    assert sum(series["added_rows"] for series in first["series"] + second["series"]) == len(SYMBOLS) * ROWS
+
+
+def test_microsecond_timestamps_stored_in_milliseconds(source, publish, database):
+    directories = publish("2017-01")
+    ingest(database, directories)
+    # The last day of January again and all of February, with microsecond timestamps as Binance writes them from 2025
+    february, march = month_ms("2017-02"), month_ms("2017-03")
+    for symbol, directory in zip(SYMBOLS, directories):
+        rows = source.execute(f"""
+        SELECT {COLUMNS} FROM source WHERE symbol = ? AND open_time >= ? AND open_time < ? ORDER BY open_time
+        """, [symbol, february - 96 * INTERVAL_MS, march]).fetchall()
+        with open(os.path.join(directory, f"{symbol}-15m-2017-02.csv"), "w") as f:
+            for row in rows:
+                row = [value * 1000 if name.endswith("_time") else value for name, value in zip(CSV_COLUMNS, row)]
+                f.write(",".join(str(value) for value in row) + "\n")
+
+    result = ingest(database, directories)
+    assert [series["since"] for series in result["series"]] == [february, february]
+    assert stored(database) == published(source, march)
+
+
+def test_invalidated_rollups_match_a_full_refresh(publish, database, tmp_path):
+    publish("2017-01")
+    ingest(database, publish("2017-02", 0.5))
+    # Both runs start inside a week, day and 4h bucket that is stored already
+    publish("2017-02")
+    ingest(database, publish("2017-03", 0.3))
+    ingest(database, publish("2017-03"))
+
+    rebuilt = str(tmp_path / "rebuilt.db")
+    shutil.copyfile(database, rebuilt)
+    with closing(duckdb.connect(rebuilt)) as conn:
+        refresh(conn, rebuild=True, sort=False)
+    with closing(duckdb.connect(database, read_only=True)) as ingested, closing(duckdb.connect(rebuilt, read_only=True)) as full:
+        for table, _, _ in ROLLUPS:
+            order = f"SELECT * FROM {table} ORDER BY symbol, interval, open_time"
+            expected, actual = full.execute(order).fetchnumpy(), ingested.execute(order).fetchnumpy()
+            assert expected.keys() == actual.keys()
+            for column, values in expected.items():
+                if values.dtype.kind == "f":
+                    assert np.allclose(values, actual[column], rtol=1e-12), (table, column)
+                else:
+                    assert np.array_equal(values, actual[column]), (table, column)
+
+
+def test_summary_index_splice_matches_a_rebuild(publish, database):
+    publish("2017-01")
+    ingest(database, publish("2017-02", 0.5))
+    index = SummaryIndex(SERIES)
+    with closing(duckdb.connect(database, read_only=True)) as conn:
+        index.refresh(conn, 0, SeriesLog(conn, "BTCUSDT", "15m"))
+    publish("2017-02")
+    ingest(database, publish("2017-03"))
+
+    rebuilt = SummaryIndex(SERIES)
+    with closing(duckdb.connect(database, read_only=True)) as conn:
+        index.refresh(conn, 1, SeriesLog(conn, "BTCUSDT", "15m"))
+        rebuilt.refresh(conn, 1)
+    assert (index.stats()["builds"], index.stats()["splices"]) == (1, 1)
+    assert index.stats()["rows"] == ROWS
+    for start_time, end_time in random_ranges(random.Random(3), START_MS, START_MS + (ROWS - 1) * INTERVAL_MS, 300):
+        spliced, full = index.summary(start_time, end_time), rebuilt.summary(start_time, end_time)
+        assert same_summary(spliced, full), (start_time, end_time, spliced, full)
+
+
+def test_changed_since(source, publish, database):
+    publish("2017-01")
+    directories = publish("2017-02", 0.5)
+    ingest(database, directories)
+    result = ingest(database, publish("2017-02", symbols=["BTCUSDT"]))
+    assert [series["symbol"] for series in result["series"]] == ["BTCUSDT"]
+
+    with closing(duckdb.connect(database, read_only=True)) as conn:
+        btc, eth = SeriesLog(conn, "BTCUSDT", "15m"), SeriesLog(conn, "ETHUSDT", "15m")
+        assert btc.version == eth.version == 2
+        assert btc.changed_since(1) == result["series"][0]["since"]
+        assert btc.changed_since(2) is None
+        assert eth.changed_since(1) is None
+        for version in (None, 0, 3):
+            with pytest.raises(LookupError):
+                btc.changed_since(version)
+    with pytest.raises(LookupError):
+        SeriesLog(source, "BTCUSDT", "15m").changed_since(1)
+
+    # A series rewritten outside ingest no longer matches the row count logged for it
+    with closing(duckdb.connect(database)) as conn:
+        conn.execute(f"DELETE FROM {BASE_TABLE} WHERE symbol = 'ETHUSDT' AND open_time = ?", [START_MS])
+        with pytest.raises(LookupError):
+            SeriesLog(conn, "ETHUSDT", "15m").changed_since(2)
+        assert SeriesLog(conn, "BTCUSDT", "15m").changed_since(2) is None
+
+
+def test_second_ingest_of_the_same_files_writes_nothing(publish, database):
+    publish("2017-01")
+    directories = publish("2017-02")
+    first = ingest(database, directories)
+    with open(database, "rb") as f:
+        before = os.stat(database).st_mtime_ns, f.read()
+
+    assert ingest(database, directories) == {"version": first["version"], "series": []}
+    with open(database, "rb") as f:
+        assert (os.stat(database).st_mtime_ns, f.read()) == before
+    assert not os.path.exists(database + ".ingest")
+
+
+def test_failed_ingest_leaves_the_database_and_releases_the_lock(publish, database):
+    directories = publish("2017-01")
+    ingest(database, directories)
+    with open(database, "rb") as f:
+        before = f.read()
+    # BTCUSDT is appended to the staging copy before ETHUSDT's CSV fails to parse
+    publish("2017-02", symbols=["BTCUSDT"])
+    with open(os.path.join(directories[1], "ETHUSDT-15m-2017-02.csv"), "w") as f:
+        f.write("not,a,kline\n")
+    with pytest.raises(duckdb.Error):
+        ingest(database, directories)
+
+    with open(database, "rb") as f:
+        assert f.read() == before
+    assert not os.path.exists(database + ".ingest")
+    publish("2017-02")
+    assert [series["symbol"] for series in ingest(database, directories)["series"]] == SYMBOLS
+    with closing(duckdb.connect(database, read_only=True)) as conn:
+        assert conn.execute(f"SELECT MAX(version) FROM {LOG_TABLE}").fetchone()[0] == 2
+
+
+def test_concurrent_run_refused(publish, database):
+    open(database + ".ingest", "w").close()
+    with pytest.raises(FileExistsError):
+        ingest(database, publish("2017-01"))
+    # The other run's staging file is not ours to remove
+    assert os.path.exists(database + ".ingest")
+    assert not os.path.exists(database)
@@ -0,0 +1,45 @@
+"""Models unload after idling however they were loaded, and stats never wait on a load."""
+import time
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def test_lazily_loaded_model_unloads_when_idle(tiny_model):
+    registry = tiny_model.ModelRegistry("tiny", local_path=tiny_model.settings.MODEL_PATH, dtype="float32", idle_unload_seconds=1)
+    try:
+        with registry.use() as (tokenizer, model, _):
+            assert model is not None
+        assert wait_for(lambda: not registry.loaded)
+        assert registry.unloads == 1
+
+        # A later use loads it again, and the same watcher unloads it again
+        with registry.use():
+            pass
+        assert wait_for(lambda: not registry.loaded)
+        assert registry.loads == registry.unloads == 2
+    finally:
+        registry.shutdown()
+
+
+def test_model_stays_loaded_while_in_use(tiny_model):
+    registry = tiny_model.ModelRegistry("tiny", local_path=tiny_model.settings.MODEL_PATH, dtype="float32", idle_unload_seconds=1)
+    try:
+        with registry.use():
+            time.sleep(2.5)
+            assert registry.loaded
+    finally:
+        registry.shutdown()
+
+
+def test_stats_do_not_wait_on_a_load(tiny_model):
+    registry = tiny_model.ModelRegistry("tiny", local_path=tiny_model.settings.MODEL_PATH, dtype="float32")
+    with registry._lock:
+        # load() holds the lock for the whole load; stats() must still answer
+        assert registry.stats()["loaded"] is False
@@ -0,0 +1,105 @@
+"""
+Every query the data endpoints run returns the same rows with bound
+parameters (and as a prepared statement) as with the values formatted into
+the SQL. The queries are recorded from the endpoint functions themselves.
+"""
+from contextlib import contextmanager
+
+import duckdb
+import numpy as np
+import pytest
+
+from benchmarks.prepared_queries import Prepared, formatted
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+class Recorder:
+    """A pooled connection that logs every parameterized statement run on it."""
+
+    def __init__(self, conn, log):
+        self._conn, self._log = conn, log
+
+    def execute(self, sql, params=None):
+        if params:
+            self._log.append((sql, list(params)))
+        return self._conn.execute(sql, params) if params is not None else self._conn.execute(sql)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def endpoint_calls(backend, first, last):
+    """(name, call) for each path of the data endpoints, on ranges of the test database."""
+    week, quarter = last - 7 * DAY_MS + 3 * 60 * 60 * 1000, last - 90 * DAY_MS + 7 * 60 * 60 * 1000
+    cursor = quarter + 1000 * 15 * 60 * 1000
+    page = lambda *args: lambda: backend.query_binance_data(*args, "BTCUSDT", "15m")
+    export = lambda fmt, after: lambda: backend.read_export_chunk(backend.ExportEncoder(fmt), after, last, 100, "BTCUSDT", "15m")
+    return [
+        ("page", page(week, last, 100, 7, "rows", None, None, None)),
+        ("cursor page", page(week, last, 100, 0, "columns", None, None, week + 10 * 15 * 60 * 1000)),
+        ("open-ended page", page(None, last, 100, 0, "columns", None, None, None)),
+        ("base-table candles", page(week, last, 100, 0, "columns", 200, None, None)),
+        ("rollup candles", page(quarter, last, 1000, 0, "columns", 200, None, None)),
+        ("rollup candles after a cursor", page(quarter, last, 10, 0, "arrow", 200, None, cursor)),
+        ("regrouped rollup candles", page(None, last, 1000, 0, "columns", 7, None, None)),
+        ("downsampled", page(quarter, last, 1000, 0, "columns", 200, "lttb", None)),
+        ("batch", lambda: backend.query_binance_data_batch(["BTCUSDT", "ETHUSDT"], "15m", week, last, None, 100)),
+        ("batch candles", lambda: backend.query_binance_data_batch(["BTCUSDT", "ETHUSDT"], "15m", quarter, last, 200, 100)),
+        ("single record", lambda: backend.query_single_binance_record(first + 96 * 15 * 60 * 1000, "BTCUSDT", "15m")),
+        ("export", export("ndjson", None)),
+        ("export after a cursor", export("arrow", quarter)),
+        ("price summary", lambda: backend.query_price_summary("custom", quarter, last, "BTCUSDT", "15m")),
+        ("analysis statistics", lambda: backend.load_analysis_stats(week, last, "BTCUSDT", "15m")),
+    ]
+
+
+@pytest.fixture(scope="module")
+def queries(backend):
+    """(endpoint path, sql, params) of every parameterized statement the endpoints ran."""
+    conn = duckdb.connect(backend.settings.DB_PATH, read_only=True)
+    try:
+        first, last = conn.execute("SELECT MIN(open_time), MAX(open_time) FROM BinanceData WHERE symbol = 'BTCUSDT'").fetchone()
+    finally:
+        conn.close()
+
+    original, log, recorded = backend.get_db_connection, [], []
+
+    @contextmanager
+    def recording():
+        with original() as conn:
+            yield Recorder(conn, log)
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(backend, "get_db_connection", recording)
+        # Rebuilt so its build and refresh queries are recorded too
+        backend.summary_indexes.clear()
+        for name, call in endpoint_calls(backend, first, last):
+            call()
+            recorded += [(name, sql, params) for sql, params in log]
+            log.clear()
+    return recorded
+
+
+def test_every_endpoint_path_ran_a_query(queries):
+    assert {name for name, _, _ in queries} == {name for name, _ in endpoint_calls(None, 0, 0)}
+
+
+@pytest.mark.parametrize("method", ["bound", "prepared"])
+def test_same_rows_as_formatted_sql(backend, queries, method):
+    conn = duckdb.connect(backend.settings.DB_PATH, read_only=True)
+    statements = Prepared()
+    run = {
+        "bound": lambda sql, params: conn.execute(sql, params),
+        "prepared": lambda sql, params: statements.execute(conn, sql, params),
+    }[method]
+    try:
+        for name, sql, params in queries:
+            expected = conn.execute(formatted(sql, params)).fetchnumpy()
+            actual = run(sql, params).fetchnumpy()
+            # By position: unnamed expressions are named after their literal or parameter
+            assert len(expected) == len(actual), name
+            for (column, want), got in zip(expected.items(), actual.values()):
+                assert np.array_equal(want, got), (name, column, sql, params)
+    finally:
+        conn.close()
@@ -0,0 +1,58 @@
+"""
+Generating from the cached instruction prefix (prompt_cache.py) gives token
+for token what prefilling the whole prompt gives, alone and in batches whose
+tails differ in length ([prefix][pad][tail]).
+"""
+import pytest
+
+from benchmarks.prompt_prefix_cache import variants
+
+
+@pytest.fixture
+def generate(tiny_model, monkeypatch):
+    """
+    generate(prompts, kwargs, cached) runs generate_analyses with the prefix
+    cache on or off; returns the inputs model.generate got and the generated
+    token ids of each row.
+    """
+    registry, cache = tiny_model.model_registry, tiny_model.prompt_cache
+    registry.load()
+    model = registry.model
+    original, calls = model.generate, []
+
+    def recording(**kwargs):
+        output = original(**kwargs)
+        calls.append((kwargs, output[:, kwargs["input_ids"].shape[1]:].tolist()))
+        return output
+
+    monkeypatch.setattr(model, "generate", recording)
+    monkeypatch.setattr(cache, "max_entries", cache.max_entries)
+    cache.clear()
+
+    def run(prompts, kwargs, cached):
+        cache.max_entries = 8 if cached else 0
+        tiny_model.generate_analyses(prompts, kwargs)
+        return calls[-1]
+
+    yield run
+    cache.clear()
+
+
+@pytest.mark.parametrize("profile", ["greedy", "beam"])
+@pytest.mark.parametrize("rows", [1, 3, 8])
+def test_cached_prefix_generates_the_same_tokens(tiny_model, generate, profile, rows):
+    from generation import generation_kwargs
+
+    prompts = variants(tiny_model.analysis_prompt, 8)[:rows]
+    kwargs = generation_kwargs(profile, 24)
+    full, expected = generate(prompts, kwargs, cached=False)
+    assert full.get("past_key_values") is None
+    if rows > 1:
+        # Tails of different lengths leave padding between prefix and tail
+        assert not full["attention_mask"].all()
+
+    for _ in range(2):  # fills the cache, then hits it
+        inputs, tokens = generate(prompts, kwargs, cached=True)
+        assert inputs["past_key_values"] is not None
+        assert inputs["input_ids"].equal(full["input_ids"])
+        assert tokens == expected
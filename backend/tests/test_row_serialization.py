@@ -0,0 +1,54 @@
+"""The column-wise /binance_data/ row JSON is byte-for-byte what the per-row pydantic path produced."""
+import time
+
+import duckdb
+import pytest
+
+from benchmarks.synthetic import create_klines, START_MS
+
+ROWS = 10_000
+ZONES = ["UTC", "America/New_York", "Asia/Kolkata", "Australia/Lord_Howe"]
+
+
+@pytest.fixture(scope="module")
+def conn():
+    conn = duckdb.connect()
+    create_klines(conn, ROWS)
+    # Rows the synthetic walk never produces: NaN and infinite values, NULLs,
+    # timestamps with milliseconds (microseconds in isoformat()), around
+    # 2021's DST switches and before the epoch
+    conn.execute("""
+        INSERT INTO BinanceData
+        SELECT open_time, 'NaN'::DOUBLE, 'Infinity'::DOUBLE, '-Infinity'::DOUBLE, 1.5, 'NaN'::DOUBLE,
+               open_time + 899999, 0.0, 7, 0.0, 0.0, NULL
+        FROM (VALUES (1615705199999), (1615705200001), (1636264800123), (1636268399999), (-1), (0)) t(open_time)
+    """)
+    conn.execute("UPDATE BinanceData SET open_time = open_time + 123, close_time = close_time + 456 WHERE open_time = ?", [START_MS])
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(params=ZONES + [None], ids=ZONES + ["fallback"])
+def zone(request, monkeypatch, backend):
+    """Local time zone of the process; "fallback" converts row by row with datetime."""
+    import serialization
+
+    monkeypatch.setenv("TZ", request.param or "America/New_York")
+    time.tzset()
+    monkeypatch.setattr(serialization, "_LOCAL_ZONE", serialization._local_zone_key() if request.param else None)
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_rows_match_the_pydantic_path(backend, conn, zone):
+    from benchmarks.row_serialization import fast_payload, legacy_payload
+
+    assert fast_payload(conn) == legacy_payload(conn)
+
+
+def test_local_zone_detected(zone):
+    import serialization
+
+    if zone is not None:
+        assert serialization._LOCAL_ZONE == zone
@@ -0,0 +1,65 @@
+"""The /price_summary index answers every range exactly like a scan of the table, also after appends."""
+import random
+
+import duckdb
+import pytest
+
+from benchmarks.summary_index import random_ranges, same_summary, scan
+from benchmarks.synthetic import create_klines, START_MS, INTERVAL_MS
+from summary_index import SummaryIndex
+
+ROWS = 10_000
+APPENDS = (1, 63, 1000)
+
+
+def assert_matches_scan(conn, index, rows, rng):
+    last = START_MS + (rows - 1) * INTERVAL_MS
+    for start_time, end_time in random_ranges(rng, START_MS, last, 300):
+        indexed, scanned = index.summary(start_time, end_time), scan(conn, start_time, end_time)
+        assert same_summary(indexed, scanned), (start_time, end_time, indexed, scanned)
+
+
+@pytest.fixture
+def conn():
+    conn = duckdb.connect()
+    create_klines(conn, ROWS + sum(APPENDS), table="AllKlines")
+    conn.execute(f"CREATE TABLE BinanceData AS SELECT * FROM AllKlines ORDER BY open_time LIMIT {ROWS}")
+    yield conn
+    conn.close()
+
+
+def test_matches_scan_after_appends(conn):
+    rng = random.Random(7)
+    index = SummaryIndex()
+    index.refresh(conn, database_id=0)
+    assert_matches_scan(conn, index, ROWS, rng)
+    rows = ROWS
+    for database_id, appended in enumerate(APPENDS, start=1):
+        conn.execute(f"INSERT INTO BinanceData SELECT * FROM AllKlines ORDER BY open_time LIMIT {appended} OFFSET {rows}")
+        rows += appended
+        index.refresh(conn, database_id)
+        assert_matches_scan(conn, index, rows, rng)
+    assert index.stats()["builds"] == 1
+
+
+def test_rewritten_candle_forces_rebuild(conn):
+    index = SummaryIndex()
+    index.refresh(conn, database_id=0)
+    conn.execute(f"UPDATE BinanceData SET high = high * 2 WHERE open_time = {START_MS + 10 * INTERVAL_MS}")
+    index.refresh(conn, database_id=1)
+    assert index.stats()["builds"] == 2
+    assert_matches_scan(conn, index, ROWS, random.Random(7))
+
+
+def test_least_recently_used_series_dropped_beyond_budget(backend, monkeypatch):
+    backend.summary_indexes.clear()
+    backend.refresh_summary_index("BTCUSDT", "15m")
+    backend.refresh_summary_index("ETHUSDT", "15m")
+    assert list(backend.summary_indexes) == [("BTCUSDT", "15m"), ("ETHUSDT", "15m")]
+    assert backend.summary_indexes[("BTCUSDT", "15m")].nbytes > 0
+
+    # Over budget the series just asked for is kept, the others are dropped
+    monkeypatch.setattr(backend.settings, "SUMMARY_INDEX_MEMORY_MB", 0)
+    index = backend.refresh_summary_index("BTCUSDT", "15m")
+    assert list(backend.summary_indexes) == [("BTCUSDT", "15m")]
+    assert backend.query_price_summary("custom", 0, None, "BTCUSDT", "15m")["data_points"] == len(index._snapshot)
@@ -0,0 +1,241 @@
+"""Bounded executors that keep blocking DuckDB and model work off the event loop."""
+import asyncio
+import contextvars
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when an executor already has its maximum number of jobs waiting."""
+
+
+class JobTimeout(Exception):
+    """Raised when a batched job did not finish within its timeout."""
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a fixed number of workers and a bounded backlog.
+    Jobs beyond workers + max_queue are rejected instead of piling up.
+    """
+
+    def __init__(self, name, workers, max_queue):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """Submits a job and returns a concurrent.futures.Future."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise QueueFull(f"{self.name} queue is full ({self.max_queue} jobs waiting)")
+        with self._lock:
+            self._pending += 1
+        try:
+            # The job sees the submitter's context variables, such as the request's stage timings
+            future = self._executor.submit(contextvars.copy_context().run, self._run, fn, args, kwargs)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            raise
+        # Release the slot when the job really finishes, not when the caller stops waiting
+        future.add_done_callback(self._done)
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs a blocking job on the pool and awaits its result."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def _run(self, fn, args, kwargs):
+        with self._lock:
+            self._pending -= 1
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _done(self, future):
+        with self._lock:
+            if future.cancelled():
+                # Cancelled before a worker picked it up
+                self._pending -= 1
+            else:
+                self._completed += 1
+        self._slots.release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+
+
+class _BatchJob:
+    def __init__(self, item, deadline):
+        self.item = item
+        self.deadline = deadline
+        self.future = Future()
+
+
+class BatchingExecutor:
+    """
+    Collects single jobs into batches for a function that is much cheaper per
+    item when given many at once, such as model.generate on padded prompts.
+
+    A batch starts with the first waiting job and takes whatever else arrives
+    within max_wait_seconds, up to max_batch_size. Batches run one at a time on
+    `executor`, and new jobs queue up for the next batch in the meantime.
+    run_batch(items) must return one result per item, in order. Jobs still
+    waiting when their timeout passes are dropped with JobTimeout.
+    """
+
+    def __init__(self, name, run_batch, executor, max_batch_size=4, max_wait_seconds=0.05, max_queue=64):
+        self.name = name
+        self.run_batch = run_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.max_queue = max_queue
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+        self._waiting = 0
+        self._batches = 0
+        self._batched_jobs = 0
+        self._largest_batch = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name=f"{self.name}-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, item, timeout=None):
+        """Queues one job and returns a concurrent.futures.Future for its result."""
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self._rejected += 1
+                raise QueueFull(f"{self.name} queue is full ({self.max_queue} jobs waiting)")
+            self._waiting += 1
+        self._start()
+        job = _BatchJob(item, time.monotonic() + timeout if timeout else None)
+        self._queue.put(job)
+        return job.future
+
+    async def run(self, item, timeout=None):
+        """Runs one job as part of a batch and awaits its result."""
+        future = self.submit(item, timeout)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timed_out += 1
+            raise JobTimeout(f"{self.name} job did not finish within {timeout:g} seconds")
+
+    def _collect(self):
+        """Blocks for the first job, then gathers more until the batch is full or the wait is over."""
+        batch = [self._queue.get()]
+        if batch[0] is None:
+            return None
+        window_end = time.monotonic() + self.max_wait_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = window_end - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if job is None:
+                self._queue.put(None)
+                break
+            batch.append(job)
+        with self._lock:
+            self._waiting -= len(batch)
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            now = time.monotonic()
+            live = []
+            for job in batch:
+                # Cancelled jobs (the caller gave up) are skipped, expired ones failed
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                if job.deadline is not None and now >= job.deadline:
+                    job.future.set_exception(JobTimeout(f"{self.name} job timed out while queued"))
+                    with self._lock:
+                        self._timed_out += 1
+                    continue
+                live.append(job)
+            if not live:
+                continue
+            with self._lock:
+                self._batches += 1
+                self._batched_jobs += len(live)
+                self._largest_batch = max(self._largest_batch, len(live))
+            try:
+                results = self.executor.submit(self.run_batch, [job.item for job in live]).result()
+                for job, result in zip(live, results):
+                    job.future.set_result(result)
+            except BaseException as e:
+                logger.exception("%s batch failed", self.name)
+                for job in live:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+            with self._lock:
+                self._completed += len(live)
+
+    def shutdown(self):
+        with self._lock:
+            if self._thread is None or self._stopped:
+                return
+            self._stopped = True
+        self._queue.put(None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+                "max_queue": self.max_queue,
+                "queued": self._waiting,
+                "batches": self._batches,
+                "mean_batch_size": self._batched_jobs / self._batches if self._batches else None,
+                "largest_batch": self._largest_batch,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+            }
@@ -185,29 +185,33 @@ function CandlestickChart() {
           start_time: queryStartTime,
           end_time: endDateTime,
           limit: 10000,   // Increased limit for more data points
+          format: 'columns', // Column arrays with epoch-ms timestamps, much smaller than row JSON
+          max_points: chartContainerRef.current.clientWidth, // At most one candle per pixel
         },
       });
 
-      console.log(`Received ${response.data?.length} data points`);
+      const columns = response.data || {};
+      const openTimes = columns.open_time || [];
+      console.log(`Received ${openTimes.length} data points`);
 
-      if (response.data && response.data.length > 0) {
-        // Format data for candlestick chart - parse timestamp correctly
-        const candlestickData = response.data.map((item) => {
+      if (openTimes.length > 0) {
+        // Format data for candlestick chart - timestamps are epoch milliseconds
+        const candlestickData = openTimes.map((openTime, i) => {
           return {
-            time: Math.floor(new Date(item.open_time).getTime() / 1000),
-            open: parseFloat(item.open_price),
-            high: parseFloat(item.high),
-            low: parseFloat(item.low),
-            close: parseFloat(item.close),
+            time: Math.floor(openTime / 1000),
+            open: columns.open_price[i],
+            high: columns.high[i],
+            low: columns.low[i],
+            close: columns.close[i],
           };
         });
 
         // Format data for volume
-        const volumeData = response.data.map((item) => {
+        const volumeData = openTimes.map((openTime, i) => {
           return {
-            time: Math.floor(new Date(item.open_time).getTime() / 1000),
-            value: parseFloat(item.volume),
-            color: parseFloat(item.close) >= parseFloat(item.open_price) ? '#26a69a' : '#ef5350',
+            time: Math.floor(openTime / 1000),
+            value: columns.volume[i],
+            color: columns.close[i] >= columns.open_price[i] ? '#26a69a' : '#ef5350',
           };
         });
 
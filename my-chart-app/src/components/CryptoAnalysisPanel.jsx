@@ -45,7 +45,7 @@ function CryptoAnalysisPanel() {
       setAnalysis(formattedAnalysis);
       setGeneratedAt(new Date(response.data.generated_at).toLocaleString());
       
-      console.log(`Analysis generated in ${response.data.execution_time.toFixed(2)} seconds`);
+      console.log(`Analysis generated in ${response.data.execution_time.toFixed(2)} seconds (${response.data.profile} profile, ${response.data.generated_tokens ?? '?'} tokens at ${response.data.tokens_per_second?.toFixed(1) ?? '?'} tokens/s)`);
     } catch (err) {
       console.error('Error fetching analysis:', err);
       setError(err.response?.data?.detail || 'Failed to generate analysis. Please try again later.');
@@ -145,14 +145,18 @@ function LineChart() {
         params: {
           start_time: queryStartTime,
           end_time: endDateTime, 
-          limit: 10000 // Increased to get more historical data points
+          limit: 10000, // Increased to get more historical data points
+          format: 'columns', // Column arrays with epoch-ms timestamps, much smaller than row JSON
+          max_points: 2 * chartContainerRef.current.clientWidth, // Lowest and highest close per pixel
+          downsample: 'minmax'
         }
       });
   
-      if (response.data && response.data.length > 0) {
-        const lineData = response.data.map(item => ({
-          time: Math.floor(new Date(item.open_time).getTime() / 1000),
-          value: parseFloat(item.close)
+      const { open_time: openTimes = [], close = [] } = response.data || {};
+      if (openTimes.length > 0) {
+        const lineData = openTimes.map((openTime, i) => ({
+          time: Math.floor(openTime / 1000),
+          value: close[i]
         }));
   
         console.log(`Line chart: Received ${lineData.length} data points`);
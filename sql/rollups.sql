@@ -0,0 +1,173 @@
+-- Post-load upkeep of the BinanceData candle table: keeps it sorted on
+-- (symbol, interval, open_time) and maintains OHLCV rollups of every series at
+-- 1h/4h/1d/1w resolution.
+--
+-- Run after every load (SparkPreprocessor does this, or: python backend/rollups.py).
+-- The refresh is incremental per series: only the last bucket already present in
+-- each rollup (which may have been partial) and everything after it is recomputed.
+-- Buckets are aligned on UTC epoch milliseconds; weeks start on Monday.
+-- open_price/close come from the first/last candle of the bucket by open_time.
+-- Statements are separated by semicolons and must not contain any themselves.
+
+-- Databases loaded before the symbol/interval columns existed hold BTCUSDT 15m only
+ALTER TABLE BinanceData ADD COLUMN IF NOT EXISTS symbol VARCHAR DEFAULT 'BTCUSDT';
+ALTER TABLE BinanceData ADD COLUMN IF NOT EXISTS interval VARCHAR DEFAULT '15m';
+
+-- Base table order: DuckDB skips row groups by their min/max symbol, interval and
+-- open_time, so a range of one series only reads what it needs when the table is
+-- stored sorted. Spark's parallel JDBC writes do not guarantee that.
+CREATE OR REPLACE TABLE BinanceData AS SELECT * FROM BinanceData ORDER BY symbol, interval, open_time;
+
+-- 1 hour
+CREATE TABLE IF NOT EXISTS BinanceData_1h AS SELECT * FROM BinanceData LIMIT 0;
+ALTER TABLE BinanceData_1h ADD COLUMN IF NOT EXISTS symbol VARCHAR DEFAULT 'BTCUSDT';
+ALTER TABLE BinanceData_1h ADD COLUMN IF NOT EXISTS interval VARCHAR DEFAULT '15m';
+
+CREATE OR REPLACE TEMP TABLE rollup_watermark AS
+SELECT symbol, interval, MAX(open_time - (open_time % 3600000)) AS since
+FROM BinanceData_1h
+GROUP BY symbol, interval;
+
+DELETE FROM BinanceData_1h
+USING rollup_watermark
+WHERE BinanceData_1h.symbol = rollup_watermark.symbol
+  AND BinanceData_1h.interval = rollup_watermark.interval
+  AND BinanceData_1h.open_time >= rollup_watermark.since;
+
+INSERT INTO BinanceData_1h BY NAME
+SELECT
+    b.symbol AS symbol,
+    b.interval AS interval,
+    MIN(b.open_time) AS open_time,
+    arg_min(b.open_price, b.open_time) AS open_price,
+    MAX(b.high) AS high,
+    MIN(b.low) AS low,
+    arg_max(b.close, b.open_time) AS close,
+    SUM(b.volume) AS volume,
+    MAX(b.close_time) AS close_time,
+    SUM(b.quote_asset_volume) AS quote_asset_volume,
+    SUM(b.ntrades) AS ntrades,
+    SUM(b.taker_buy_base_asset_volume) AS taker_buy_base_asset_volume,
+    SUM(b.taker_buy_quote_asset_volume) AS taker_buy_quote_asset_volume,
+    NULL AS ignore
+FROM BinanceData b
+LEFT JOIN rollup_watermark w ON b.symbol = w.symbol AND b.interval = w.interval
+WHERE w.since IS NULL OR b.open_time >= w.since
+GROUP BY b.symbol, b.interval, (b.open_time - (b.open_time % 3600000))
+ORDER BY symbol, interval, open_time;
+
+-- 4 hours
+CREATE TABLE IF NOT EXISTS BinanceData_4h AS SELECT * FROM BinanceData LIMIT 0;
+ALTER TABLE BinanceData_4h ADD COLUMN IF NOT EXISTS symbol VARCHAR DEFAULT 'BTCUSDT';
+ALTER TABLE BinanceData_4h ADD COLUMN IF NOT EXISTS interval VARCHAR DEFAULT '15m';
+
+CREATE OR REPLACE TEMP TABLE rollup_watermark AS
+SELECT symbol, interval, MAX(open_time - (open_time % 14400000)) AS since
+FROM BinanceData_4h
+GROUP BY symbol, interval;
+
+DELETE FROM BinanceData_4h
+USING rollup_watermark
+WHERE BinanceData_4h.symbol = rollup_watermark.symbol
+  AND BinanceData_4h.interval = rollup_watermark.interval
+  AND BinanceData_4h.open_time >= rollup_watermark.since;
+
+INSERT INTO BinanceData_4h BY NAME
+SELECT
+    b.symbol AS symbol,
+    b.interval AS interval,
+    MIN(b.open_time) AS open_time,
+    arg_min(b.open_price, b.open_time) AS open_price,
+    MAX(b.high) AS high,
+    MIN(b.low) AS low,
+    arg_max(b.close, b.open_time) AS close,
+    SUM(b.volume) AS volume,
+    MAX(b.close_time) AS close_time,
+    SUM(b.quote_asset_volume) AS quote_asset_volume,
+    SUM(b.ntrades) AS ntrades,
+    SUM(b.taker_buy_base_asset_volume) AS taker_buy_base_asset_volume,
+    SUM(b.taker_buy_quote_asset_volume) AS taker_buy_quote_asset_volume,
+    NULL AS ignore
+FROM BinanceData b
+LEFT JOIN rollup_watermark w ON b.symbol = w.symbol AND b.interval = w.interval
+WHERE w.since IS NULL OR b.open_time >= w.since
+GROUP BY b.symbol, b.interval, (b.open_time - (b.open_time % 14400000))
+ORDER BY symbol, interval, open_time;
+
+-- 1 day
+CREATE TABLE IF NOT EXISTS BinanceData_1d AS SELECT * FROM BinanceData LIMIT 0;
+ALTER TABLE BinanceData_1d ADD COLUMN IF NOT EXISTS symbol VARCHAR DEFAULT 'BTCUSDT';
+ALTER TABLE BinanceData_1d ADD COLUMN IF NOT EXISTS interval VARCHAR DEFAULT '15m';
+
+CREATE OR REPLACE TEMP TABLE rollup_watermark AS
+SELECT symbol, interval, MAX(open_time - (open_time % 86400000)) AS since
+FROM BinanceData_1d
+GROUP BY symbol, interval;
+
+DELETE FROM BinanceData_1d
+USING rollup_watermark
+WHERE BinanceData_1d.symbol = rollup_watermark.symbol
+  AND BinanceData_1d.interval = rollup_watermark.interval
+  AND BinanceData_1d.open_time >= rollup_watermark.since;
+
+INSERT INTO BinanceData_1d BY NAME
+SELECT
+    b.symbol AS symbol,
+    b.interval AS interval,
+    MIN(b.open_time) AS open_time,
+    arg_min(b.open_price, b.open_time) AS open_price,
+    MAX(b.high) AS high,
+    MIN(b.low) AS low,
+    arg_max(b.close, b.open_time) AS close,
+    SUM(b.volume) AS volume,
+    MAX(b.close_time) AS close_time,
+    SUM(b.quote_asset_volume) AS quote_asset_volume,
+    SUM(b.ntrades) AS ntrades,
+    SUM(b.taker_buy_base_asset_volume) AS taker_buy_base_asset_volume,
+    SUM(b.taker_buy_quote_asset_volume) AS taker_buy_quote_asset_volume,
+    NULL AS ignore
+FROM BinanceData b
+LEFT JOIN rollup_watermark w ON b.symbol = w.symbol AND b.interval = w.interval
+WHERE w.since IS NULL OR b.open_time >= w.since
+GROUP BY b.symbol, b.interval, (b.open_time - (b.open_time % 86400000))
+ORDER BY symbol, interval, open_time;
+
+-- 1 week
+CREATE TABLE IF NOT EXISTS BinanceData_1w AS SELECT * FROM BinanceData LIMIT 0;
+ALTER TABLE BinanceData_1w ADD COLUMN IF NOT EXISTS symbol VARCHAR DEFAULT 'BTCUSDT';
+ALTER TABLE BinanceData_1w ADD COLUMN IF NOT EXISTS interval VARCHAR DEFAULT '15m';
+
+CREATE OR REPLACE TEMP TABLE rollup_watermark AS
+SELECT symbol, interval, MAX(open_time - ((open_time - 345600000) % 604800000)) AS since
+FROM BinanceData_1w
+GROUP BY symbol, interval;
+
+DELETE FROM BinanceData_1w
+USING rollup_watermark
+WHERE BinanceData_1w.symbol = rollup_watermark.symbol
+  AND BinanceData_1w.interval = rollup_watermark.interval
+  AND BinanceData_1w.open_time >= rollup_watermark.since;
+
+INSERT INTO BinanceData_1w BY NAME
+SELECT
+    b.symbol AS symbol,
+    b.interval AS interval,
+    MIN(b.open_time) AS open_time,
+    arg_min(b.open_price, b.open_time) AS open_price,
+    MAX(b.high) AS high,
+    MIN(b.low) AS low,
+    arg_max(b.close, b.open_time) AS close,
+    SUM(b.volume) AS volume,
+    MAX(b.close_time) AS close_time,
+    SUM(b.quote_asset_volume) AS quote_asset_volume,
+    SUM(b.ntrades) AS ntrades,
+    SUM(b.taker_buy_base_asset_volume) AS taker_buy_base_asset_volume,
+    SUM(b.taker_buy_quote_asset_volume) AS taker_buy_quote_asset_volume,
+    NULL AS ignore
+FROM BinanceData b
+LEFT JOIN rollup_watermark w ON b.symbol = w.symbol AND b.interval = w.interval
+WHERE w.since IS NULL OR b.open_time >= w.since
+GROUP BY b.symbol, b.interval, (b.open_time - ((b.open_time - 345600000) % 604800000))
+ORDER BY symbol, interval, open_time;
+
+DROP TABLE IF EXISTS rollup_watermark;
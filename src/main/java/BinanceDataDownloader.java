@@ -33,6 +33,13 @@ public class BinanceDataDownloader {
             String fileName = cryptoPair + "-" + duration + "-" + yearMonthStr + ".zip";
             String fileUrl = baseUrl + cryptoPair + "/" + duration + "/" + fileName;
 
+            // Months downloaded by an earlier run are complete, only new ones are fetched
+            File csvFile = new File(outputFolder + cryptoPair + "-" + duration + "-" + yearMonthStr + ".csv");
+            if (csvFile.exists()) {
+                startYearMonth = startYearMonth.plusMonths(1);
+                continue;
+            }
+
             // Download the file
             System.out.println("Downloading " + fileName);
             URL url = new URL(fileUrl);
@@ -99,13 +106,34 @@ public class BinanceDataDownloader {
         bos.close();
     }
 
+    // Comma-separated list from an environment variable, e.g. BINANCE_SYMBOLS=BTCUSDT,ETHUSDT
+    public static String[] fromEnv(String name, String fallback) {
+        String value = System.getenv(name);
+        if (value == null || value.trim().isEmpty()) {
+            value = fallback;
+        }
+        return value.trim().split("\\s*,\\s*");
+    }
+
+    public static String[] symbols() {
+        return fromEnv("BINANCE_SYMBOLS", "BTCUSDT");
+    }
+
+    public static String[] intervals() {
+        return fromEnv("BINANCE_INTERVALS", "15m");
+    }
+
     public static void DownloadData() {
-        // Example usage
-        BinanceDataDownloader downloader = new BinanceDataDownloader("klines", "BTCUSDT", "15m");
-        try {
-            downloader.downloadAndUnzipAllData(); // Download all data
-        } catch (IOException e) {
-            e.printStackTrace();
+        // Every configured symbol at every configured interval, one folder per series
+        for (String symbol : symbols()) {
+            for (String interval : intervals()) {
+                BinanceDataDownloader downloader = new BinanceDataDownloader("klines", symbol, interval);
+                try {
+                    downloader.downloadAndUnzipAllData(); // Download all data
+                } catch (IOException e) {
+                    e.printStackTrace();
+                }
+            }
         }
     }
 }
\ No newline at end of file
@@ -10,13 +10,29 @@ public class Main {
 
         final String PROJECT_DIR = System.getProperty("user.dir");
         final String DWH_DIR =  PROJECT_DIR + "/duckdb/";
-        final String CSV_DIR = PROJECT_DIR + "/BTCUSDT_15m_data/";
 
-        Dataset<Row> Dataframe = SparkPreprocessor.readFromCSV(getFileName(CSV_DIR), CSV_DIR);
+        // One <symbol>_<interval>_data folder per series, all loaded into the same table
+        Dataset<Row> Dataframe = null;
+        for (String symbol : BinanceDataDownloader.symbols()) {
+            for (String interval : BinanceDataDownloader.intervals()) {
+                final String CSV_DIR = PROJECT_DIR + "/" + symbol + "_" + interval + "_data/";
+                if (!new File(CSV_DIR).isDirectory()) {
+                    System.out.println("No data downloaded for " + symbol + " " + interval);
+                    continue;
+                }
+                Dataset<Row> series = SparkPreprocessor.readFromCSV(getFileName(CSV_DIR), CSV_DIR, symbol, interval);
+                Dataframe = Dataframe == null ? series : Dataframe.union(series);
+            }
+        }
+        if (Dataframe == null) {
+            System.out.println("Nothing to load");
+            return;
+        }
         System.out.println("This is the final dataframe");
         Dataframe.show();
 
         SparkPreprocessor.ToDWH(Dataframe);
+        SparkPreprocessor.refreshRollups("jdbc:duckdb:" + DWH_DIR + "binancedata.db", PROJECT_DIR + "/sql/rollups.sql");
 
     }
 
@@ -8,8 +8,12 @@ import org.apache.spark.sql.types.Metadata;
 import org.apache.spark.sql.types.StructField;
 import org.apache.spark.sql.types.DataTypes;
 import org.apache.spark.sql.SaveMode;
+import org.apache.spark.sql.functions;
 
 import java.io.File;
+import java.io.IOException;
+import java.nio.file.Files;
+import java.nio.file.Paths;
 import java.sql.Connection;
 import java.sql.SQLException;
 import java.sql.Statement;
@@ -22,7 +26,8 @@ import java.util.Properties;
 import org.duckdb.DuckDBConnection;
 
 public class SparkPreprocessor {
-    public static Dataset<Row> readFromCSV(List<String> pathList,String CSVROOT)
+    // Reads the monthly kline CSVs of one symbol/interval series and tags every row with it
+    public static Dataset<Row> readFromCSV(List<String> pathList,String CSVROOT, String symbol, String interval)
     {
         // 1. Create a SparkConf object (optional, but recommended for configuration)
         SparkConf sparkConf = new SparkConf()
@@ -65,6 +70,9 @@ public class SparkPreprocessor {
                 System.out.println("Error reading CSV file " +  pathList.get(i));
                 e.printStackTrace();}
         }
+        Dataframe = Dataframe
+                .withColumn("symbol", functions.lit(symbol))
+                .withColumn("interval", functions.lit(interval));
         Dataframe.show(5);
         return Dataframe;
     }
@@ -92,6 +100,8 @@ public class SparkPreprocessor {
                 new StructField("taker_buy_base_asset_volume", DataTypes.DoubleType, false, Metadata.empty()),
                 new StructField("taker_buy_quote_asset_volume", DataTypes.DoubleType, false, Metadata.empty()),
                 new StructField("ignore", DataTypes.IntegerType, true, Metadata.empty()), // Added for the trailing "0"
+                new StructField("symbol", DataTypes.StringType, false, Metadata.empty()),
+                new StructField("interval", DataTypes.StringType, false, Metadata.empty()),
         });
 
         Dataset<Row> DataframeWithSchema = spark.createDataFrame(Dataframe.rdd(),schema);
@@ -105,6 +115,28 @@ public class SparkPreprocessor {
                     .jdbc("jdbc:duckdb:duckdb/binancedata.db", "BinanceData", connectionProperties);
             spark.stop();
     }
+
+    // Brings the 1h/4h/1d/1w rollup tables up to date after a load (see sql/rollups.sql)
+    public static void refreshRollups(String jdbcUrl, String sqlPath)
+    {
+        try (Connection conn = DriverManager.getConnection(jdbcUrl);
+             Statement stmt = conn.createStatement()) {
+            StringBuilder script = new StringBuilder();
+            for (String line : Files.readAllLines(Paths.get(sqlPath))) {
+                if (!line.trim().startsWith("--")) {
+                    script.append(line).append("\n");
+                }
+            }
+            for (String sql : script.toString().split(";")) {
+                if (!sql.trim().isEmpty()) {
+                    stmt.execute(sql);
+                }
+            }
+            System.out.println("Rollup tables refreshed");
+        } catch (SQLException | IOException e) {
+            e.printStackTrace();
+        }
+    }
 }
 
 